@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""Velocidade x precisão dos modos de cálculo, contra a Swiss Ephemeris completa.
+
+A mesma amostra de mapas passa por todos os modos:
+  swiss              calc_ut com os arquivos .se1 + swe.houses (referência)
+  moshier            modelo analítico embutido, sem arquivos
+  interpolado        Hermite sobre uma tabela diária do motor de referência (a do calendário de aspectos)
+  casas_vetorizadas  ASC, MC e cúspides de Placidus em forma fechada/iterativa para a amostra inteira
+
+Para cada modo: vazão, erros (máximo e percentis) em longitude, ASC/MC e cúspides e, o que decide se o
+modo pode ir para os jobs em lote, quantas classificações visíveis ao usuário mudam: signo, casa e
+aspecto, com as mesmas regras (e o mesmo arredondamento) de POST /mapa-astral.
+
+Sem os arquivos .se1 a própria Swiss Ephemeris cai no Moshier: a referência fica registrada no relatório.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import swisseph as swe
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server"))
+
+from astral_api import ASPECTOS, ORBE, PLANETAS  # noqa: E402
+from calendario_aspectos import amostrar_corpo, hermite  # noqa: E402
+from efemerides import MODO_MOSHIER, MODO_SWISS, calcular_casas, calcular_posicao, inicializar_efemerides  # noqa: E402
+from relocacao import calcular_cuspides_placidus  # noqa: E402
+
+CORPOS = list(PLANETAS.items())
+FLAGS_SWISS = swe.FLG_SWIEPH | swe.FLG_SPEED
+FLAGS_MOSHIER = swe.FLG_MOSEPH | swe.FLG_SPEED
+ANGULOS_ASPECTOS = np.array(list(ASPECTOS), dtype=float)
+PARES = np.array([(i, j) for i in range(len(CORPOS)) for j in range(i + 1, len(CORPOS))])
+# Fração da amostra nascida no Brasil (o resto espalhado entre as latitudes ±60°)
+PROPORCAO_BRASIL = 0.8
+
+def gerar_amostra(quantidade, ano_inicio, ano_fim, semente):
+    aleatorio = np.random.default_rng(semente)
+    jds = aleatorio.uniform(swe.julday(ano_inicio, 1, 1, 0.0), swe.julday(ano_fim + 1, 1, 1, 0.0), quantidade)
+    brasil = aleatorio.random(quantidade) < PROPORCAO_BRASIL
+    latitudes = np.where(brasil, aleatorio.uniform(-33.7, 5.2, quantidade), aleatorio.uniform(-60, 60, quantidade))
+    longitudes = np.where(brasil, aleatorio.uniform(-73.9, -34.8, quantidade), aleatorio.uniform(-180, 180, quantidade))
+    return jds, latitudes, longitudes
+
+def posicoes_por_chamada(jds, flags):
+    """Longitudes (n, corpos) e o motor que a biblioteca realmente usou"""
+    longitudes = np.empty((len(jds), len(CORPOS)))
+    motores = set()
+    for i, jd in enumerate(jds.tolist()):
+        for j, (corpo, _) in enumerate(CORPOS):
+            pos, motor = calcular_posicao(jd, corpo, flags)
+            longitudes[i, j] = pos[0]
+            motores.add(motor)
+    return longitudes, motores
+
+def casas_por_chamada(jds, latitudes, longitudes):
+    cuspides = np.empty((len(jds), 12))
+    for i, (jd, lat, lon) in enumerate(zip(jds.tolist(), latitudes.tolist(), longitudes.tolist())):
+        cuspides[i] = calcular_casas(jd, lat, lon)[0]
+    return cuspides
+
+def medir(funcao, *args):
+    inicio = time.perf_counter()
+    resultado = funcao(*args)
+    return resultado, time.perf_counter() - inicio
+
+def modo_swiss(jds, latitudes, longitudes, _):
+    (planetas, motores), tempo_posicoes = medir(posicoes_por_chamada, jds, FLAGS_SWISS)
+    cuspides, tempo_casas = medir(casas_por_chamada, jds, latitudes, longitudes)
+    return planetas, cuspides, {"posicoes": tempo_posicoes, "casas": tempo_casas}, {"motores": sorted(motores)}
+
+def modo_moshier(jds, latitudes, longitudes, referencia):
+    (planetas, _), tempo_posicoes = medir(posicoes_por_chamada, jds, FLAGS_MOSHIER)
+    cuspides, tempo_casas = medir(casas_por_chamada, jds, latitudes, longitudes)
+    return planetas, cuspides, {"posicoes": tempo_posicoes, "casas": tempo_casas}, {}
+
+def modo_interpolado(jds, latitudes, longitudes, referencia):
+    """Posições interpoladas; casas da referência (só as posições mudam neste modo)"""
+    jd_inicio = np.floor(jds.min()) - 1
+    dias = int(np.ceil(jds.max() - jd_inicio)) + 2
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor() as executor:
+        tabela = list(executor.map(amostrar_corpo, [(corpo, jd_inicio, dias, FLAGS_SWISS) for corpo, _ in CORPOS]))
+    tempo_tabela = time.perf_counter() - inicio
+
+    def interpolar():
+        return np.column_stack([hermite(lon, vel, jd_inicio, jds) % 360 for lon, vel in tabela])
+
+    planetas, tempo_posicoes = medir(interpolar)
+    return planetas, referencia["cuspides"], {"posicoes": tempo_posicoes, "casas": None}, {
+        "tabela_s": round(tempo_tabela, 2), "tabela_dias": dias
+    }
+
+def modo_casas_vetorizadas(jds, latitudes, longitudes, referencia):
+    """Cúspides da amostra inteira numa chamada; posições da referência"""
+    def cuspides_vetorizadas():
+        obliquidade = np.array([calcular_posicao(jd, swe.ECL_NUT, FLAGS_SWISS)[0][0] for jd in jds.tolist()])
+        ramc = (np.array([swe.sidtime(jd) for jd in jds.tolist()]) * 15 + longitudes) % 360
+        return calcular_cuspides_placidus(ramc, latitudes, obliquidade)
+
+    cuspides, tempo_casas = medir(cuspides_vetorizadas)
+    return referencia["planetas"], cuspides, {"posicoes": None, "casas": tempo_casas}, {}
+
+MODOS = {
+    "swiss": modo_swiss,
+    "moshier": modo_moshier,
+    "interpolado": modo_interpolado,
+    "casas_vetorizadas": modo_casas_vetorizadas
+}
+
+def diferenca_angular(a, b):
+    return np.abs((a - b + 180) % 360 - 180)
+
+def casas_dos_planetas(graus, cuspides):
+    """Casa de cada planeta pelas cúspides, como identificar_casa: a cúspide com o menor avanço anti-horário"""
+    return np.argmin((graus[:, :, None] - cuspides[:, None, :]) % 360, axis=2) + 1
+
+def aspectos_dos_pares(graus):
+    """Aspecto (índice em ASPECTOS, -1 = nenhum) de cada par de planetas, com a orbe da API"""
+    distancia = diferenca_angular(graus[:, PARES[:, 0]], graus[:, PARES[:, 1]])
+    dentro = np.abs(distancia[..., None] - ANGULOS_ASPECTOS) <= ORBE
+    return np.where(dentro.any(axis=2), dentro.argmax(axis=2), -1)
+
+def classificar(planetas, cuspides):
+    """Classificações visíveis, sobre os valores arredondados a 0,01° como na resposta"""
+    graus = np.round(planetas, 2) % 360
+    angulos = np.round(cuspides[:, [0, 9]], 2) % 360
+    return {
+        "signo": np.column_stack([graus, angulos]) // 30,
+        "casa": casas_dos_planetas(graus, cuspides),
+        "aspecto": aspectos_dos_pares(graus)
+    }
+
+def estatisticas(erros_graus):
+    segundos = np.asarray(erros_graus).ravel() * 3600
+    return {
+        "max": round(float(segundos.max()), 4),
+        "p50": round(float(np.percentile(segundos, 50)), 4),
+        "p95": round(float(np.percentile(segundos, 95)), 4),
+        "p99": round(float(np.percentile(segundos, 99)), 4)
+    }
+
+def comparar(referencia, planetas, cuspides):
+    classes_referencia = classificar(referencia["planetas"], referencia["cuspides"])
+    classes = classificar(planetas, cuspides)
+    trocas = {nome: classes[nome] != classes_referencia[nome] for nome in classes}
+    return {
+        "erro_longitude_arcsec": estatisticas(diferenca_angular(planetas, referencia["planetas"])),
+        "erro_asc_arcsec": estatisticas(diferenca_angular(cuspides[:, 0], referencia["cuspides"][:, 0])),
+        "erro_mc_arcsec": estatisticas(diferenca_angular(cuspides[:, 9], referencia["cuspides"][:, 9])),
+        "erro_cuspides_arcsec": estatisticas(diferenca_angular(cuspides, referencia["cuspides"])),
+        "trocas": {nome: int(troca.sum()) for nome, troca in trocas.items()},
+        "mapas_alterados": int(np.any([troca.reshape(len(troca), -1).any(axis=1) for troca in trocas.values()], axis=0).sum())
+    }
+
+def executar(quantidade, ano_inicio, ano_fim, semente, modos):
+    inicializar_efemerides()
+    jds, latitudes, longitudes = gerar_amostra(quantidade, ano_inicio, ano_fim, semente)
+    planetas, cuspides, tempos, extras = modo_swiss(jds, latitudes, longitudes, None)
+    referencia = {"planetas": planetas, "cuspides": cuspides}
+    relatorio = {
+        "amostra": {"mapas": quantidade, "anos": [ano_inicio, ano_fim], "semente": semente},
+        "referencia": {"motores": extras["motores"], "arquivos_se1": MODO_SWISS in extras["motores"]},
+        "modos": {}
+    }
+    for nome in modos:
+        if nome == "swiss":
+            resultado = (planetas, cuspides, tempos, {})
+        else:
+            resultado = MODOS[nome](jds, latitudes, longitudes, referencia)
+        planetas_modo, cuspides_modo, tempos_modo, extras_modo = resultado
+        relatorio["modos"][nome] = {
+            "mapas_por_s": {
+                etapa: (round(quantidade / segundos, 1) if segundos else None) for etapa, segundos in tempos_modo.items()
+            },
+            **comparar(referencia, planetas_modo, cuspides_modo),
+            **extras_modo
+        }
+    return relatorio
+
+def imprimir(relatorio):
+    referencia = relatorio["referencia"]
+    if not referencia["arquivos_se1"]:
+        print(f"⚠️  Sem arquivos .se1: a referência usou {', '.join(referencia['motores'])} ({MODO_MOSHIER} = mesmo modelo do modo moshier)")
+    colunas = list(relatorio["modos"])
+    linhas = [
+        ("posições/s", lambda m: m["mapas_por_s"]["posicoes"]),
+        ("casas/s", lambda m: m["mapas_por_s"]["casas"]),
+        ("longitude máx (\")", lambda m: m["erro_longitude_arcsec"]["max"]),
+        ("longitude p99 (\")", lambda m: m["erro_longitude_arcsec"]["p99"]),
+        ("ASC máx (\")", lambda m: m["erro_asc_arcsec"]["max"]),
+        ("MC máx (\")", lambda m: m["erro_mc_arcsec"]["max"]),
+        ("cúspides máx (\")", lambda m: m["erro_cuspides_arcsec"]["max"]),
+        ("trocas de signo", lambda m: m["trocas"]["signo"]),
+        ("trocas de casa", lambda m: m["trocas"]["casa"]),
+        ("trocas de aspecto", lambda m: m["trocas"]["aspecto"]),
+        ("mapas alterados", lambda m: m["mapas_alterados"])
+    ]
+    largura = max(len(rotulo) for rotulo, _ in linhas)
+    print("".ljust(largura), *(nome.rjust(18) for nome in colunas))
+    for rotulo, valor in linhas:
+        print(rotulo.ljust(largura), *(str(valor(relatorio["modos"][nome]) if valor(relatorio["modos"][nome]) is not None else "-").rjust(18) for nome in colunas))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de velocidade x precisão dos modos de efeméride")
+    parser.add_argument("--mapas", type=int, default=2000, help="Tamanho da amostra")
+    parser.add_argument("--inicio", type=int, default=1940, help="Primeiro ano de nascimento")
+    parser.add_argument("--fim", type=int, default=2025, help="Último ano de nascimento")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--modos", nargs="+", choices=list(MODOS), default=list(MODOS))
+    parser.add_argument("--saida", default=None, help="Grava o relatório completo em JSON")
+    parser.add_argument("--exigir-sem-trocas", action="store_true",
+                        help="Sai com erro se algum modo mudar signo, casa ou aspecto de algum mapa")
+    args = parser.parse_args()
+
+    relatorio = executar(args.mapas, args.inicio, args.fim, args.semente, args.modos)
+    imprimir(relatorio)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+    if args.exigir_sem_trocas and any(modo["mapas_alterados"] for modo in relatorio["modos"].values()):
+        sys.exit(1)
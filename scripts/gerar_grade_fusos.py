@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Gera server/fusos/grade_fusos.jsonl: grade de fusos horários usada por server/fusos_horarios.py.
+
+Os limites vêm do pacote timezonefinder (dados do timezone-boundary-builder / OpenStreetMap),
+necessário apenas para rodar este script: em produção só o arquivo gerado é lido. A primeira linha
+traz as zonas e os limites das grades; depois vem uma linha JSON por linha de cada grade, na ordem das
+grades, para que o leitor decodifique só as linhas que consulta.
+"""
+import json
+import os
+
+from timezonefinder import TimezoneFinder
+
+SAIDA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server", "fusos", "grade_fusos.jsonl")
+
+# Grade mundial grossa + grade fina sobre o Brasil (onde ficam quase todos os nascimentos)
+GRADES = [
+    {"nome": "mundo", "lat_min": -90.0, "lat_max": 90.0, "lon_min": -180.0, "lon_max": 180.0, "passo": 0.25},
+    {"nome": "brasil", "lat_min": -34.0, "lat_max": 6.0, "lon_min": -74.0, "lon_max": -28.0, "passo": 0.02},
+]
+
+def fuso_nautico(lon):
+    deslocamento = int(round(lon / 15.0))
+    if deslocamento == 0:
+        return "Etc/GMT"
+    # Nos nomes Etc/GMT o sinal é invertido (Etc/GMT+3 = UTC-3)
+    return f"Etc/GMT{'-' if deslocamento > 0 else '+'}{abs(deslocamento)}"
+
+def gerar_grade(tf, grade, zonas, indices):
+    passo = grade["passo"]
+    num_linhas = int(round((grade["lat_max"] - grade["lat_min"]) / passo))
+    num_colunas = int(round((grade["lon_max"] - grade["lon_min"]) / passo))
+    linhas = []
+    for i in range(num_linhas):
+        lat = grade["lat_min"] + (i + 0.5) * passo
+        corridas = []
+        for j in range(num_colunas):
+            lon = grade["lon_min"] + (j + 0.5) * passo
+            zona = tf.timezone_at(lat=lat, lng=lon) or fuso_nautico(lon)
+            if zona not in indices:
+                indices[zona] = len(zonas)
+                zonas.append(zona)
+            codigo = indices[zona]
+            # Codificação por corridas: [zona, quantidade, zona, quantidade, ...]
+            if corridas and corridas[-2] == codigo:
+                corridas[-1] += 1
+            else:
+                corridas.extend([codigo, 1])
+        linhas.append(corridas)
+        if i % 100 == 0:
+            print(f"{grade['nome']}: linha {i}/{num_linhas}")
+    return dict(grade, linhas=linhas)
+
+def gerar():
+    tf = TimezoneFinder()
+    zonas, indices = [], {}
+    grades = [gerar_grade(tf, grade, zonas, indices) for grade in GRADES]
+    os.makedirs(os.path.dirname(SAIDA), exist_ok=True)
+    with open(SAIDA, "w", encoding="utf-8") as arquivo:
+        cabecalho = {"zonas": zonas, "grades": [{k: v for k, v in grade.items() if k != "linhas"} for grade in grades]}
+        arquivo.write(json.dumps(cabecalho, separators=(",", ":")) + "\n")
+        for grade in grades:
+            for linha in grade["linhas"]:
+                arquivo.write(json.dumps(linha, separators=(",", ":")) + "\n")
+    print(f"✅ {len(zonas)} zonas gravadas em {SAIDA}")
+
+if __name__ == "__main__":
+    gerar()
@@ -1,74 +1,123 @@
 #!/usr/bin/env python3
 import json
 import os
+import sys
+import urllib.request
 import psycopg2
 from psycopg2.extras import execute_values
 
+# Coordenadas das sedes municipais (IBGE) por código do município; caminho local ou URL do JSON
+# [{"codigo_ibge": 3550308, "latitude": -23.5329, "longitude": -46.6395, ...}, ...]
+COORDENADAS_URL = os.environ.get(
+    'MUNICIPIOS_COORDENADAS',
+    'https://raw.githubusercontent.com/kelvins/municipios-brasileiros/main/json/municipios.json'
+)
+
+def carregar_coordenadas(origem=COORDENADAS_URL):
+    """{código IBGE (str): (latitude, longitude)} das sedes municipais"""
+    if origem.startswith(('http://', 'https://')):
+        with urllib.request.urlopen(origem, timeout=60) as resposta:
+            dados = json.loads(resposta.read().decode('utf-8'))
+    else:
+        with open(origem, 'r', encoding='utf-8') as file:
+            dados = json.load(file)
+    return {
+        str(municipio['codigo_ibge']): (float(municipio['latitude']), float(municipio['longitude']))
+        for municipio in dados
+    }
+
+def atualizar_coordenadas(cur, coordenadas):
+    """Preenche latitude/longitude das linhas já existentes, casando pelo código IBGE"""
+    execute_values(
+        cur,
+        """
+        UPDATE brazilian_municipalities AS m
+        SET latitude = c.latitude, longitude = c.longitude
+        FROM (VALUES %s) AS c (ibge_code, latitude, longitude)
+        WHERE m.ibge_code = c.ibge_code
+        """,
+        [(codigo, lat, lon) for codigo, (lat, lon) in coordenadas.items()],
+        page_size=1000
+    )
+    cur.execute("SELECT COUNT(*) FROM brazilian_municipalities WHERE latitude IS NULL OR longitude IS NULL")
+    return cur.fetchone()[0]
+
 def populate_municipalities():
     try:
         print("Carregando dados dos municípios...")
-        
+
         # Carregar dados do arquivo JSON
         with open('/tmp/municipios.json', 'r', encoding='utf-8') as file:
             municipalities = json.load(file)
-        
+
         print(f"Total de municípios encontrados: {len(municipalities)}")
-        
+
+        print("Carregando coordenadas das sedes municipais...")
+        coordenadas = carregar_coordenadas()
+        print(f"Coordenadas encontradas: {len(coordenadas)}")
+
         # Conectar ao banco de dados
         conn = psycopg2.connect(os.environ['DATABASE_URL'])
         cur = conn.cursor()
-        
+
         # Limpar tabela antes de inserir novos dados
         cur.execute("DELETE FROM brazilian_municipalities")
         print("Tabela de municípios limpa.")
-        
+
         # Preparar dados para inserção
         municipality_data = []
         for municipality in municipalities:
+            latitude, longitude = coordenadas.get(str(municipality['id']), (None, None))
             municipality_data.append((
                 municipality['nome'],
                 municipality['microrregiao']['mesorregiao']['UF']['sigla'],
-                str(municipality['id'])
+                str(municipality['id']),
+                latitude,
+                longitude
             ))
-        
+
         # Inserir em lotes para melhor performance
         batch_size = 1000
         total_inserted = 0
-        
+
         for i in range(0, len(municipality_data), batch_size):
             batch = municipality_data[i:i + batch_size]
             execute_values(
                 cur,
-                "INSERT INTO brazilian_municipalities (name, state_code, ibge_code) VALUES %s",
+                "INSERT INTO brazilian_municipalities (name, state_code, ibge_code, latitude, longitude) VALUES %s",
                 batch,
                 template=None,
                 page_size=100
             )
             total_inserted += len(batch)
             print(f"Inseridos {total_inserted}/{len(municipality_data)} municípios...")
-        
+
         # Confirmar transação
         conn.commit()
         print("✅ Todos os municípios foram inseridos com sucesso!")
-        
+
         # Mostrar estatísticas por estado
         cur.execute("""
-            SELECT state_code, COUNT(*) as count 
-            FROM brazilian_municipalities 
-            GROUP BY state_code 
+            SELECT state_code, COUNT(*) as count
+            FROM brazilian_municipalities
+            GROUP BY state_code
             ORDER BY state_code
         """)
-        
+
         stats = cur.fetchall()
         print("\n📊 Municípios por estado:")
         for state_code, count in stats:
             print(f"{state_code}: {count} municípios")
-        
+
         # Total final
         cur.execute("SELECT COUNT(*) FROM brazilian_municipalities")
         total = cur.fetchone()[0]
         print(f"\n🎉 Total de {total} municípios inseridos no banco de dados!")
-        
+        cur.execute("SELECT COUNT(*) FROM brazilian_municipalities WHERE latitude IS NULL OR longitude IS NULL")
+        sem_coordenadas = cur.fetchone()[0]
+        if sem_coordenadas:
+            print(f"⚠️ {sem_coordenadas} municípios sem coordenadas (ficam fora do ranking de relocação)")
+
     except Exception as error:
         print(f"❌ Erro ao popular municípios: {error}")
         if 'conn' in locals():
@@ -79,5 +128,33 @@ def populate_municipalities():
         if 'conn' in locals():
             conn.close()
 
+def populate_coordinates():
+    """Só as coordenadas, para bancos populados antes das colunas latitude/longitude existirem"""
+    try:
+        print("Carregando coordenadas das sedes municipais...")
+        coordenadas = carregar_coordenadas()
+        print(f"Coordenadas encontradas: {len(coordenadas)}")
+
+        conn = psycopg2.connect(os.environ['DATABASE_URL'])
+        cur = conn.cursor()
+        sem_coordenadas = atualizar_coordenadas(cur, coordenadas)
+        conn.commit()
+        print("✅ Coordenadas atualizadas!")
+        if sem_coordenadas:
+            print(f"⚠️ {sem_coordenadas} municípios sem coordenadas (ficam fora do ranking de relocação)")
+
+    except Exception as error:
+        print(f"❌ Erro ao atualizar coordenadas: {error}")
+        if 'conn' in locals():
+            conn.rollback()
+    finally:
+        if 'cur' in locals():
+            cur.close()
+        if 'conn' in locals():
+            conn.close()
+
 if __name__ == "__main__":
-    populate_municipalities()
\ No newline at end of file
+    if '--coordenadas' in sys.argv[1:]:
+        populate_coordinates()
+    else:
+        populate_municipalities()
@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""Teste de carga do cálculo de mapas: população sintética contra POST /mapa-astral ou o caminho CLI.
+
+Alvos:
+  http  requisições ao serviço (keep-alive, uma conexão por trabalhador)
+  cli   um processo `python3 server/astral_api_advanced.py <json>` por mapa, como o astralService.ts faz
+
+Padrões de chegada:
+  fechado   --concorrencia trabalhadores em laço, cada um manda a próxima ao receber a resposta
+  constante --taxa requisições/s em intervalos fixos
+  poisson   --taxa média, intervalos exponenciais
+  rajada    --taxa de base com picos de --taxa-pico durante --duracao-pico s a cada --periodo-pico s
+
+Nos padrões abertos a latência conta a partir do instante agendado (inclui a espera por um trabalhador
+livre), para a fila do próprio gerador não esconder a saturação do serviço.
+
+Cada execução vira um JSON em scripts/carga/resultados; `--comparar A.json B.json ...` tabela execuções.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import queue
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+from urllib.parse import urlsplit
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SCRIPT_CLI = os.path.join(RAIZ, "server", "astral_api_advanced.py")
+DIRETORIO_RESULTADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "carga", "resultados")
+
+# Idade dos usuários (faixa, peso): concentrada entre 20 e 40 anos
+FAIXAS_IDADE = [((14, 19), 8), ((20, 29), 34), ((30, 39), 28), ((40, 49), 16), ((50, 59), 9), ((60, 80), 5)]
+# Nascimentos no Brasil: leve pico de março a maio
+PESOS_MES = [8.1, 7.8, 8.9, 8.8, 9.0, 8.3, 8.2, 8.1, 8.2, 8.3, 7.9, 8.4]
+# Hora de nascimento: mais partos de manhã e à tarde (cesáreas agendadas), menos de madrugada
+PESOS_HORA = [2.6, 2.3, 2.2, 2.1, 2.1, 2.3, 3.0, 4.6, 6.0, 6.1, 5.8, 5.5, 5.0, 5.1, 5.3, 5.2, 5.0, 4.7, 4.4, 4.0, 3.7, 3.4, 3.1, 2.8]
+# Quem não sabe a hora costuma informar meio-dia
+PROPORCAO_HORA_DESCONHECIDA = 0.15
+
+# Sedes das capitais: usadas só quando não há banco (--sem-banco)
+CAPITAIS = [
+    ("Rio Branco", "AC", -9.975, -67.810), ("Maceió", "AL", -9.666, -35.735), ("Macapá", "AP", 0.034, -51.069),
+    ("Manaus", "AM", -3.119, -60.022), ("Salvador", "BA", -12.971, -38.501), ("Fortaleza", "CE", -3.717, -38.543),
+    ("Brasília", "DF", -15.780, -47.930), ("Vitória", "ES", -20.315, -40.312), ("Goiânia", "GO", -16.686, -49.265),
+    ("São Luís", "MA", -2.530, -44.303), ("Cuiabá", "MT", -15.601, -56.097), ("Campo Grande", "MS", -20.443, -54.646),
+    ("Belo Horizonte", "MG", -19.917, -43.935), ("Belém", "PA", -1.456, -48.502), ("João Pessoa", "PB", -7.119, -34.845),
+    ("Curitiba", "PR", -25.429, -49.271), ("Recife", "PE", -8.047, -34.877), ("Teresina", "PI", -5.089, -42.802),
+    ("Rio de Janeiro", "RJ", -22.907, -43.173), ("Natal", "RN", -5.795, -35.209), ("Porto Alegre", "RS", -30.035, -51.218),
+    ("Porto Velho", "RO", -8.762, -63.904), ("Boa Vista", "RR", 2.820, -60.672), ("Florianópolis", "SC", -27.595, -48.548),
+    ("São Paulo", "SP", -23.551, -46.633), ("Aracaju", "SE", -10.947, -37.073), ("Palmas", "TO", -10.249, -48.324)
+]
+
+def carregar_locais(sem_banco=False):
+    """(nome, UF, latitude, longitude) de brazilian_municipalities; as capitais se não houver banco"""
+    if sem_banco or not os.environ.get("DATABASE_URL"):
+        if not sem_banco:
+            print("⚠️  DATABASE_URL não definida: usando só as capitais", file=sys.stderr)
+        return CAPITAIS
+    import psycopg2
+    conn = psycopg2.connect(os.environ["DATABASE_URL"])
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT name, state_code, latitude, longitude
+                FROM brazilian_municipalities
+                WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+            """)
+            return cur.fetchall() or CAPITAIS
+    finally:
+        conn.close()
+
+class Populacao:
+    """Gerador de corpos de requisição: nascimentos realistas e uma fração de mapas repetidos"""
+
+    def __init__(self, locais, proporcao_repetidos, semente=None, campos=None):
+        self.locais = locais
+        self.proporcao_repetidos = proporcao_repetidos
+        self.campos = campos
+        self.aleatorio = random.Random(semente)
+        self.gerados = []
+        self.trava = threading.Lock()
+
+    def nascimento(self):
+        aleatorio = self.aleatorio
+        (idade_min, idade_max), = aleatorio.choices([f for f, _ in FAIXAS_IDADE], [p for _, p in FAIXAS_IDADE])
+        ano = date.today().year - aleatorio.randint(idade_min, idade_max)
+        mes = aleatorio.choices(range(1, 13), PESOS_MES)[0]
+        dia = date(ano, mes, 1) + timedelta(days=aleatorio.randrange(31))
+        dia = dia if dia.month == mes else dia.replace(day=1)
+        if aleatorio.random() < PROPORCAO_HORA_DESCONHECIDA:
+            return dia, "12:00"
+        hora = aleatorio.choices(range(24), PESOS_HORA)[0]
+        return dia, f"{hora:02d}:{aleatorio.randrange(60):02d}"
+
+    def proximo(self):
+        """(corpo, repetido): um mapa já pedido com a probabilidade configurada, senão um novo"""
+        with self.trava:
+            if self.gerados and self.aleatorio.random() < self.proporcao_repetidos:
+                return self.aleatorio.choice(self.gerados), True
+            dia, hora = self.nascimento()
+            nome, uf, lat, lon = self.aleatorio.choice(self.locais)
+            corpo = {
+                "nome": f"Carga {len(self.gerados)}",
+                "data_nascimento": dia.isoformat(),
+                "hora_nascimento": hora,
+                "local_nascimento": f"{nome} - {uf}",
+                "latitude": float(lat),
+                "longitude": float(lon)
+            }
+            if self.campos:
+                corpo["fields"] = self.campos
+            self.gerados.append(corpo)
+            return corpo, False
+
+class AlvoHttp:
+    """POST /mapa-astral com uma conexão keep-alive por thread; repetidos revalidam com If-None-Match"""
+
+    def __init__(self, url, timeout, prazo_ms=None):
+        partes = urlsplit(url)
+        self.classe = http.client.HTTPSConnection if partes.scheme == "https" else http.client.HTTPConnection
+        self.host = partes.netloc
+        self.caminho = (partes.path.rstrip("/") or "") + "/mapa-astral"
+        self.timeout = timeout
+        self.prazo_ms = prazo_ms
+        self.local = threading.local()
+        self.etags = {}
+
+    def conexao(self):
+        if getattr(self.local, "conexao", None) is None:
+            self.local.conexao = self.classe(self.host, timeout=self.timeout)
+        return self.local.conexao
+
+    def executar(self, corpo, repetido):
+        chave = json.dumps(corpo, sort_keys=True)
+        cabecalhos = {"Content-Type": "application/json"}
+        if repetido and chave in self.etags:
+            cabecalhos["If-None-Match"] = self.etags[chave]
+        if self.prazo_ms:
+            cabecalhos["X-Request-Timeout-Ms"] = str(self.prazo_ms)
+        try:
+            conexao = self.conexao()
+            conexao.request("POST", self.caminho, body=chave.encode(), headers=cabecalhos)
+            resposta = conexao.getresponse()
+            resposta.read()
+        except (OSError, http.client.HTTPException) as e:
+            self.local.conexao = None
+            return type(e).__name__, 0.0
+        if resposta.getheader("ETag"):
+            self.etags[chave] = resposta.getheader("ETag")
+        return resposta.status, 0.0
+
+class AlvoCli:
+    """Um processo Python por mapa (caminho do astralService.ts); a CPU vem do rusage de cada filho"""
+
+    def executar(self, corpo, repetido):
+        processo = subprocess.Popen(
+            [sys.executable, SCRIPT_CLI, json.dumps(corpo)],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, cwd=os.path.dirname(SCRIPT_CLI)
+        )
+        saida = processo.stdout.read()
+        processo.stdout.close()
+        _, status, uso = os.wait4(processo.pid, 0)
+        processo.returncode = os.waitstatus_to_exitcode(status)
+        cpu = uso.ru_utime + uso.ru_stime
+        if processo.returncode != 0:
+            return f"saida_{processo.returncode}", cpu
+        try:
+            resultado = json.loads(saida)
+        except ValueError:
+            return "json_invalido", cpu
+        # A CLI responde {"success": False, "error": ...} quando o cálculo falha
+        return (200 if resultado.get("success") else "erro"), cpu
+
+def cpu_processo(pid):
+    """Segundos de CPU (usuário + sistema) de um processo, de /proc"""
+    with open(f"/proc/{pid}/stat") as arquivo:
+        campos = arquivo.read().rsplit(")", 1)[1].split()
+    return (int(campos[11]) + int(campos[12])) / os.sysconf("SC_CLK_TCK")
+
+def pids_servico(pids):
+    """Os PIDs informados e seus filhos diretos (ex.: trabalhadores do uvicorn --workers)"""
+    encontrados = []
+    for pid in pids:
+        encontrados.append(pid)
+        for tarefa in os.listdir(f"/proc/{pid}/task"):
+            try:
+                with open(f"/proc/{pid}/task/{tarefa}/children") as arquivo:
+                    encontrados.extend(int(filho) for filho in arquivo.read().split())
+            except OSError:
+                pass
+    return sorted(set(encontrados))
+
+def chegadas(padrao, taxa, duracao, total, taxa_pico, periodo_pico, duracao_pico, aleatorio):
+    """Instantes (s desde o início) das requisições nos padrões abertos"""
+    t, n = 0.0, 0
+    while t < duracao and (total is None or n < total):
+        yield t
+        n += 1
+        if padrao == "constante":
+            t += 1 / taxa
+        elif padrao == "poisson":
+            t += aleatorio.expovariate(taxa)
+        else:
+            em_pico = (t % periodo_pico) < duracao_pico
+            t += aleatorio.expovariate(taxa_pico if em_pico else taxa)
+
+def percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    posicao = (len(ordenados) - 1) * p / 100
+    baixo = int(posicao)
+    alto = min(baixo + 1, len(ordenados) - 1)
+    return ordenados[baixo] + (ordenados[alto] - ordenados[baixo]) * (posicao - baixo)
+
+def executar_carga(alvo, populacao, args):
+    """Dispara a carga e devolve as amostras (inicio, latencia, status, repetido, cpu, trabalhador)"""
+    amostras = []
+    trava = threading.Lock()
+    inicio = time.perf_counter()
+    fim = inicio + args.duracao
+
+    def registrar(agendado, status, repetido, cpu, trabalhador):
+        agora = time.perf_counter()
+        with trava:
+            amostras.append((agendado - inicio, agora - agendado, status, repetido, cpu, trabalhador))
+
+    def executar(agendado, trabalhador):
+        corpo, repetido = populacao.proximo()
+        status, cpu = alvo.executar(corpo, repetido)
+        registrar(agendado, status, repetido, cpu, trabalhador)
+
+    if args.padrao == "fechado":
+        contador = iter(range(args.total)) if args.total else None
+        trava_contador = threading.Lock()
+
+        def laco(trabalhador):
+            while time.perf_counter() < fim:
+                if contador is not None:
+                    with trava_contador:
+                        if next(contador, None) is None:
+                            return
+                executar(time.perf_counter(), trabalhador)
+
+        threads = [threading.Thread(target=laco, args=(i,)) for i in range(args.concorrencia)]
+    else:
+        agenda = queue.Queue(maxsize=10 * args.concorrencia)
+
+        def trabalhador_aberto(trabalhador):
+            while True:
+                agendado = agenda.get()
+                if agendado is None:
+                    return
+                executar(agendado, trabalhador)
+
+        def despachar():
+            aleatorio = random.Random(args.semente)
+            for instante in chegadas(args.padrao, args.taxa, args.duracao, args.total, args.taxa_pico,
+                                     args.periodo_pico, args.duracao_pico, aleatorio):
+                espera = inicio + instante - time.perf_counter()
+                if espera > 0:
+                    time.sleep(espera)
+                agenda.put(inicio + instante)
+            for _ in range(args.concorrencia):
+                agenda.put(None)
+
+        threads = [threading.Thread(target=trabalhador_aberto, args=(i,)) for i in range(args.concorrencia)]
+        threads.append(threading.Thread(target=despachar))
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return amostras, time.perf_counter() - inicio
+
+def resumir(amostras, decorrido, cpu_servico):
+    latencias_ok = [latencia * 1000 for _, latencia, status, _, _, _ in amostras if status in (200, 304)]
+    por_status = {}
+    for _, _, status, _, _, _ in amostras:
+        por_status[str(status)] = por_status.get(str(status), 0) + 1
+    erros = sum(quantidade for status, quantidade in por_status.items() if status not in ("200", "304"))
+    resumo = {
+        "requisicoes": len(amostras),
+        "duracao_s": round(decorrido, 3),
+        "vazao_rps": round(len(amostras) / decorrido, 2) if decorrido else 0.0,
+        "vazao_ok_rps": round(len(latencias_ok) / decorrido, 2) if decorrido else 0.0,
+        "latencia_ms": {
+            nome: (round(valor, 2) if valor is not None else None)
+            for nome, valor in (
+                ("p50", percentil(latencias_ok, 50)), ("p95", percentil(latencias_ok, 95)),
+                ("p99", percentil(latencias_ok, 99)), ("max", max(latencias_ok) if latencias_ok else None)
+            )
+        },
+        "taxa_erros": round(erros / len(amostras), 4) if amostras else 0.0,
+        "por_status": por_status,
+        "repetidos": sum(1 for amostra in amostras if amostra[3])
+    }
+    # CPU: do serviço (por processo, via /proc) ou dos processos CLI (por trabalhador do gerador)
+    if cpu_servico:
+        resumo["cpu_por_processo"] = {
+            str(pid): {"cpu_s": round(segundos, 3), "uso_medio": round(segundos / decorrido, 3)}
+            for pid, segundos in cpu_servico.items()
+        }
+    cpu_trabalhadores = {}
+    for _, _, _, _, cpu, trabalhador in amostras:
+        cpu_trabalhadores[trabalhador] = cpu_trabalhadores.get(trabalhador, 0.0) + cpu
+    if any(cpu_trabalhadores.values()):
+        resumo["cpu_por_trabalhador"] = {
+            str(trabalhador): {"cpu_s": round(segundos, 3), "uso_medio": round(segundos / decorrido, 3)}
+            for trabalhador, segundos in sorted(cpu_trabalhadores.items())
+        }
+        resumo["cpu_por_mapa_ms"] = round(1000 * sum(cpu_trabalhadores.values()) / max(1, len(amostras)), 2)
+    return resumo
+
+def consultar_admissao(url):
+    """Contadores de admissão do serviço ao fim da execução (rejeições, fila)"""
+    partes = urlsplit(url)
+    classe = http.client.HTTPSConnection if partes.scheme == "https" else http.client.HTTPConnection
+    try:
+        conexao = classe(partes.netloc, timeout=5)
+        conexao.request("GET", (partes.path.rstrip("/") or "") + "/admissao")
+        resposta = conexao.getresponse()
+        return json.loads(resposta.read()) if resposta.status == 200 else None
+    except (OSError, http.client.HTTPException, ValueError):
+        return None
+
+def commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def salvar_execucao(nome, configuracao, resumo):
+    os.makedirs(DIRETORIO_RESULTADOS, exist_ok=True)
+    momento = datetime.now()
+    registro = {
+        "nome": nome,
+        "momento": momento.isoformat(timespec="seconds"),
+        "commit": commit_atual(),
+        "maquina": {"host": platform.node(), "cpus": os.cpu_count(), "python": platform.python_version()},
+        "configuracao": configuracao,
+        "resultado": resumo
+    }
+    caminho = os.path.join(DIRETORIO_RESULTADOS, f"{momento:%Y%m%d-%H%M%S}-{nome}.json")
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump(registro, arquivo, ensure_ascii=False, indent=2)
+    return caminho
+
+def comparar(caminhos):
+    """Tabela lado a lado das execuções salvas"""
+    execucoes = []
+    for caminho in caminhos:
+        with open(caminho, encoding="utf-8") as arquivo:
+            execucoes.append(json.load(arquivo))
+    linhas = [
+        ("execução", lambda e: e["nome"]),
+        ("commit", lambda e: e.get("commit") or "-"),
+        ("alvo/padrão", lambda e: f"{e['configuracao']['alvo']}/{e['configuracao']['padrao']}"),
+        ("concorrência", lambda e: e["configuracao"]["concorrencia"]),
+        ("vazão ok (rps)", lambda e: e["resultado"]["vazao_ok_rps"]),
+        ("p50 (ms)", lambda e: e["resultado"]["latencia_ms"]["p50"]),
+        ("p95 (ms)", lambda e: e["resultado"]["latencia_ms"]["p95"]),
+        ("p99 (ms)", lambda e: e["resultado"]["latencia_ms"]["p99"]),
+        ("erros", lambda e: f"{100 * e['resultado']['taxa_erros']:.2f}%"),
+        ("CPU/mapa (ms)", lambda e: e["resultado"].get("cpu_por_mapa_ms", "-"))
+    ]
+    largura = max(len(rotulo) for rotulo, _ in linhas)
+    for rotulo, valor in linhas:
+        print(rotulo.ljust(largura), *(str(valor(e)).rjust(18) for e in execucoes))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga do cálculo de mapas astrais")
+    parser.add_argument("--alvo", choices=("http", "cli"), default="http")
+    parser.add_argument("--url", default="http://127.0.0.1:8001", help="Base do serviço (alvo http)")
+    parser.add_argument("--padrao", choices=("fechado", "constante", "poisson", "rajada"), default="fechado")
+    parser.add_argument("--concorrencia", type=int, default=8, help="Trabalhadores do gerador")
+    parser.add_argument("--taxa", type=float, default=20.0, help="Requisições/s (padrões abertos)")
+    parser.add_argument("--taxa-pico", type=float, default=100.0, help="Requisições/s nos picos (rajada)")
+    parser.add_argument("--periodo-pico", type=float, default=30.0, help="Segundos entre o início de dois picos")
+    parser.add_argument("--duracao-pico", type=float, default=5.0, help="Segundos de cada pico")
+    parser.add_argument("--duracao", type=float, default=60.0, help="Segundos de carga")
+    parser.add_argument("--total", type=int, default=None, help="Encerra após N requisições")
+    parser.add_argument("--repetidos", type=float, default=0.2, help="Fração de mapas já pedidos antes")
+    parser.add_argument("--campos", default=None, help='"fields" enviado em todas as requisições')
+    parser.add_argument("--prazo-ms", type=int, default=None, help="Cabeçalho X-Request-Timeout-Ms")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Timeout por requisição HTTP (s)")
+    parser.add_argument("--pid", type=int, action="append", default=[], help="PID do serviço para medir CPU (repetível)")
+    parser.add_argument("--semente", type=int, default=None)
+    parser.add_argument("--sem-banco", action="store_true", help="Usar as capitais em vez de brazilian_municipalities")
+    parser.add_argument("--nome", default="carga", help="Nome da execução salva")
+    parser.add_argument("--nao-salvar", action="store_true")
+    parser.add_argument("--comparar", nargs="+", metavar="JSON", help="Compara execuções salvas e sai")
+    args = parser.parse_args()
+
+    if args.comparar:
+        comparar(args.comparar)
+        sys.exit(0)
+
+    locais = carregar_locais(args.sem_banco)
+    populacao = Populacao(locais, args.repetidos, args.semente, args.campos)
+    alvo = AlvoHttp(args.url, args.timeout, args.prazo_ms) if args.alvo == "http" else AlvoCli()
+
+    pids = pids_servico(args.pid) if args.pid else []
+    cpu_inicial = {pid: cpu_processo(pid) for pid in pids}
+    amostras, decorrido = executar_carga(alvo, populacao, args)
+    cpu_servico = {pid: cpu_processo(pid) - cpu_inicial[pid] for pid in pids}
+
+    resumo = resumir(amostras, decorrido, cpu_servico)
+    if args.alvo == "http":
+        resumo["admissao"] = consultar_admissao(args.url)
+    configuracao = {chave: valor for chave, valor in vars(args).items() if chave not in ("comparar", "nao_salvar")}
+    configuracao["locais"] = len(locais)
+
+    print(json.dumps(resumo, ensure_ascii=False, indent=2))
+    if not args.nao_salvar:
+        print(f"💾 {salvar_execucao(args.nome, configuracao, resumo)}")
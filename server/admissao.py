@@ -0,0 +1,189 @@
+"""Controle de admissão por rota: limite de concorrência, fila limitada e prazo informado pelo cliente.
+
+Requisições além da fila são recusadas na hora com 503 + Retry-After, em vez de esperarem atrás do
+trabalho de CPU até o cliente desistir. O prazo (cabeçalho X-Request-Timeout-Ms) acompanha a requisição
+em request.state.prazo para que o handler possa abandonar um cálculo cujo resultado ninguém vai ler.
+Rotas com `revalidar` respondem 304 a um GET cujo If-None-Match já confere antes de entrar na fila,
+sem ocupar vaga, inclusive quando a fila está cheia.
+"""
+import asyncio
+import json
+import math
+import time
+from collections import deque
+
+CABECALHO_PRAZO = b"x-request-timeout-ms"
+CABECALHO_IF_NONE_MATCH = b"if-none-match"
+
+# Como a requisição foi admitida
+IMEDIATA = "imediata"
+FILA = "fila"
+
+class PrazoExcedido(Exception):
+    def __init__(self, retry_after=1):
+        super().__init__("Prazo da requisição excedido")
+        self.retry_after = retry_after
+
+class LimiteRota:
+    """Vagas de execução e fila de espera de uma rota (usado apenas no loop de eventos, sem travas)"""
+
+    def __init__(self, concorrencia, fila, prazo_padrao=10.0, degradar=False, revalidar=None):
+        self.concorrencia = max(1, concorrencia)
+        self.fila = max(0, fila)
+        self.prazo_padrao = prazo_padrao
+        # Quem esperou na fila recebe a resposta reduzida (só posições), que libera a vaga mais cedo
+        self.degradar = degradar
+        # revalidar(scope): cabeçalhos do 304 se o If-None-Match confere com a resposta, senão None
+        self.revalidar = revalidar
+        self.em_execucao = 0
+        self.espera = deque()
+        self.tempo_medio = 0.1
+        self.contadores = {"admitidas": 0, "degradadas": 0, "rejeitadas": 0, "expiradas": 0, "prazo_esgotado": 0, "revalidadas": 0}
+
+    def retry_after(self):
+        """Segundos estimados até a fila atual escoar"""
+        return max(1, math.ceil((len(self.espera) + 1) * self.tempo_medio / self.concorrencia))
+
+    async def entrar(self, tempo_limite):
+        """Ocupa uma vaga; retorna IMEDIATA, FILA ou None (fila cheia ou prazo esgotado na espera).
+        `tempo_limite` deve ser positivo: prazo já esgotado na chegada é recusado antes"""
+        if self.em_execucao < self.concorrencia and not self.espera:
+            self.em_execucao += 1
+            return IMEDIATA
+        if len(self.espera) >= self.fila:
+            self.contadores["rejeitadas"] += 1
+            return None
+        vez = asyncio.get_running_loop().create_future()
+        self.espera.append(vez)
+        try:
+            await asyncio.wait_for(vez, tempo_limite)
+            return FILA
+        except asyncio.TimeoutError:
+            self.desistir(vez)
+            self.contadores["expiradas"] += 1
+            return None
+        except asyncio.CancelledError:
+            # Conexão encerrada durante a espera
+            self.desistir(vez)
+            raise
+
+    def desistir(self, vez):
+        """Tira da fila quem parou de esperar, devolvendo a vaga se ela já tinha sido repassada"""
+        if vez.done() and not vez.cancelled():
+            # A vaga pode ter sido repassada no mesmo instante em que o prazo acabou
+            self.sair()
+        elif vez in self.espera:
+            # sair() pode já ter descartado a vez cancelada
+            self.espera.remove(vez)
+
+    def sair(self, duracao=None):
+        """Libera a vaga, repassando-a diretamente ao primeiro da fila"""
+        if duracao is not None:
+            self.tempo_medio += 0.2 * (duracao - self.tempo_medio)
+        while self.espera:
+            vez = self.espera.popleft()
+            if not vez.done():
+                vez.set_result(True)
+                return
+        self.em_execucao -= 1
+
+    def status(self):
+        return {
+            "concorrencia": self.concorrencia,
+            "fila": self.fila,
+            "em_execucao": self.em_execucao,
+            "aguardando": len(self.espera),
+            "tempo_medio": round(self.tempo_medio, 4),
+            **self.contadores
+        }
+
+def ler_prazo(cabecalhos, prazo_padrao):
+    """Orçamento em segundos: o do cabeçalho, limitado ao padrão da rota"""
+    for nome, valor in cabecalhos:
+        if nome == CABECALHO_PRAZO:
+            try:
+                return min(max(float(valor) / 1000, 0.0), prazo_padrao)
+            except ValueError:
+                break
+    return prazo_padrao
+
+def verificar_prazo(request):
+    """Para ser chamado entre etapas caras do handler"""
+    prazo = getattr(request.state, "prazo", None)
+    if prazo is not None and time.monotonic() > prazo:
+        raise PrazoExcedido()
+
+async def responder_indisponivel(send, retry_after, detalhe):
+    corpo = json.dumps({"detail": detalhe}, ensure_ascii=False).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(corpo)).encode()),
+            (b"retry-after", str(retry_after).encode())
+        ]
+    })
+    await send({"type": "http.response.body", "body": corpo})
+
+async def responder_nao_modificado(send, cabecalhos):
+    await send({
+        "type": "http.response.start",
+        "status": 304,
+        "headers": [(nome.lower().encode("latin-1"), valor.encode("latin-1")) for nome, valor in cabecalhos.items()]
+    })
+    await send({"type": "http.response.body", "body": b""})
+
+def condicional(scope):
+    """GET/HEAD com If-None-Match: o único caso que pode virar 304 sem ler o corpo"""
+    return scope["method"] in ("GET", "HEAD") and any(nome == CABECALHO_IF_NONE_MATCH for nome, _ in scope["headers"])
+
+class MiddlewareAdmissao:
+    """Middleware ASGI: a vaga fica ocupada até o fim da resposta (inclusive respostas em streaming)"""
+
+    def __init__(self, app, limites):
+        self.app = app
+        self.limites = limites
+
+    async def __call__(self, scope, receive, send):
+        limite = self.limites.get(scope["path"]) if scope["type"] == "http" else None
+        if limite is None:
+            await self.app(scope, receive, send)
+            return
+
+        if limite.revalidar is not None and condicional(scope):
+            cabecalhos = limite.revalidar(scope)
+            if cabecalhos is not None:
+                limite.contadores["revalidadas"] += 1
+                await responder_nao_modificado(send, cabecalhos)
+                return
+
+        chegada = time.monotonic()
+        prazo = chegada + ler_prazo(scope["headers"], limite.prazo_padrao)
+        if prazo <= chegada:
+            limite.contadores["prazo_esgotado"] += 1
+            await responder_indisponivel(send, limite.retry_after(), "Prazo da requisição já esgotado na chegada")
+            return
+        admissao = await limite.entrar(prazo - chegada)
+        if admissao is None:
+            await responder_indisponivel(send, limite.retry_after(), "Servidor sobrecarregado, tente novamente")
+            return
+
+        inicio = time.monotonic()
+        # Só quem esperou na fila pode ter chegado à vaga com o prazo vencido
+        if admissao == FILA and inicio >= prazo:
+            limite.sair()
+            limite.contadores["expiradas"] += 1
+            await responder_indisponivel(send, limite.retry_after(), "Prazo da requisição excedido na fila")
+            return
+
+        degradada = limite.degradar and admissao == FILA
+        limite.contadores["admitidas"] += 1
+        limite.contadores["degradadas"] += degradada
+        estado = scope.setdefault("state", {})
+        estado["prazo"] = prazo
+        estado["degradado"] = degradada
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limite.sair(time.monotonic() - inicio)
@@ -0,0 +1,30 @@
+// Atualização incremental dos índices em memória do serviço Python (astral_api.py) quando o mapa
+// de um usuário é salvo. Sem isso os índices só refletem a carga feita na subida do serviço.
+const ASTRAL_API_URL = process.env.ASTRAL_API_URL || 'http://127.0.0.1:8001';
+
+// Rota de atualização e corpo esperado (o mapa salvo em astral_map_data)
+const INDEX_ROUTES: Array<[string, (astralMapData: any) => unknown]> = [
+  ['indice-compatibilidade', (astralMapData) => astralMapData],
+  ['indice-caracteristicas', (astralMapData) => astralMapData],
+  // Só o mapa: as comunidades do usuário ficam como estão nas estatísticas
+  ['estatisticas', (astralMapData) => ({ mapa: astralMapData })],
+];
+
+// Falhas só são registradas: o mapa já está no banco e entra nos índices na próxima carga do serviço
+export async function updateAstralMapIndexes(userId: string, astralMapData: any): Promise<void> {
+  await Promise.all(INDEX_ROUTES.map(async ([route, body]) => {
+    const url = `${ASTRAL_API_URL}/${route}/${encodeURIComponent(userId)}`;
+    try {
+      const response = await fetch(url, {
+        method: 'PUT',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(body(astralMapData)),
+      });
+      if (!response.ok) {
+        console.error(`Failed to update ${route} for user ${userId}:`, response.status, await response.text());
+      }
+    } catch (error) {
+      console.error(`Failed to update ${route} for user ${userId}:`, error);
+    }
+  }));
+}
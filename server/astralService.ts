@@ -10,6 +10,7 @@ export interface AstralCalculationData {
   nome: string;
   data_nascimento: string; // YYYY-MM-DD format
   hora_nascimento: string; // HH:MM format
+  hora_desconhecida?: boolean; // sem hora: mapa ao meio-dia mais a varredura do dia
   local_nascimento: string;
   latitude: number;
   longitude: number;
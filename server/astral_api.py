@@ -1,14 +1,88 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field, model_validator
 import swisseph as swe
+import asyncio
 import datetime
-import pytz
-from typing import Dict, List, Optional
+import hmac
+import itertools
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
 import math
 import random
 
-app = FastAPI()
-swe.set_ephe_path(".")
+from admissao import LimiteRota, MiddlewareAdmissao, PrazoExcedido, verificar_prazo
+from cache_http import MAX_AGE_MAPA, FUSO_PREVISAO, gerar_etag, etag_confere, cabecalhos_cache, segundos_ate_virada_do_dia
+from catalogo_interpretacoes import obter_catalogo
+from fusos_horarios import local_para_utc
+from estrelas_fixas import calcular_conjuncoes_estrelas
+from efemerides import (
+    CONTEXTO_PADRAO, EfemerideIndisponivel, inicializar_efemerides, escolher_motor, calcular_posicao,
+    calcular_ayanamsa, criar_contexto, status_efemerides
+)
+from efemerides import calcular_casas as calcular_casas_contexto
+from indice_compatibilidade import IndiceCompatibilidade, construir_do_banco, extrair_pontos_chave
+from indice_caracteristicas import IndiceCaracteristicas, caracteristicas_mapa
+from indice_caracteristicas import construir_do_banco as construir_caracteristicas_do_banco
+from estatisticas_populacao import DIMENSOES, EstatisticasPopulacao, contribuicao_mapa, reconstruir_do_banco
+from progressoes import gerar_linha_do_tempo_progressoes
+from astrocartografia import gerar_astrocartografia
+from calendario_aspectos import obter_calendario
+from ceu_agora import BATIMENTO_SSE, TransmissorCeu
+from eletiva import buscar_janelas
+from hora_desconhecida import varrer_dia
+from roda_svg import cache_rodas, renderizar_roda
+from perfilador import PerfiladorOcupado, encerrar_sessao, iniciar_sessao
+from relocacao import Municipios, carregar_municipios, ranquear_municipios
+from astral_api_advanced import aspecto_entre, nome_fase_lua, selecionar_secoes
+
+indice_compatibilidade = IndiceCompatibilidade()
+trava_indice = threading.Lock()
+indice_caracteristicas = IndiceCaracteristicas()
+trava_caracteristicas = threading.Lock()
+estatisticas = EstatisticasPopulacao()
+trava_estatisticas = threading.Lock()
+municipios = Municipios([], [], [], [], [])
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Carga inicial dos índices de compatibilidade e de características e das estatísticas da população
+    # (atualizados depois a cada perfil criado/editado) e das coordenadas dos municípios usadas no
+    # ranking de relocação
+    global municipios, estatisticas
+    if os.environ.get("DATABASE_URL"):
+        import psycopg2
+        conn = psycopg2.connect(os.environ["DATABASE_URL"])
+        try:
+            construir_do_banco(indice_compatibilidade, conn, pontos_chave_do_mapa)
+            construir_caracteristicas_do_banco(indice_caracteristicas, conn, caracteristicas_do_mapa)
+            estatisticas = reconstruir_do_banco(conn, contribuicao_do_mapa)
+            municipios = carregar_municipios(conn)
+        finally:
+            conn.close()
+    yield
+
+app = FastAPI(lifespan=lifespan)
+inicializar_efemerides()
+
+# Vagas por rota de cálculo (trabalho de CPU): além da fila, resposta 503 imediata com Retry-After
+CONCORRENCIA_CALCULO = int(os.environ.get("ADMISSAO_CONCORRENCIA", os.cpu_count() or 1))
+FILA_CALCULO = int(os.environ.get("ADMISSAO_FILA", 4 * CONCORRENCIA_CALCULO))
+LIMITES_ADMISSAO = {
+    "/mapa-astral": LimiteRota(CONCORRENCIA_CALCULO, FILA_CALCULO, prazo_padrao=5.0, degradar=True),
+    "/progressoes": LimiteRota(max(1, CONCORRENCIA_CALCULO // 2), CONCORRENCIA_CALCULO, prazo_padrao=10.0),
+    "/astrocartografia": LimiteRota(CONCORRENCIA_CALCULO, FILA_CALCULO, prazo_padrao=5.0),
+    "/relocacao": LimiteRota(CONCORRENCIA_CALCULO, FILA_CALCULO, prazo_padrao=5.0),
+    "/eleicao": LimiteRota(CONCORRENCIA_CALCULO, FILA_CALCULO, prazo_padrao=5.0),
+    "/hora-desconhecida": LimiteRota(CONCORRENCIA_CALCULO, FILA_CALCULO, prazo_padrao=5.0),
+    "/mapa-astral/roda.svg": LimiteRota(CONCORRENCIA_CALCULO, FILA_CALCULO, prazo_padrao=5.0),
+    "/compatibilidade/candidatos": LimiteRota(CONCORRENCIA_CALCULO, FILA_CALCULO, prazo_padrao=2.0),
+    "/caracteristicas/busca": LimiteRota(CONCORRENCIA_CALCULO, FILA_CALCULO, prazo_padrao=2.0)
+}
+app.add_middleware(MiddlewareAdmissao, limites=LIMITES_ADMISSAO)
 
 class MapaAstralRequest(BaseModel):
     nome: str
@@ -17,6 +91,81 @@ class MapaAstralRequest(BaseModel):
     local_nascimento: str
     latitude: Optional[float] = None
     longitude: Optional[float] = None
+    locale: Optional[str] = None
+    modo_efemeride: Optional[str] = None
+    # "tropical" (padrão) ou "sideral", com a ayanamsa (padrão "lahiri"); topocêntrico: visto do local de nascimento
+    zodiaco: Optional[str] = None
+    ayanamsa: Optional[str] = None
+    topocentrico: bool = False
+    # Seções da resposta separadas por vírgula (ex.: "informacoes_principais,planetas"); vazio = todas
+    fields: Optional[str] = None
+
+class CandidatosRequest(BaseModel):
+    mapa: Dict[str, Any]
+    user_id: Optional[str] = None
+    limite: int = 20
+
+class BuscaCaracteristicasRequest(BaseModel):
+    # Termo ("Lua:signo:Escorpião", "Lua:casa:8", "aspecto:Vênus:Júpiter:trígono", "elemento:Água",
+    # "qualidade:Fixo") ou {"e": [...]} / {"ou": [...]} com subconsultas
+    consulta: Any
+    limite: int = 100
+    deslocamento: int = 0
+
+class EstatisticaPerfilRequest(BaseModel):
+    # Mapa salvo em astral_map_data (None: mantém o atual) e slugs das comunidades do usuário (None: mantém)
+    mapa: Optional[Dict[str, Any]] = None
+    comunidades: Optional[List[str]] = None
+
+# Linha do tempo das progressões: até 120 anos por pedido, idade até 150 anos e passo de ao menos um mês
+MAX_ANOS_PROGRESSOES = 120
+IDADE_MAXIMA_PROGRESSOES = 150
+PASSO_MINIMO_PROGRESSOES = 1 / 12
+
+class ProgressoesRequest(MapaAstralRequest):
+    ano_inicio: int = Field(0, ge=0)
+    ano_fim: int = Field(90, le=IDADE_MAXIMA_PROGRESSOES)
+    passo: float = Field(1.0, ge=PASSO_MINIMO_PROGRESSOES)
+
+    @model_validator(mode="after")
+    def validar_intervalo(self):
+        if not 0 < self.ano_fim - self.ano_inicio <= MAX_ANOS_PROGRESSOES:
+            raise ValueError(f"Intervalo de anos inválido (ano_fim maior que ano_inicio, até {MAX_ANOS_PROGRESSOES} anos)")
+        return self
+
+class ObjetivoRelocacao(BaseModel):
+    planeta: str
+    # "angular", "sucedente", "cadente", um ângulo ("ASC", "MC", "DSC", "IC") ou o número da casa
+    posicao: str
+    peso: float = 1.0
+
+class RelocacaoRequest(MapaAstralRequest):
+    objetivos: List[ObjetivoRelocacao]
+    limite: int = 20
+
+class EleicaoRequest(BaseModel):
+    data_inicio: str
+    data_fim: str
+    # Restrições: fase_lua, lua_fora_de_curso, sem_aspectos_tensos, signo_ascendente, benefico_angular
+    restricoes: List[Dict[str, Any]]
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    limite: int = 10
+    duracao_minima: int = 15
+    modo_efemeride: Optional[str] = None
+
+class HoraDesconhecidaRequest(BaseModel):
+    data_nascimento: str
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    modo_efemeride: Optional[str] = None
+
+class AstrocartografiaRequest(MapaAstralRequest):
+    resolucao: float = 1.0
+    lat_min: float = -80.0
+    lat_max: float = 80.0
+    lon_min: float = -180.0
+    lon_max: float = 180.0
 
 SIGNOS = [
     "Áries", "Touro", "Gêmeos", "Câncer", "Leão", "Virgem",
@@ -36,6 +185,14 @@ PLANETAS = {
     swe.PLUTO: "Plutão"
 }
 
+SECOES_MAPA = [
+    "dados_basicos", "informacoes_principais", "planetas", "aspectos",
+    "perfil_personalidade", "compatibilidade", "recomendacoes", "areas_vida", "estrelas_fixas"
+]
+
+# Seções servidas a requisições admitidas em modo degradado (sem textos de interpretação)
+SECOES_DEGRADADO = {"dados_basicos", "informacoes_principais", "planetas"}
+
 CASAS = [
     "Casa 1 (Ascendente)", "Casa 2", "Casa 3", "Casa 4", "Casa 5", "Casa 6",
     "Casa 7", "Casa 8", "Casa 9", "Casa 10 (Meio do Céu)", "Casa 11", "Casa 12"
@@ -51,54 +208,6 @@ ASPECTOS = {
 
 ORBE = 6.0
 
-# Interpretações expandidas dos planetas em signos
-INTERPRETACOES_PLANETAS = {
-    "Sol": {
-        "Áries": "Liderança natural, pioneirismo, energia dinâmica e iniciativa",
-        "Touro": "Estabilidade, determinação, apreciação da beleza e conforto",
-        "Gêmeos": "Comunicação versátil, curiosidade intelectual, adaptabilidade",
-        "Câncer": "Sensibilidade emocional, intuição, cuidado com a família",
-        "Leão": "Criatividade, generosidade, necessidade de reconhecimento",
-        "Virgem": "Perfeccionismo, análise detalhada, serviço aos outros",
-        "Libra": "Busca por harmonia, diplomacia, senso estético refinado",
-        "Escorpião": "Intensidade emocional, transformação, magnetismo pessoal",
-        "Sagitário": "Otimismo, busca por conhecimento, amor pela liberdade",
-        "Capricórnio": "Ambição, responsabilidade, construção de estruturas sólidas",
-        "Aquário": "Originalidade, humanitarismo, visão futurista",
-        "Peixes": "Intuição, compaixão, conexão espiritual"
-    },
-    "Lua": {
-        "Áries": "Reações emotivas rápidas, independência emocional",
-        "Touro": "Necessidade de segurança material, estabilidade emocional",
-        "Gêmeos": "Curiosidade emocional, mudanças de humor frequentes",
-        "Câncer": "Intuição poderosa, necessidade de proteção familiar",
-        "Leão": "Expressão emocional dramática, necessidade de admiração",
-        "Virgem": "Análise das emoções, necessidade de ordem interna",
-        "Libra": "Busca por equilíbrio emocional, harmonia nos relacionamentos",
-        "Escorpião": "Intensidade emocional profunda, transformação constante",
-        "Sagitário": "Otimismo emocional, busca por experiências expandidas",
-        "Capricórnio": "Controle emocional, responsabilidade nos sentimentos",
-        "Aquário": "Desapego emocional, necessidade de liberdade",
-        "Peixes": "Sensibilidade extrema, empatia natural"
-    }
-}
-
-# Interpretações das casas astrológicas
-INTERPRETACOES_CASAS = {
-    "Casa 1": "Personalidade, aparência física, primeira impressão",
-    "Casa 2": "Valores pessoais, recursos materiais, autoestima",
-    "Casa 3": "Comunicação, irmãos, ambiente próximo",
-    "Casa 4": "Lar, família, raízes, base emocional",
-    "Casa 5": "Criatividade, romance, filhos, expressão pessoal",
-    "Casa 6": "Trabalho, saúde, rotina, serviço",
-    "Casa 7": "Relacionamentos, parcerias, casamento",
-    "Casa 8": "Transformação, sexualidade, recursos compartilhados",
-    "Casa 9": "Filosofia, estudos superiores, viagens",
-    "Casa 10": "Carreira, reputação, realizações públicas",
-    "Casa 11": "Amizades, grupos, esperanças, objetivos",
-    "Casa 12": "Espiritualidade, subconsciente, limitações"
-}
-
 # Elementos e qualidades dos signos
 ELEMENTOS = {
     "Áries": "Fogo", "Leão": "Fogo", "Sagitário": "Fogo",
@@ -159,8 +268,8 @@ COMPATIBILIDADE = {
 def calcular_signo(grau: float) -> str:
     return SIGNOS[int(grau // 30)]
 
-def calcular_casas(julian_day, lat, lon):
-    return swe.houses(julian_day, lat, lon)
+def calcular_casas(julian_day, lat, lon, contexto=CONTEXTO_PADRAO):
+    return calcular_casas_contexto(julian_day, lat, lon, b'P', contexto)
 
 def identificar_casa(grau_planeta, casas):
     for i in range(12):
@@ -173,8 +282,9 @@ def identificar_casa(grau_planeta, casas):
             return i + 1
     return 1
 
-def calcular_aspectos(planetas_dict):
-    aspectos = []
+def pares_em_aspecto(planetas_dict):
+    """(planeta1, planeta2, aspecto, distância) de cada par dentro da orbe"""
+    pares = []
     nomes = list(planetas_dict.keys())
     for i in range(len(nomes)):
         for j in range(i + 1, len(nomes)):
@@ -185,25 +295,34 @@ def calcular_aspectos(planetas_dict):
                 distancia = 360 - distancia
             for angulo, nome in ASPECTOS.items():
                 if abs(distancia - angulo) <= ORBE:
-                    aspectos.append({
-                        "entre": f"{p1} e {p2}",
-                        "aspecto": nome,
-                        "graus": round(distancia, 2),
-                        "interpretacao": interpretar_aspecto(p1, p2, nome)
-                    })
-    return aspectos
-
-def interpretar_aspecto(planeta1, planeta2, aspecto):
-    interpretacoes = {
-        "Sol": {
-            "Lua": {
-                "Conjunção": "Harmonia entre consciência e emoção",
-                "Trígono": "Facilidade para expressar sentimentos",
-                "Quadratura": "Conflito interno entre razão e emoção"
-            }
+                    pares.append((p1, p2, nome, distancia))
+    return pares
+
+def aspectos_do_mapa_salvo(planetas_dict):
+    """(planeta1, planeta2, aspecto) de cada par com a regra dos mapas salvos (aspecto_entre: orbe de 8°,
+    nomes em minúsculas, um aspecto por par), para que o índice concorde com o mapa que o usuário vê"""
+    nomes = list(planetas_dict)
+    pares = []
+    for i, p1 in enumerate(nomes):
+        for p2 in nomes[i + 1:]:
+            encontrado = aspecto_entre(planetas_dict[p1]["graus"], planetas_dict[p2]["graus"])
+            if encontrado:
+                pares.append((p1, p2, encontrado[0]))
+    return pares
+
+def calcular_aspectos(planetas_dict, locale=None):
+    return [
+        {
+            "entre": f"{p1} e {p2}",
+            "aspecto": nome,
+            "graus": round(distancia, 2),
+            "interpretacao": interpretar_aspecto(p1, p2, nome, locale)
         }
-    }
-    return interpretacoes.get(planeta1, {}).get(planeta2, {}).get(aspecto, "Influência a ser explorada")
+        for p1, p2, nome, distancia in pares_em_aspecto(planetas_dict)
+    ]
+
+def interpretar_aspecto(planeta1, planeta2, aspecto, locale=None):
+    return obter_catalogo(locale).texto_aspecto(planeta1, planeta2, aspecto)
 
 def calcular_elemento_dominante(planetas_dict):
     elementos_count = {"Fogo": 0, "Terra": 0, "Ar": 0, "Água": 0}
@@ -221,121 +340,647 @@ def calcular_qualidade_dominante(planetas_dict):
         qualidades_count[qualidade] += 1
     return max(qualidades_count, key=qualidades_count.get)
 
-def gerar_previsao_diaria(signo_solar):
-    previsoes = {
-        "Áries": "Dia favorável para iniciar novos projetos. Sua energia estará em alta.",
-        "Touro": "Momento ideal para focar nas finanças e cuidar do bem-estar.",
-        "Gêmeos": "Comunicação em destaque. Bom dia para networking.",
-        "Câncer": "Dia para cuidar da família e do lar. Intuição aguçada.",
-        "Leão": "Sua criatividade estará em alta. Momento de se expressar.",
-        "Virgem": "Foco na organização e nos detalhes. Produtividade aumentada.",
-        "Libra": "Relacionamentos em destaque. Busque o equilíbrio.",
-        "Escorpião": "Dia de transformações. Confie em sua intuição.",
-        "Sagitário": "Oportunidades de aprendizado. Mantenha-se otimista.",
-        "Capricórnio": "Foco nos objetivos profissionais. Persistência será recompensada.",
-        "Aquário": "Dia para inovação e conexões sociais. Seja original.",
-        "Peixes": "Sensibilidade em alta. Confie em sua intuição."
+def planetas_do_mapa(mapa):
+    """Planetas de um mapa salvo como {nome: {"graus", "signo", "casa"}} e o signo do ascendente: planetas
+    em lista (gerar_mapa_astral_completo, casa pelas cúspides) ou em dicionário (POST /mapa-astral)"""
+    planetas = mapa.get("planetas") or []
+    if isinstance(planetas, dict):
+        planetas_dict = {
+            nome: {"graus": p["graus"], "signo": p.get("signo") or calcular_signo(p["graus"]), "casa": p.get("casa")}
+            for nome, p in planetas.items() if p.get("graus") is not None
+        }
+        return planetas_dict, (mapa.get("informacoes_principais") or {}).get("ascendente")
+    casas = sorted(mapa.get("casas") or [], key=lambda c: c.get("numero", 0))
+    cuspides = [c.get("grau") for c in casas]
+    tem_casas = len(cuspides) == 12 and None not in cuspides
+    planetas_dict = {
+        p["planeta"]: {
+            "graus": p["grau"],
+            "signo": p.get("signo") or calcular_signo(p["grau"]),
+            "casa": identificar_casa(p["grau"], cuspides) if tem_casas else None
+        }
+        for p in planetas if p.get("planeta") and p.get("grau") is not None
+    }
+    return planetas_dict, calcular_signo(cuspides[0]) if tem_casas else None
+
+def caracteristicas_do_mapa(mapa):
+    """Características indexáveis de um mapa salvo (índice de características)"""
+    planetas_dict, _ = planetas_do_mapa(mapa)
+    if not planetas_dict:
+        return set()
+    return caracteristicas_mapa(
+        planetas_dict, aspectos_do_mapa_salvo(planetas_dict),
+        calcular_elemento_dominante(planetas_dict), calcular_qualidade_dominante(planetas_dict)
+    )
+
+def pontos_chave_do_mapa(mapa):
+    """Pontos-chave da sinastria de um mapa em qualquer dos formatos de planetas_do_mapa; o grau do Ascendente
+    só vem das casas do formato em lista (POST /mapa-astral traz apenas o signo)"""
+    planetas_dict, _ = planetas_do_mapa(mapa)
+    casas = mapa.get("casas")
+    return extrair_pontos_chave(planetas_dict, casas if isinstance(casas, list) else None)
+
+def contribuicao_do_mapa(mapa):
+    """Chaves (dimensão, valor) de um mapa salvo para as estatísticas da população"""
+    planetas_dict, ascendente = planetas_do_mapa(mapa)
+    if not planetas_dict:
+        return []
+    return contribuicao_mapa(
+        planetas_dict, ascendente, pares_em_aspecto(planetas_dict),
+        calcular_elemento_dominante(planetas_dict), calcular_qualidade_dominante(planetas_dict),
+        ELEMENTOS, QUALIDADES
+    )
+
+def calcular_ceu_agora():
+    """Céu do instante atual (UT): posições, fase da Lua e aspectos ativos, arredondados para que
+    os deltas do stream só tragam o que muda de fato"""
+    agora = datetime.datetime.now(datetime.timezone.utc)
+    julian_day = swe.julday(agora.year, agora.month, agora.day, agora.hour + agora.minute / 60 + agora.second / 3600)
+    flags, motor = escolher_motor(julian_day, None)
+    planetas = {}
+    for planeta, nome in PLANETAS.items():
+        pos, _ = calcular_posicao(julian_day, planeta, flags)
+        planetas[nome] = {"graus": pos[0], "velocidade": pos[3]}
+    angulo_fase = (planetas["Lua"]["graus"] - planetas["Sol"]["graus"]) % 360
+    angulos_aspectos = {nome: angulo for angulo, nome in ASPECTOS.items()}
+    return {
+        "instante": agora.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "motor": motor,
+        "planetas": {
+            nome: {
+                "signo": calcular_signo(planeta["graus"]),
+                "grau": round(planeta["graus"], 2),
+                "retrogrado": planeta["velocidade"] < 0
+            }
+            for nome, planeta in planetas.items()
+        },
+        "fase_lua": {
+            "nome": nome_fase_lua(angulo_fase),
+            "angulo": round(angulo_fase, 1),
+            "iluminacao": round((1 - math.cos(math.radians(angulo_fase))) / 2 * 100)
+        },
+        "aspectos": {
+            f"{p1} e {p2}": {"aspecto": nome, "orbe": round(abs(distancia - angulos_aspectos[nome]), 1)}
+            for p1, p2, nome, distancia in pares_em_aspecto(planetas)
+        }
     }
-    return previsoes.get(signo_solar, "Dia de possibilidades infinitas.")
+
+def gerar_previsao_diaria(signo_solar, locale=None):
+    return obter_catalogo(locale).texto_signo("previsao_diaria", signo_solar)
+
+def calcular_dia_juliano(dados: MapaAstralRequest):
+    # Parse da data e hora
+    data = datetime.datetime.strptime(dados.data_nascimento + ' ' + dados.hora_nascimento, "%Y-%m-%d %H:%M")
+    # Fuso do local de nascimento (offline), com o histórico de horário de verão do tzdata
+    data_utc, _, _ = local_para_utc(data, *obter_coordenadas(dados))
+    return swe.julday(data_utc.year, data_utc.month, data_utc.day, data_utc.hour + data_utc.minute / 60)
+
+def obter_coordenadas(dados: MapaAstralRequest):
+    # Usar coordenadas fornecidas ou padrão (São Paulo)
+    lat = dados.latitude if dados.latitude else -23.5505
+    lon = dados.longitude if dados.longitude else -46.6333
+    return lat, lon
+
+def etag_mapa(dados: MapaAstralRequest, secoes, contexto=CONTEXTO_PADRAO):
+    # Entradas como aparecem na resposta, com os padrões aplicados; o locale entra pela versão do catálogo
+    lat, lon = obter_coordenadas(dados)
+    return gerar_etag("mapa-astral", {
+        "nome": dados.nome,
+        "data_nascimento": dados.data_nascimento,
+        "hora_nascimento": dados.hora_nascimento,
+        "local_nascimento": dados.local_nascimento,
+        "coordenadas": [lat, lon],
+        "catalogo": obter_catalogo(dados.locale).versao,
+        "modo_efemeride": dados.modo_efemeride or "auto",
+        "contexto": [contexto.ayanamsa, contexto.topocentrico],
+        "secoes": sorted(secoes)
+    })
+
+def contexto_mapa(dados: MapaAstralRequest):
+    lat, lon = obter_coordenadas(dados)
+    return criar_contexto(dados.zodiaco, dados.ayanamsa, dados.topocentrico, lat, lon)
+
+def etag_roda(dados: MapaAstralRequest, contexto=CONTEXTO_PADRAO):
+    lat, lon = obter_coordenadas(dados)
+    return gerar_etag("roda", {
+        "data_nascimento": dados.data_nascimento,
+        "hora_nascimento": dados.hora_nascimento,
+        "coordenadas": [lat, lon],
+        "modo_efemeride": dados.modo_efemeride or "auto",
+        "contexto": [contexto.ayanamsa, contexto.topocentrico]
+    })
+
+def revalidacao(calcular_etag):
+    # Função `revalidar` do middleware de admissão (GET com If-None-Match, antes da fila); entrada
+    # inválida segue para o handler, que responde 422
+    def revalidar(scope):
+        requisicao = Request(scope)
+        try:
+            etag = calcular_etag(MapaAstralRequest.model_validate(dict(requisicao.query_params)))
+        except ValueError:
+            return None
+        if etag_confere(requisicao.headers.get("if-none-match"), etag):
+            return cabecalhos_cache(etag, MAX_AGE_MAPA)
+        return None
+    return revalidar
+
+def etag_mapa_consulta(dados: MapaAstralRequest):
+    return etag_mapa(dados, selecionar_secoes(dados.fields, SECOES_MAPA), contexto_mapa(dados))
+
+def etag_roda_consulta(dados: MapaAstralRequest):
+    return etag_roda(dados, contexto_mapa(dados))
+
+# 304 antes da fila de admissão: revalidar não espera vaga nem recebe 503 com a fila cheia
+LIMITES_ADMISSAO["/mapa-astral"].revalidar = revalidacao(etag_mapa_consulta)
+LIMITES_ADMISSAO["/mapa-astral/roda.svg"].revalidar = revalidacao(etag_roda_consulta)
+
+def calcular_posicoes_planetas(julian_day, flags, casas, contexto=CONTEXTO_PADRAO):
+    resultado_planetas = {}
+    for planeta, nome in PLANETAS.items():
+        pos, _ = calcular_posicao(julian_day, planeta, flags, contexto)
+        grau = round(pos[0], 2)
+        signo = calcular_signo(pos[0])
+        resultado_planetas[nome] = {
+            "graus": grau,
+            "signo": signo,
+            "casa": identificar_casa(grau, casas),
+            "elemento": ELEMENTOS[signo],
+            "qualidade": QUALIDADES[signo],
+            "regente": REGENTES[signo]
+        }
+    return resultado_planetas
 
 @app.post("/mapa-astral")
-def gerar_mapa_astral(dados: MapaAstralRequest):
+def gerar_mapa_astral(dados: MapaAstralRequest, request: Request, response: Response):
     try:
-        # Parse da data e hora
-        data = datetime.datetime.strptime(dados.data_nascimento + ' ' + dados.hora_nascimento, "%Y-%m-%d %H:%M")
-        data_utc = pytz.timezone("America/Sao_Paulo").localize(data).astimezone(pytz.utc)
-        julian_day = swe.julday(data_utc.year, data_utc.month, data_utc.day, data_utc.hour + data_utc.minute / 60)
+        secoes = selecionar_secoes(dados.fields, SECOES_MAPA)
+        contexto = contexto_mapa(dados)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    etag = etag_mapa(dados, secoes, contexto)
+    if etag_confere(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cabecalhos_cache(etag, MAX_AGE_MAPA))
 
-        # Usar coordenadas fornecidas ou padrão (São Paulo)
-        lat = dados.latitude if dados.latitude else -23.5505
-        lon = dados.longitude if dados.longitude else -46.6333
+    # Admitida depois de esperar na fila: só as posições, sem os textos de interpretação
+    degradado = getattr(request.state, "degradado", False)
+    if degradado:
+        secoes = secoes & SECOES_DEGRADADO
+    try:
+        julian_day = calcular_dia_juliano(dados)
+        lat, lon = obter_coordenadas(dados)
 
-        casas, ascmc = calcular_casas(julian_day, lat, lon)
+        flags, motor = escolher_motor(julian_day, dados.modo_efemeride)
+        catalogo = obter_catalogo(dados.locale)
+        resultado = {}
 
-        resultado_planetas = {}
-        signo_solar = ""
-
-        # Calcular posições planetárias
-        for planeta, nome in PLANETAS.items():
-            pos, _ = swe.calc_ut(julian_day, planeta)
-            grau = round(pos[0], 2)
-            signo = calcular_signo(pos[0])
-            casa_num = identificar_casa(grau, casas)
-            
-            resultado_planetas[nome] = {
-                "graus": grau,
-                "signo": signo,
-                "casa": casa_num,
-                "elemento": ELEMENTOS[signo],
-                "qualidade": QUALIDADES[signo],
-                "regente": REGENTES[signo],
-                "interpretacao": INTERPRETACOES_PLANETAS.get(nome, {}).get(signo, "Influência única a ser explorada"),
-                "casa_significado": INTERPRETACOES_CASAS.get(f"Casa {casa_num}", "Área de influência")
-            }
-            
-            if nome == "Sol":
-                signo_solar = signo
-
-        # Calcular aspectos
-        aspectos = calcular_aspectos(resultado_planetas)
-        
-        # Calcular elementos e qualidades dominantes
-        elemento_dominante = calcular_elemento_dominante(resultado_planetas)
-        qualidade_dominante = calcular_qualidade_dominante(resultado_planetas)
-        
-        # Informações do Ascendente e Meio do Céu
-        ascendente_signo = calcular_signo(ascmc[0])
-        meio_ceu_signo = calcular_signo(ascmc[1])
-        
-        # Compatibilidade
-        signos_compativeis = COMPATIBILIDADE.get(signo_solar, [])
-        
-        # Previsão diária
-        previsao_hoje = gerar_previsao_diaria(signo_solar)
-        
-        return {
-            "dados_basicos": {
+        if "dados_basicos" in secoes:
+            resultado["dados_basicos"] = {
                 "nome": dados.nome,
                 "data_nascimento": dados.data_nascimento,
                 "hora_nascimento": dados.hora_nascimento,
                 "local_nascimento": dados.local_nascimento,
                 "coordenadas": {"latitude": lat, "longitude": lon}
-            },
-            "informacoes_principais": {
-                "signo_solar": signo_solar,
-                "ascendente": ascendente_signo,
-                "meio_do_ceu": meio_ceu_signo,
-                "elemento_dominante": elemento_dominante,
-                "qualidade_dominante": qualidade_dominante
-            },
-            "planetas": resultado_planetas,
-            "aspectos": aspectos,
-            "perfil_personalidade": {
-                "sol": INTERPRETACOES_PLANETAS.get("Sol", {}).get(signo_solar, ""),
-                "lua": INTERPRETACOES_PLANETAS.get("Lua", {}).get(resultado_planetas.get("Lua", {}).get("signo", ""), ""),
-                "ascendente": f"Como {ascendente_signo} ascendente, você se apresenta ao mundo com características deste signo"
-            },
-            "compatibilidade": {
-                "signos_compativeis": signos_compativeis,
-                "elemento_compativel": elemento_dominante
-            },
-            "recomendacoes": {
-                "cores_favoraveis": CORES_SIGNOS.get(signo_solar, []),
-                "pedras_recomendadas": PEDRAS_SIGNOS.get(signo_solar, []),
-                "dias_favoraveis": ["Terça-feira", "Domingo"] if signo_solar in ["Áries", "Leão", "Sagitário"] else ["Sexta-feira", "Sábado"]
-            },
-            "previsao_diaria": previsao_hoje,
-            "areas_vida": {
-                "carreira": f"Com {signo_solar} dominante, você tem potencial em áreas que envolvem {INTERPRETACOES_PLANETAS['Sol'][signo_solar]}",
-                "relacionamentos": f"Nos relacionamentos, busque parceiros que complementem sua energia de {elemento_dominante}",
-                "saude": f"Como {signo_solar}, cuide especialmente da saúde relacionada ao elemento {elemento_dominante}",
-                "espiritualidade": f"Sua jornada espiritual será influenciada pela energia {qualidade_dominante} do seu signo"
             }
+
+        # Só as seções pedidas são montadas; posições e casas apenas se alguma delas depender do mapa
+        if secoes - {"dados_basicos"}:
+            casas, ascmc = calcular_casas(julian_day, lat, lon, contexto)
+            resultado_planetas = calcular_posicoes_planetas(julian_day, flags, casas, contexto)
+            signo_solar = resultado_planetas["Sol"]["signo"]
+            verificar_prazo(request)
+
+            # Calcular elementos e qualidades dominantes
+            elemento_dominante = calcular_elemento_dominante(resultado_planetas)
+            qualidade_dominante = calcular_qualidade_dominante(resultado_planetas)
+
+            # Informações do Ascendente e Meio do Céu
+            ascendente_signo = calcular_signo(ascmc[0])
+            meio_ceu_signo = calcular_signo(ascmc[1])
+
+            if "informacoes_principais" in secoes:
+                resultado["informacoes_principais"] = {
+                    "signo_solar": signo_solar,
+                    "ascendente": ascendente_signo,
+                    "meio_do_ceu": meio_ceu_signo,
+                    "elemento_dominante": elemento_dominante,
+                    "qualidade_dominante": qualidade_dominante
+                }
+            if "planetas" in secoes:
+                if not degradado:
+                    for nome, planeta in resultado_planetas.items():
+                        planeta["interpretacao"] = catalogo.texto_corpo_signo(nome, planeta["signo"])
+                        planeta["casa_significado"] = catalogo.texto_casa(planeta["casa"])
+                resultado["planetas"] = resultado_planetas
+            if "aspectos" in secoes:
+                resultado["aspectos"] = calcular_aspectos(resultado_planetas, dados.locale)
+            if "estrelas_fixas" in secoes:
+                pontos = {nome: planeta["graus"] for nome, planeta in resultado_planetas.items()}
+                pontos.update({
+                    "Ascendente": ascmc[0], "Meio do Céu": ascmc[1],
+                    "Descendente": (ascmc[0] + 180) % 360, "Fundo do Céu": (ascmc[1] + 180) % 360
+                })
+                resultado["estrelas_fixas"] = calcular_conjuncoes_estrelas(
+                    julian_day, flags, pontos, ayanamsa=calcular_ayanamsa(julian_day, contexto)
+                )
+            if "perfil_personalidade" in secoes:
+                resultado["perfil_personalidade"] = {
+                    "sol": catalogo.texto_corpo_signo("Sol", signo_solar),
+                    "lua": catalogo.texto_corpo_signo("Lua", resultado_planetas.get("Lua", {}).get("signo", "")),
+                    "ascendente": f"Como {ascendente_signo} ascendente, você se apresenta ao mundo com características deste signo"
+                }
+            if "compatibilidade" in secoes:
+                resultado["compatibilidade"] = {
+                    "signos_compativeis": COMPATIBILIDADE.get(signo_solar, []),
+                    "elemento_compativel": elemento_dominante
+                }
+            if "recomendacoes" in secoes:
+                resultado["recomendacoes"] = {
+                    "cores_favoraveis": CORES_SIGNOS.get(signo_solar, []),
+                    "pedras_recomendadas": PEDRAS_SIGNOS.get(signo_solar, []),
+                    "dias_favoraveis": ["Terça-feira", "Domingo"] if signo_solar in ["Áries", "Leão", "Sagitário"] else ["Sexta-feira", "Sábado"]
+                }
+            if "areas_vida" in secoes:
+                resultado["areas_vida"] = {
+                    "carreira": f"Com {signo_solar} dominante, você tem potencial em áreas que envolvem {catalogo.texto_corpo_signo('Sol', signo_solar)}",
+                    "relacionamentos": f"Nos relacionamentos, busque parceiros que complementem sua energia de {elemento_dominante}",
+                    "saude": f"Como {signo_solar}, cuide especialmente da saúde relacionada ao elemento {elemento_dominante}",
+                    "espiritualidade": f"Sua jornada espiritual será influenciada pela energia {qualidade_dominante} do seu signo"
+                }
+
+        resultado["efemeride"] = {"modo": dados.modo_efemeride or "auto", "motor": motor}
+        if contexto != CONTEXTO_PADRAO:
+            resultado["efemeride"].update({"zodiaco": dados.zodiaco or "tropical", "ayanamsa": contexto.ayanamsa,
+                                           "topocentrico": bool(contexto.topocentrico)})
+        if degradado:
+            resultado["degradado"] = True
+            response.headers["Cache-Control"] = "no-store"
+        else:
+            response.headers.update(cabecalhos_cache(etag, MAX_AGE_MAPA))
+        return resultado
+
+    except PrazoExcedido as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except EfemerideIndisponivel as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/mapa-astral")
+def consultar_mapa_astral(request: Request, response: Response, dados: MapaAstralRequest = Depends()):
+    # Mesmo cálculo via GET, para que proxies e CDNs possam guardar e revalidar a resposta
+    return gerar_mapa_astral(dados, request, response)
+
+@app.get("/mapa-astral/roda.svg")
+def gerar_roda_svg(request: Request, dados: MapaAstralRequest = Depends()):
+    # Roda do mapa natal (imagens de compartilhamento, e-mails); rodas prontas ficam no cache pelo hash do mapa
+    try:
+        contexto = contexto_mapa(dados)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    lat, lon = obter_coordenadas(dados)
+    etag = etag_roda(dados, contexto)
+    cabecalhos = cabecalhos_cache(etag, MAX_AGE_MAPA)
+    if etag_confere(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cabecalhos)
+
+    svg = cache_rodas.obter(etag)
+    if svg is None:
+        try:
+            julian_day = calcular_dia_juliano(dados)
+            flags, _ = escolher_motor(julian_day, dados.modo_efemeride)
+            casas, ascmc = calcular_casas(julian_day, lat, lon, contexto)
+            resultado_planetas = calcular_posicoes_planetas(julian_day, flags, casas, contexto)
+        except EfemerideIndisponivel as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        svg = renderizar_roda(
+            {nome: planeta["graus"] for nome, planeta in resultado_planetas.items()},
+            list(casas),
+            [(p1, p2, nome) for p1, p2, nome, _ in pares_em_aspecto(resultado_planetas)]
+        )
+        cache_rodas.guardar(etag, svg)
+    return Response(content=svg, media_type="image/svg+xml", headers=cabecalhos)
+
+@app.get("/previsao-diaria/{signo}")
+def consultar_previsao_diaria(signo: str, request: Request, response: Response, locale: Optional[str] = None):
+    # Parte do mapa que depende da data: separada para não encurtar o cache do mapa natal
+    if signo not in SIGNOS:
+        raise HTTPException(status_code=422, detail=f"Signo inválido: {signo}")
+    agora = datetime.datetime.now(FUSO_PREVISAO)
+    catalogo = obter_catalogo(locale)
+    etag = gerar_etag("previsao-diaria", signo, agora.date(), catalogo.versao)
+    cabecalhos = cabecalhos_cache(etag, segundos_ate_virada_do_dia(agora))
+    if etag_confere(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cabecalhos)
+    response.headers.update(cabecalhos)
+    return {"signo": signo, "data": agora.date().isoformat(), "previsao": gerar_previsao_diaria(signo, locale)}
+
+@app.post("/progressoes")
+def gerar_progressoes_secundarias(dados: ProgressoesRequest):
+    try:
+        julian_day = calcular_dia_juliano(dados)
+        lat, lon = obter_coordenadas(dados)
+        casas, ascmc = calcular_casas(julian_day, lat, lon)
+        motor, linha_do_tempo = gerar_linha_do_tempo_progressoes(
+            julian_day, casas, ascmc, dados.ano_inicio, dados.ano_fim, dados.passo, dados.modo_efemeride
+        )
+    except EfemerideIndisponivel as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    # Uma linha JSON por evento, enviada à medida que a linha do tempo é gerada; a primeira diz o motor usado
+    efemeride = {"tipo": "efemeride", "modo": dados.modo_efemeride or "auto", "motor": motor}
+    return StreamingResponse(
+        (json.dumps(evento, ensure_ascii=False) + "\n" for evento in itertools.chain([efemeride], linha_do_tempo)),
+        media_type="application/x-ndjson"
+    )
+
+@app.post("/astrocartografia")
+def gerar_linhas_astrocartografia(dados: AstrocartografiaRequest):
+    # Linhas ASC/DSC/MC/IC de cada planeta para o instante do nascimento
+    try:
+        julian_day = calcular_dia_juliano(dados)
+        return gerar_astrocartografia(
+            julian_day, dados.resolucao, dados.lat_min, dados.lat_max, dados.lon_min, dados.lon_max,
+            dados.modo_efemeride, [(planeta, nome) for planeta, nome in PLANETAS.items()]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/relocacao")
+def ranquear_relocacao(dados: RelocacaoRequest):
+    # Melhores municípios para os objetivos do usuário (casas e ângulos no local, mesmo instante natal)
+    if not len(municipios):
+        raise HTTPException(status_code=503, detail="Coordenadas dos municípios não carregadas (scripts/populate_municipalities.py --coordenadas)")
+    if not dados.objetivos or dados.limite <= 0:
+        raise HTTPException(status_code=422, detail="Informe ao menos um objetivo e um limite positivo")
+    try:
+        julian_day = calcular_dia_juliano(dados)
+        objetivos = [objetivo.model_dump() for objetivo in dados.objetivos]
+        return {
+            "municipios": ranquear_municipios(julian_day, municipios, objetivos, dados.limite, dados.modo_efemeride),
+            "total_avaliado": len(municipios)
         }
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/eleicao")
+def buscar_janelas_eletivas(dados: EleicaoRequest):
+    # Janelas (UTC e hora local) em que todas as restrições valem, das mais longas para as mais curtas
+    try:
+        inicio = datetime.datetime.strptime(dados.data_inicio, "%Y-%m-%d")
+        fim = datetime.datetime.strptime(dados.data_fim, "%Y-%m-%d")
+        lat, lon = obter_coordenadas(dados)
+        return buscar_janelas(
+            swe.julday(inicio.year, inicio.month, inicio.day, 0.0),
+            swe.julday(fim.year, fim.month, fim.day, 0.0),
+            dados.restricoes, lat, lon, dados.limite, dados.duracao_minima, dados.modo_efemeride
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/hora-desconhecida")
+def varrer_dia_nascimento(dados: HoraDesconhecidaRequest):
+    # Dia inteiro em intervalos para quem não sabe a hora: o que é certo e o que depende da hora
+    try:
+        data = datetime.datetime.strptime(dados.data_nascimento, "%Y-%m-%d")
+        lat, lon = obter_coordenadas(dados)
+        return varrer_dia(data, lat, lon, dados.modo_efemeride)
+    except (ValueError, EfemerideIndisponivel) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/aspectos-mundiais")
+def consultar_aspectos_mundiais(
+    data_inicio: str,
+    data_fim: str,
+    corpo: Optional[List[str]] = Query(None),
+    aspecto: Optional[List[str]] = Query(None),
+    limite: int = 500
+):
+    # Aspectos exatos entre os corpos em trânsito no período, lidos do calendário pré-calculado
+    calendario = obter_calendario()
+    if calendario is None:
+        raise HTTPException(status_code=503, detail="Calendário de aspectos não gerado (python calendario_aspectos.py)")
+    try:
+        inicio = datetime.datetime.strptime(data_inicio, "%Y-%m-%d")
+        fim = datetime.datetime.strptime(data_fim, "%Y-%m-%d")
+        eventos = calendario.consultar(
+            swe.julday(inicio.year, inicio.month, inicio.day, 0.0),
+            swe.julday(fim.year, fim.month, fim.day, 24.0),
+            corpo, aspecto, limite
+        )
+        return {"data_inicio": data_inicio, "data_fim": data_fim, "total": len(eventos), "aspectos": eventos}
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@app.get("/efemerides")
+def consultar_efemerides():
+    # Diretório, cobertura dos arquivos e quantos cálculos usaram cada motor
+    return status_efemerides()
+
+@app.get("/admissao")
+def consultar_admissao():
+    # Ocupação, fila e contadores de rejeição por rota
+    return {rota: limite.status() for rota, limite in LIMITES_ADMISSAO.items()}
+
+@app.put("/indice-compatibilidade/{user_id}")
+def indexar_perfil(user_id: str, mapa: Dict[str, Any]):
+    # "mapa" é o resultado salvo em astral_map_data (gerar_mapa_astral_completo) ou o de POST /mapa-astral
+    pontos = pontos_chave_do_mapa(mapa)
+    if not pontos:
+        raise HTTPException(status_code=422, detail="Mapa sem pontos-chave")
+    with trava_indice:
+        indice_compatibilidade.atualizar(user_id, pontos)
+    return {"user_id": user_id, "pontos": pontos}
+
+@app.delete("/indice-compatibilidade/{user_id}")
+def remover_perfil_do_indice(user_id: str):
+    with trava_indice:
+        removido = indice_compatibilidade.remover(user_id)
+    return {"user_id": user_id, "removido": removido}
+
+@app.post("/compatibilidade/candidatos")
+def buscar_candidatos_compatibilidade(dados: CandidatosRequest):
+    pontos = pontos_chave_do_mapa(dados.mapa)
+    if not pontos:
+        raise HTTPException(status_code=422, detail="Mapa sem pontos-chave")
+    with trava_indice:
+        candidatos = indice_compatibilidade.buscar(pontos, dados.limite, excluir=dados.user_id)
+    return {"candidatos": candidatos, "total_indexado": len(indice_compatibilidade)}
+
+@app.put("/indice-caracteristicas/{user_id}")
+def indexar_caracteristicas(user_id: str, mapa: Dict[str, Any]):
+    # Mesmo corpo do PUT /indice-compatibilidade: o mapa salvo em astral_map_data
+    caracteristicas = caracteristicas_do_mapa(mapa)
+    if not caracteristicas:
+        raise HTTPException(status_code=422, detail="Mapa sem planetas")
+    with trava_caracteristicas:
+        indice_caracteristicas.atualizar(user_id, caracteristicas)
+    return {"user_id": user_id, "caracteristicas": sorted(caracteristicas)}
+
+@app.delete("/indice-caracteristicas/{user_id}")
+def remover_caracteristicas_do_indice(user_id: str):
+    with trava_caracteristicas:
+        removido = indice_caracteristicas.remover(user_id)
+    return {"user_id": user_id, "removido": removido}
+
+@app.post("/caracteristicas/busca")
+def buscar_por_caracteristicas(dados: BuscaCaracteristicasRequest):
+    # Ex.: {"consulta": {"e": ["Lua:signo:Escorpião", "Lua:casa:8"]}}
+    if not 1 <= dados.limite <= 1000 or dados.deslocamento < 0:
+        raise HTTPException(status_code=422, detail="limite deve estar entre 1 e 1000 e deslocamento >= 0")
+    try:
+        with trava_caracteristicas:
+            resultado = indice_caracteristicas.buscar(dados.consulta, dados.limite, dados.deslocamento)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    resultado["total_indexado"] = len(indice_caracteristicas)
+    return resultado
+
+@app.get("/indice-caracteristicas")
+def consultar_indice_caracteristicas():
+    with trava_caracteristicas:
+        return indice_caracteristicas.status()
+
+@app.put("/estatisticas/{user_id}")
+def atualizar_estatisticas(user_id: str, dados: EstatisticaPerfilRequest):
+    # Chamado ao criar ou recalcular o mapa, ou quando o usuário entra/sai de comunidades
+    chaves = None
+    if dados.mapa is not None:
+        chaves = contribuicao_do_mapa(dados.mapa)
+        if not chaves:
+            raise HTTPException(status_code=422, detail="Mapa sem planetas")
+    with trava_estatisticas:
+        try:
+            estatisticas.atualizar(user_id, chaves, dados.comunidades)
+        except KeyError:
+            raise HTTPException(status_code=404, detail="Perfil sem mapa nas estatísticas: envie o mapa")
+    return {"user_id": user_id, "chaves": len(chaves) if chaves else None}
+
+@app.delete("/estatisticas/{user_id}")
+def remover_das_estatisticas(user_id: str):
+    with trava_estatisticas:
+        removido = estatisticas.remover(user_id)
+    return {"user_id": user_id, "removido": removido}
+
+@app.get("/estatisticas")
+def consultar_estatisticas(comunidade: Optional[str] = None, dimensoes: Optional[str] = None,
+                           limite: Optional[int] = Query(None, ge=1)):
+    # dimensoes separadas por vírgula (vazio = todas); limite: quantos valores por dimensão (ex.: top aspectos)
+    try:
+        pedidas = selecionar_secoes(dimensoes, DIMENSOES)
+        with trava_estatisticas:
+            return estatisticas.resumo(comunidade, [d for d in DIMENSOES if d in pedidas], limite)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@app.get("/estatisticas/comunidades")
+def consultar_comunidades_estatisticas():
+    with trava_estatisticas:
+        return {"usuarios": len(estatisticas), "comunidades": estatisticas.comunidades()}
+
+@app.post("/estatisticas/reconstruir")
+def reconstruir_estatisticas():
+    # Reconstrução completa a partir da tabela de perfis, trocada de uma vez no fim; atualizações recebidas
+    # durante a leitura valem pelo que já estiver gravado no banco
+    global estatisticas
+    if not os.environ.get("DATABASE_URL"):
+        raise HTTPException(status_code=503, detail="DATABASE_URL não configurada")
+    import psycopg2
+    conn = psycopg2.connect(os.environ["DATABASE_URL"])
+    try:
+        nova = reconstruir_do_banco(conn, contribuicao_do_mapa)
+    finally:
+        conn.close()
+    with trava_estatisticas:
+        estatisticas = nova
+    return {"usuarios": len(nova), "comunidades": len(nova.comunidades())}
+
+# Um cálculo por intervalo para todos os widgets "céu agora" conectados
+transmissor_ceu = TransmissorCeu(calcular_ceu_agora)
+
+@app.get("/ceu-agora")
+async def consultar_ceu_agora(response: Response):
+    # Mesmo quadro do stream: vários widgets consultando no mesmo intervalo custam um cálculo
+    response.headers["Cache-Control"] = f"public, max-age={int(transmissor_ceu.intervalo)}"
+    return await transmissor_ceu.instantaneo()
+
+@app.get("/ceu-agora/stream")
+async def transmitir_ceu_agora():
+    # SSE: "completo" ao conectar, depois um "delta" por intervalo (ou um comentário de batimento)
+    fila = await transmissor_ceu.inscrever()
+
+    async def eventos():
+        try:
+            while True:
+                quadro = await fila.get()
+                yield BATIMENTO_SSE if quadro is None else quadro.sse
+        finally:
+            transmissor_ceu.cancelar(fila)
+
+    return StreamingResponse(
+        eventos(), media_type="text/event-stream",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"}
+    )
+
+@app.websocket("/ceu-agora/ws")
+async def transmitir_ceu_agora_ws(websocket: WebSocket):
+    # Mesmas mensagens do SSE, como texto JSON (os batimentos ficam por conta do ping do WebSocket)
+    await websocket.accept()
+    fila = await transmissor_ceu.inscrever()
+    try:
+        while True:
+            quadro = await fila.get()
+            if quadro is not None:
+                await websocket.send_text(quadro.texto)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        transmissor_ceu.cancelar(fila)
+
+@app.get("/ceu-agora/status")
+def consultar_transmissao_ceu():
+    return transmissor_ceu.status()
+
+# Perfilador sob demanda: desligado sem PERFILADOR_TOKEN; o token vai no cabeçalho X-Admin-Token
+TOKEN_PERFILADOR = os.environ.get("PERFILADOR_TOKEN")
+
+def verificar_admin(request: Request):
+    token = request.headers.get("x-admin-token", "")
+    if not TOKEN_PERFILADOR:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(token.encode(), TOKEN_PERFILADOR.encode()):
+        raise HTTPException(status_code=403, detail="Token de administrador inválido")
+
+@app.post("/admin/perfilador", dependencies=[Depends(verificar_admin)])
+async def executar_perfilador(segundos: float = Query(10.0, gt=0, le=120), intervalo_ms: float = Query(5.0, ge=1, le=1000),
+                              alocacoes: bool = False, formato: str = Query("json", pattern="^(json|colapsado)$"),
+                              rota: Optional[str] = None):
+    # Assíncrono: a janela de amostragem espera no loop de eventos sem ocupar uma thread do threadpool
+    rotas = {r.endpoint.__code__: r.path for r in app.routes if getattr(r, "endpoint", None) is not None}
+    try:
+        perfilador = iniciar_sessao(rotas, intervalo_ms / 1000, alocacoes, ignorar={"/admin/perfilador"})
+    except PerfiladorOcupado as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    try:
+        await asyncio.sleep(segundos)
+    finally:
+        resultado = await asyncio.to_thread(encerrar_sessao, perfilador)
+    if formato == "colapsado":
+        return PlainTextResponse(perfilador.colapsado(rota), headers={"Cache-Control": "no-store"})
+    resultado["colapsado"] = perfilador.colapsado(rota)
+    return resultado
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
@@ -2,13 +2,51 @@ import swisseph as swe
 import pytz
 from datetime import datetime
 from dataclasses import dataclass
+from functools import cached_property
 from typing import Dict, List, Optional, Any
 import json
 import sys
 import os
 
-# Configure Swiss Ephemeris path
-swe.set_ephe_path("/usr/share/ephe")
+from catalogo_interpretacoes import obter_catalogo
+from efemerides import inicializar_efemerides, escolher_motor, calcular_posicao
+from efemerides import calcular_casas as calcular_casas_contexto
+from fusos_horarios import local_para_utc
+from impressoes_interpretacao import caracteristicas_interpretacao, gerar_impressoes
+
+# Diretório e cobertura das efemérides (compartilhado com astral_api.py)
+inicializar_efemerides()
+
+FLAGS_PADRAO = swe.FLG_SWIEPH | swe.FLG_SPEED
+# Hora usada no mapa quando a de nascimento não é conhecida
+HORA_PADRAO = "12:00"
+
+SIGNOS = [
+    "Áries", "Touro", "Gêmeos", "Câncer", "Leão", "Virgem",
+    "Libra", "Escorpião", "Sagitário", "Capricórnio", "Aquário", "Peixes"
+]
+
+PLANETAS_SWE = [
+    (swe.SUN, "Sol"),
+    (swe.MOON, "Lua"),
+    (swe.MERCURY, "Mercúrio"),
+    (swe.VENUS, "Vênus"),
+    (swe.MARS, "Marte"),
+    (swe.JUPITER, "Júpiter"),
+    (swe.SATURN, "Saturno"),
+    (swe.URANUS, "Urano"),
+    (swe.NEPTUNE, "Netuno"),
+    (swe.PLUTO, "Plutão")
+]
+
+ASPECTOS_GRAUS = {
+    "conjunção": 0,
+    "sextil": 60,
+    "quadratura": 90,
+    "trígono": 120,
+    "oposição": 180
+}
+ORBE_ASPECTOS = 8
 
 @dataclass
 class DadosUsuario:
@@ -16,6 +54,9 @@ class DadosUsuario:
     data_nascimento: datetime
     hora_nascimento: str
     local_nascimento: str
+    # Hora de nascimento convertida para UTC pelo fuso do local (None: data_nascimento já está em UT)
+    data_utc: Optional[datetime] = None
+    fuso_horario: Optional[str] = None
 
 def interpretar_nodo_lunar(nodos):
     nodo = nodos.get("Nodo Norte", {}).get("signo", "Desconhecido")
@@ -72,36 +113,52 @@ def datas_favoraveis_fase_lua(fase_lua):
 
 def calcular_signo(grau: float) -> str:
     """Converte grau eclíptico para signo do zodíaco"""
-    signos = [
-        "Áries", "Touro", "Gêmeos", "Câncer", "Leão", "Virgem",
-        "Libra", "Escorpião", "Sagitário", "Capricórnio", "Aquário", "Peixes"
-    ]
     signo_index = int(grau // 30)
-    return signos[signo_index % 12]
+    return SIGNOS[signo_index % 12]
+
+def calcular_dia_juliano(data_nascimento):
+    """Converte a data/hora de nascimento para dia juliano"""
+    return swe.julday(data_nascimento.year, data_nascimento.month, data_nascimento.day,
+                      data_nascimento.hour + data_nascimento.minute/60.0)
 
-def calcular_fase_lua(data_nascimento):
+def identificar_casa(grau_planeta, cuspides):
+    """Retorna o número da casa (1-12) em que o grau eclíptico se encontra"""
+    for i in range(12):
+        inicio = cuspides[i]
+        fim = cuspides[(i + 1) % 12]
+        if fim < inicio:
+            fim += 360
+        pos = grau_planeta if grau_planeta >= inicio else grau_planeta + 360
+        if inicio <= pos < fim:
+            return i + 1
+    return 1
+
+def nome_fase_lua(angulo):
+    """Nome da fase pelo ângulo Lua - Sol (graus)"""
+    fase = angulo % 360
+    if fase < 45:
+        return "Lua Nova"
+    elif fase < 90:
+        return "Lua Crescente"
+    elif fase < 135:
+        return "Lua Quase Cheia"
+    elif fase < 180:
+        return "Lua Cheia"
+    elif fase < 225:
+        return "Lua Minguante"
+    elif fase < 270:
+        return "Lua Quarto Minguante"
+    elif fase < 315:
+        return "Lua Balsâmica"
+    else:
+        return "Lua Nova"
+
+def calcular_fase_lua(data_nascimento, flags=FLAGS_PADRAO):
     try:
         jd = swe.julday(data_nascimento.year, data_nascimento.month, data_nascimento.day)
-        lua_long, _ = swe.calc_ut(jd, swe.MOON)
-        sol_long, _ = swe.calc_ut(jd, swe.SUN)
-        fase = (lua_long[0] - sol_long[0]) % 360
-        
-        if fase < 45:
-            return "Lua Nova"
-        elif fase < 90:
-            return "Lua Crescente"
-        elif fase < 135:
-            return "Lua Quase Cheia"
-        elif fase < 180:
-            return "Lua Cheia"
-        elif fase < 225:
-            return "Lua Minguante"
-        elif fase < 270:
-            return "Lua Quarto Minguante"
-        elif fase < 315:
-            return "Lua Balsâmica"
-        else:
-            return "Lua Nova"
+        lua_long, _ = calcular_posicao(jd, swe.MOON, flags)
+        sol_long, _ = calcular_posicao(jd, swe.SUN, flags)
+        return nome_fase_lua(lua_long[0] - sol_long[0])
     except:
         return "Lua Nova"
 
@@ -109,7 +166,7 @@ def calcular_ascendente(lat, lon, data_nascimento):
     try:
         jd = swe.julday(data_nascimento.year, data_nascimento.month, data_nascimento.day, 
                        data_nascimento.hour + data_nascimento.minute/60.0)
-        houses, ascmc = swe.houses(jd, lat, lon, b'P')  # Placidus system
+        houses, ascmc = calcular_casas_contexto(jd, lat, lon, b'P')  # Placidus system
         asc_grau = ascmc[0]
         return calcular_signo(asc_grau)
     except:
@@ -119,41 +176,29 @@ def calcular_meio_ceu(lat, lon, data_nascimento):
     try:
         jd = swe.julday(data_nascimento.year, data_nascimento.month, data_nascimento.day, 
                        data_nascimento.hour + data_nascimento.minute/60.0)
-        houses, ascmc = swe.houses(jd, lat, lon, b'P')
+        houses, ascmc = calcular_casas_contexto(jd, lat, lon, b'P')
         mc_grau = ascmc[1]
         return calcular_signo(mc_grau)
     except:
         return "Câncer"
 
-def calcular_signo_solar(data_nascimento):
+def calcular_signo_solar(data_nascimento, flags=FLAGS_PADRAO):
     try:
         jd = swe.julday(data_nascimento.year, data_nascimento.month, data_nascimento.day)
-        sol_pos, _ = swe.calc_ut(jd, swe.SUN)
+        sol_pos, _ = calcular_posicao(jd, swe.SUN, flags)
         return calcular_signo(sol_pos[0])
     except:
         return "Áries"
 
-def calcular_planetas(data_nascimento):
+def calcular_planetas(data_nascimento, flags=FLAGS_PADRAO):
     planetas = []
-    planetas_swe = [
-        (swe.SUN, "Sol"),
-        (swe.MOON, "Lua"),
-        (swe.MERCURY, "Mercúrio"),
-        (swe.VENUS, "Vênus"),
-        (swe.MARS, "Marte"),
-        (swe.JUPITER, "Júpiter"),
-        (swe.SATURN, "Saturno"),
-        (swe.URANUS, "Urano"),
-        (swe.NEPTUNE, "Netuno"),
-        (swe.PLUTO, "Plutão")
-    ]
     
     try:
         jd = swe.julday(data_nascimento.year, data_nascimento.month, data_nascimento.day, 
                        data_nascimento.hour + data_nascimento.minute/60.0)
         
-        for planeta_id, nome in planetas_swe:
-            pos, _ = swe.calc_ut(jd, planeta_id)
+        for planeta_id, nome in PLANETAS_SWE:
+            pos, _ = calcular_posicao(jd, planeta_id, flags)
             signo = calcular_signo(pos[0])
             planetas.append({"planeta": nome, "signo": signo, "grau": pos[0]})
     except:
@@ -162,34 +207,31 @@ def calcular_planetas(data_nascimento):
     
     return planetas
 
+def aspecto_entre(grau1, grau2):
+    """(aspecto, orbe) do primeiro aspecto de ASPECTOS_GRAUS dentro da orbe entre duas longitudes, ou None"""
+    diff = abs(grau1 - grau2)
+    if diff > 180:
+        diff = 360 - diff
+    for aspecto, grau_aspecto in ASPECTOS_GRAUS.items():
+        if abs(diff - grau_aspecto) <= ORBE_ASPECTOS:
+            return aspecto, abs(diff - grau_aspecto)
+    return None
+
 def calcular_aspectos(planetas):
     aspectos = []
-    aspectos_graus = {
-        "conjunção": 0,
-        "sextil": 60,
-        "quadratura": 90,
-        "trígono": 120,
-        "oposição": 180
-    }
     
     for i, planeta1 in enumerate(planetas):
         for j, planeta2 in enumerate(planetas):
             if i >= j:
                 continue
-                
-            diff = abs(planeta1["grau"] - planeta2["grau"])
-            if diff > 180:
-                diff = 360 - diff
-                
-            for aspecto, grau_aspecto in aspectos_graus.items():
-                if abs(diff - grau_aspecto) <= 8:  # Orbe de 8 graus
-                    aspectos.append({
-                        "planeta1": planeta1["planeta"],
-                        "planeta2": planeta2["planeta"],
-                        "aspecto": aspecto,
-                        "orbe": abs(diff - grau_aspecto)
-                    })
-                    break
+            encontrado = aspecto_entre(planeta1["grau"], planeta2["grau"])
+            if encontrado:
+                aspectos.append({
+                    "planeta1": planeta1["planeta"],
+                    "planeta2": planeta2["planeta"],
+                    "aspecto": encontrado[0],
+                    "orbe": encontrado[1]
+                })
     
     return aspectos if aspectos else [{"planeta1": "Sol", "planeta2": "Lua", "aspecto": "trígono", "orbe": 0}]
 
@@ -197,7 +239,7 @@ def calcular_casas(lat, lon, data_nascimento):
     try:
         jd = swe.julday(data_nascimento.year, data_nascimento.month, data_nascimento.day, 
                        data_nascimento.hour + data_nascimento.minute/60.0)
-        houses, ascmc = swe.houses(jd, lat, lon, b'P')
+        houses, ascmc = calcular_casas_contexto(jd, lat, lon, b'P')
         
         casas = []
         for i, casa_grau in enumerate(houses):
@@ -215,103 +257,29 @@ def descobrir_planeta_dominante(planetas):
             return planeta["planeta"]
     return "Marte"
 
-def gerar_nomes_sugeridos(signo_solar):
-    nomes_por_signo = {
-        "Áries": ["Aurora", "Marte", "Ígnea"],
-        "Touro": ["Terra", "Vênus", "Estela"],
-        "Gêmeos": ["Gema", "Mercúrio", "Dual"],
-        "Câncer": ["Luna", "Maré", "Cárie"],
-        "Leão": ["Solar", "Dourado", "Régia"],
-        "Virgem": ["Pura", "Ceres", "Analítica"],
-        "Libra": ["Equilíbrio", "Justiça", "Harmonia"],
-        "Escorpião": ["Intensa", "Plutão", "Mistério"],
-        "Sagitário": ["Flecha", "Júpiter", "Aventura"],
-        "Capricórnio": ["Montanha", "Saturno", "Determinação"],
-        "Aquário": ["Água", "Urano", "Inovação"],
-        "Peixes": ["Oceano", "Netuno", "Intuição"]
-    }
-    
-    return nomes_por_signo.get(signo_solar, ["Astral", "Cósmica", "Estelar"])
+def gerar_nomes_sugeridos(signo_solar, locale=None):
+    return obter_catalogo(locale).texto_signo("nomes_sugeridos", signo_solar)
 
 def gerar_numero_sorte(data_nascimento):
     return sum([int(x) for x in data_nascimento.strftime("%d%m%Y") if x.isdigit()]) % 99 + 1
 
-def gerar_perfil_resumido(signo_solar, ascendente, planeta_dominante):
-    perfis = {
-        "Áries": "Você possui uma alma ardente e pioneira, sempre pronta para iniciar novos projetos com coragem e determinação.",
-        "Touro": "Sua essência é estável e determinada, buscando segurança e prazer nas coisas simples da vida.",
-        "Gêmeos": "Você é versátil e comunicativo, com uma mente ágil que busca constantemente novas informações e conexões.",
-        "Câncer": "Sua alma é intuitiva e protetora, guiada pelas emoções e com forte conexão com a família e o lar.",
-        "Leão": "Você possui uma personalidade magnética e criativa, nascida para brilhar e liderar com generosidade.",
-        "Virgem": "Sua essência é prática e analítica, sempre buscando a perfeição e servindo aos outros com dedicação.",
-        "Libra": "Você é harmoniosa e diplomática, sempre em busca do equilíbrio e da beleza em todas as situações.",
-        "Escorpião": "Sua alma é intensa e transformadora, com uma profundidade emocional que permite grandes renovações.",
-        "Sagitário": "Você é aventureira e filosófica, sempre em busca de novos horizontes e conhecimentos superiores.",
-        "Capricórnio": "Sua essência é ambiciosa e responsável, construindo seu sucesso com disciplina e perseverança.",
-        "Aquário": "Você é original e humanitária, com uma visão futurística e desejo de contribuir para o mundo.",
-        "Peixes": "Sua alma é sensível e compassiva, conectada ao mundo espiritual e às emoções dos outros."
-    }
-    
-    base_profile = perfis.get(signo_solar, f"Você é uma alma {signo_solar.lower()} única em sua jornada.")
+def gerar_perfil_resumido(signo_solar, ascendente, planeta_dominante, locale=None):
+    base_profile = obter_catalogo(locale).texto_signo("perfil_resumido", signo_solar)
     return f"{base_profile} Com ascendente em {ascendente} e forte influência de {planeta_dominante}, você manifesta essas qualidades de forma ainda mais especial."
 
-def sugestoes_por_mapa(signo, ascendente, planeta_dominante):
-    carreiras = {
-        "Áries": "Profissões que exigem liderança e pioneirismo, como empreendedorismo, esportes ou áreas militares.",
-        "Touro": "Carreiras em artes, culinária, arquitetura ou qualquer área que envolva criação e estabilidade.",
-        "Gêmeos": "Comunicação, jornalismo, ensino, vendas ou qualquer profissão que valorize a versatilidade.",
-        "Câncer": "Cuidados com crianças, psicologia, nutrição, hotelaria ou áreas que envolvam cuidado.",
-        "Leão": "Artes performáticas, entretenimento, educação, ou qualquer área onde possa brilhar.",
-        "Virgem": "Saúde, análise de dados, organização, contabilidade ou áreas que exijam precisão.",
-        "Libra": "Direito, diplomacia, artes, design, ou qualquer área que envolva equilíbrio e harmonia.",
-        "Escorpião": "Psicologia, investigação, medicina, ocultismo ou áreas de transformação profunda.",
-        "Sagitário": "Educação superior, filosofia, viagens, esportes radicais ou áreas internacionais.",
-        "Capricórnio": "Administração, política, construção civil, ou qualquer área que exija estrutura.",
-        "Aquário": "Tecnologia, ciências sociais, causas humanitárias ou inovação.",
-        "Peixes": "Artes visuais, música, espiritualidade, terapias ou áreas que envolvam intuição."
-    }
-    
-    amor = {
-        "Áries": "Você é apaixonado e direto no amor. Procure parceiros que admirem sua energia e independência.",
-        "Touro": "Busca estabilidade e sensualidade. Valorize relacionamentos duradouros e demonstre afeto através de gestos concretos.",
-        "Gêmeos": "Precisa de estímulo mental no relacionamento. Comunicação e variedade são essenciais para sua felicidade amorosa.",
-        "Câncer": "Você é protetor e carinhoso. Busque parceiros que valorizem intimidade emocional e vida doméstica.",
-        "Leão": "Generoso e dramático no amor. Procure parceiros que reconheçam sua grandeza e compartilhem momentos especiais.",
-        "Virgem": "Demonstra amor através do cuidado prático. Valorize parceiros que apreciem sua dedicação e atenção aos detalhes.",
-        "Libra": "Busca harmonia e beleza no relacionamento. Procure parceiros que compartilhem seus valores estéticos e sociais.",
-        "Escorpião": "Intenso e profundo no amor. Necessite de conexões autênticas e transformadoras com seu parceiro.",
-        "Sagitário": "Aventureiro no amor. Procure parceiros que compartilhem sua sede de aventura e crescimento pessoal.",
-        "Capricórnio": "Sério e comprometido nos relacionamentos. Valorize parceiros que tenham metas similares e maturidade emocional.",
-        "Aquário": "Valoriza amizade no relacionamento. Procure parceiros que respeitem sua independência e ideais humanitários.",
-        "Peixes": "Romântico e intuitivo. Busque parceiros que compreendam sua sensibilidade e mundo interior."
-    }
-    
-    espiritualidade = {
-        "Áries": "Sua espiritualidade é dinâmica. Pratique meditação ativa, artes marciais ou rituais de fogo.",
-        "Touro": "Conecte-se com a natureza. Jardinagem, caminhadas e práticas que envolvam os sentidos nutrem sua alma.",
-        "Gêmeos": "Explore diferentes tradições espirituais. Leitura, debates filosóficos e práticas variadas enriquecem sua jornada.",
-        "Câncer": "Sua espiritualidade é intuitiva. Práticas lunares, trabalho com água e conexão ancestral são importantes.",
-        "Leão": "Expressão criativa é sua forma de espiritualidade. Arte, música e rituais solares elevam sua energia.",
-        "Virgem": "Espiritualidade prática e de serviço. Voluntariado, cura natural e práticas organizadas ressoam com você.",
-        "Libra": "Busque equilíbrio espiritual. Práticas harmoniosas, arte sacra e trabalho em grupo nutrem sua alma.",
-        "Escorpião": "Espiritualidade transformadora. Práticas de renascimento, xamanismo e mistérios profundos o atraem.",
-        "Sagitário": "Explorador espiritual. Filosofias elevadas, viagens sagradas e ensino espiritual são seu caminho.",
-        "Capricórnio": "Espiritualidade estruturada. Tradições antigas, disciplina espiritual e práticas consistentes o sustentam.",
-        "Aquário": "Espiritualidade futurista. Práticas inovadoras, trabalho grupal e ideais humanitários elevam sua consciência.",
-        "Peixes": "Espiritualidade fluida e compassiva. Meditação, arte espiritual e serviço aos necessitados são seu caminho."
-    }
-    
+def sugestoes_por_mapa(signo, ascendente, planeta_dominante, locale=None):
+    catalogo = obter_catalogo(locale)
     return {
-        "carreira": carreiras.get(signo, "Explore áreas que ressoem com sua essência única."),
-        "amor": amor.get(signo, "Seja autêntico em seus relacionamentos."),
-        "espiritualidade": espiritualidade.get(signo, "Conecte-se com práticas que elevem sua alma.")
+        "carreira": catalogo.texto_signo("carreira", signo),
+        "amor": catalogo.texto_signo("amor", signo),
+        "espiritualidade": catalogo.texto_signo("espiritualidade", signo)
     }
 
-def calcular_nodos_lunares(data_nascimento):
+def calcular_nodos_lunares(data_nascimento, flags=FLAGS_PADRAO):
     try:
         jd = swe.julday(data_nascimento.year, data_nascimento.month, data_nascimento.day, 
                        data_nascimento.hour + data_nascimento.minute/60.0)
-        nodo_norte, _ = swe.calc_ut(jd, swe.MEAN_NODE)
+        nodo_norte, _ = calcular_posicao(jd, swe.MEAN_NODE, flags)
         nodo_sul_grau = (nodo_norte[0] + 180) % 360
         
         return {
@@ -321,69 +289,173 @@ def calcular_nodos_lunares(data_nascimento):
     except:
         return {"Nodo Norte": {"signo": "Capricórnio", "grau": 270}, "Nodo Sul": {"signo": "Câncer", "grau": 90}}
 
-def integrar_fase_lua_no_retorno(data_nascimento):
-    fase = calcular_fase_lua(data_nascimento)
+def integrar_fase_lua_no_retorno(data_nascimento, flags=FLAGS_PADRAO):
+    fase = calcular_fase_lua(data_nascimento, flags)
     mensagem = datas_favoraveis_fase_lua(fase)
     return {
         "fase_lua_natal": fase,
         "mensagem": mensagem
     }
 
-def gerar_resultado_final(dados, ascendente_signo, meio_ceu_signo, numero_sorte, nomes_sugeridos,
-                         signo_solar, perfil_resumido, sugestao_carreira, sugestao_amor,
-                         sugestao_espiritual, nodos, sol, resultado_planetas, aspectos,
-                         casas_astrologicas, planeta_dominante):
+class CalculoMapa:
+    """Etapas do mapa calculadas sob demanda e no máximo uma vez, conforme as seções pedidas"""
 
-    fase_lua_info = integrar_fase_lua_no_retorno(dados.data_nascimento)
+    def __init__(self, dados, lat, lon, flags=FLAGS_PADRAO, locale=None, modo_efemeride=None):
+        self.dados = dados
+        self.lat = lat
+        self.lon = lon
+        self.flags = flags
+        self.locale = locale
+        self.modo_efemeride = modo_efemeride
+        # Cálculos astronômicos em UT; a data local segue nos campos de exibição e no número da sorte
+        self.data_calculo = dados.data_utc or dados.data_nascimento
 
+    @cached_property
+    def ascendente(self):
+        return calcular_ascendente(self.lat, self.lon, self.data_calculo)
+
+    @cached_property
+    def meio_ceu(self):
+        return calcular_meio_ceu(self.lat, self.lon, self.data_calculo)
+
+    @cached_property
+    def signo_solar(self):
+        return calcular_signo_solar(self.data_calculo, self.flags)
+
+    @cached_property
+    def planetas(self):
+        return calcular_planetas(self.data_calculo, self.flags)
+
+    @cached_property
+    def aspectos(self):
+        return calcular_aspectos(self.planetas)
+
+    @cached_property
+    def casas(self):
+        return calcular_casas(self.lat, self.lon, self.data_calculo)
+
+    @cached_property
+    def planeta_dominante(self):
+        return descobrir_planeta_dominante(self.planetas)
+
+    @cached_property
+    def nodos(self):
+        return calcular_nodos_lunares(self.data_calculo, self.flags)
+
+    @cached_property
+    def pontos_sensiveis(self):
+        """Longitudes dos planetas, do Nodo Norte, do Ascendente e do Meio do Céu (pontos médios e harmônicos)"""
+        pontos = {p["planeta"]: p["grau"] for p in self.planetas}
+        pontos["Nodo Norte"] = self.nodos["Nodo Norte"]["grau"]
+        cuspides = {c["numero"]: c["grau"] for c in self.casas}
+        pontos["Ascendente"], pontos["Meio do Céu"] = cuspides[1], cuspides[10]
+        return pontos
+
+    @cached_property
+    def sol(self):
+        return next((p for p in self.planetas if p['planeta'] == "Sol"), {"signo": self.signo_solar})
+
+    @cached_property
+    def fase_lua(self):
+        return integrar_fase_lua_no_retorno(self.dados.data_nascimento, self.flags)
+
+    @cached_property
+    def sugestoes(self):
+        return sugestoes_por_mapa(self.signo_solar, self.ascendente, self.planeta_dominante, self.locale)
+
+def montar_sugestoes(calculo):
+    sugestoes = calculo.sugestoes
     return {
-        "nome": dados.nome,
-        "data": dados.data_nascimento.strftime("%d/%m/%Y"),
-        "hora": dados.hora_nascimento,
-        "local": dados.local_nascimento,
-        "ascendente": ascendente_signo,
-        "meio_do_ceu": meio_ceu_signo,
-        "numero_da_sorte": numero_sorte,
-        "nomes_sugeridos": nomes_sugeridos,
-        "signo_solar": signo_solar,
-        "perfil_resumido": perfil_resumido,
-        "sugestoes": {
-            "carreira": sugestao_carreira,
-            "amor": sugestao_amor,
-            "espiritualidade": sugestao_espiritual,
-            "nodo_lunar": interpretar_nodo_lunar(nodos),
-            "missao_de_vida": identificar_missao(sol, nodos, meio_ceu_signo),
-            "potenciais_ocultos": detectar_potenciais(aspectos, casas_astrologicas)
-        },
-        "fase_lua": fase_lua_info,
-        "planetas": resultado_planetas,
-        "aspectos": aspectos,
-        "casas": casas_astrologicas,
-        "mapa_completo": gerar_interpretacao_mapa_completa(signo_solar, ascendente_signo, meio_ceu_signo, planeta_dominante, aspectos, casas_astrologicas),
-        "alertas": gerar_alertas_de_cuidado(aspectos)
+        "carreira": sugestoes['carreira'],
+        "amor": sugestoes['amor'],
+        "espiritualidade": sugestoes['espiritualidade'],
+        "nodo_lunar": interpretar_nodo_lunar(calculo.nodos),
+        "missao_de_vida": identificar_missao(calculo.sol, calculo.nodos, calculo.meio_ceu),
+        "potenciais_ocultos": detectar_potenciais(calculo.aspectos, calculo.casas)
     }
 
-def gerar_mapa_astral_completo(dados_usuario, lat, lon):
+# Seções do resultado, na ordem da resposta; cada uma só dispara os cálculos de que depende
+def montar_pontos_medios(calculo):
+    # Importado aqui: o numpy só entra no processo da CLI quando a seção é pedida
+    from pontos_medios import descrever_pontos_medios
+    return descrever_pontos_medios(calculo.pontos_sensiveis)
+
+def montar_harmonicos(calculo):
+    from pontos_medios import descrever_harmonicos
+    return descrever_harmonicos(calculo.pontos_sensiveis, SIGNOS)
+
+def montar_hora_desconhecida(calculo):
+    # Importado aqui: hora_desconhecida usa as tabelas deste módulo (e o numpy)
+    from hora_desconhecida import varrer_dia
+    return varrer_dia(calculo.dados.data_nascimento, calculo.lat, calculo.lon, calculo.modo_efemeride)
+
+SECOES_RESULTADO = {
+    "nome": lambda c: c.dados.nome,
+    "data": lambda c: c.dados.data_nascimento.strftime("%d/%m/%Y"),
+    "hora": lambda c: c.dados.hora_nascimento,
+    "local": lambda c: c.dados.local_nascimento,
+    "ascendente": lambda c: c.ascendente,
+    "meio_do_ceu": lambda c: c.meio_ceu,
+    "numero_da_sorte": lambda c: gerar_numero_sorte(c.dados.data_nascimento),
+    "nomes_sugeridos": lambda c: gerar_nomes_sugeridos(c.signo_solar, c.locale),
+    "signo_solar": lambda c: c.signo_solar,
+    "perfil_resumido": lambda c: gerar_perfil_resumido(c.signo_solar, c.ascendente, c.planeta_dominante, c.locale),
+    "sugestoes": montar_sugestoes,
+    "fase_lua": lambda c: c.fase_lua,
+    "planetas": lambda c: c.planetas,
+    "aspectos": lambda c: c.aspectos,
+    "casas": lambda c: c.casas,
+    "mapa_completo": lambda c: gerar_interpretacao_mapa_completa(
+        c.signo_solar, c.ascendente, c.meio_ceu, c.planeta_dominante, c.aspectos, c.casas
+    ),
+    "alertas": lambda c: gerar_alertas_de_cuidado(c.aspectos),
+    "pontos_medios": montar_pontos_medios,
+    "harmonicos": montar_harmonicos,
+    # Impressão de cada seção de texto gerada pelo chamador, para reaproveitar textos entre mapas
+    "impressoes": lambda c: gerar_impressoes(caracteristicas_interpretacao(
+        c.signo_solar, c.ascendente, c.meio_ceu, c.planetas, c.aspectos, c.planeta_dominante,
+        c.fase_lua["fase_lua_natal"], c.locale
+    )),
+    # Dia inteiro em intervalos (signos, ascendente e casas) para quem não sabe a hora de nascimento
+    "hora_desconhecida": montar_hora_desconhecida
+}
+
+# Só saem quando pedidas em "fields", fora do mapa padrão da CLI: a leitura avançada e a varredura
+# do dia (que o mapa padrão inclui quando a hora não é conhecida)
+SECOES_SOB_DEMANDA = {"pontos_medios", "harmonicos", "hora_desconhecida"}
+
+def selecionar_secoes(campos, disponiveis, sob_demanda=()):
+    """Seções pedidas em "fields" (lista ou texto separado por vírgulas); vazio = todas menos as sob demanda"""
+    if not campos:
+        return set(disponiveis) - set(sob_demanda)
+    if isinstance(campos, str):
+        campos = campos.split(",")
+    pedidas = {campo.strip() for campo in campos if campo.strip()}
+    invalidas = pedidas - set(disponiveis)
+    if invalidas:
+        raise ValueError(f"Seções inválidas: {', '.join(sorted(invalidas))}")
+    return pedidas or set(disponiveis) - set(sob_demanda)
+
+def gerar_resultado_final(calculo, secoes=None):
+    """Monta o resultado apenas com as seções pedidas (todas por padrão)"""
+    return {
+        nome: montar(calculo)
+        for nome, montar in SECOES_RESULTADO.items()
+        if secoes is None or nome in secoes
+    }
+
+def gerar_mapa_astral_completo(dados_usuario, lat, lon, locale=None, modo_efemeride=None, secoes=None):
     """Função principal que orquestra todo o cálculo do mapa astral"""
-    asc = calcular_ascendente(lat, lon, dados_usuario.data_nascimento)
-    mc = calcular_meio_ceu(lat, lon, dados_usuario.data_nascimento)
-    ss = calcular_signo_solar(dados_usuario.data_nascimento)
-    planetas = calcular_planetas(dados_usuario.data_nascimento)
-    aspectos = calcular_aspectos(planetas)
-    casas = calcular_casas(lat, lon, dados_usuario.data_nascimento)
-    dominante = descobrir_planeta_dominante(planetas)
-    nomes = gerar_nomes_sugeridos(ss)
-    sorte = gerar_numero_sorte(dados_usuario.data_nascimento)
-    perfil = gerar_perfil_resumido(ss, asc, dominante)
-    sugestoes = sugestoes_por_mapa(ss, asc, dominante)
-    nodos = calcular_nodos_lunares(dados_usuario.data_nascimento)
-    sol = next((p for p in planetas if p['planeta'] == "Sol"), {"signo": ss})
-
-    return gerar_resultado_final(
-        dados_usuario, asc, mc, sorte, nomes, ss, perfil,
-        sugestoes['carreira'], sugestoes['amor'], sugestoes['espiritualidade'],
-        nodos, sol, planetas, aspectos, casas, dominante
-    )
+    # Escolhido antes dos cálculos: no modo "swiss" sem cobertura, falha em vez de usar dados de fallback
+    data_calculo = dados_usuario.data_utc or dados_usuario.data_nascimento
+    flags, motor = escolher_motor(calcular_dia_juliano(data_calculo), modo_efemeride)
+    calculo = CalculoMapa(dados_usuario, lat, lon, flags, locale, modo_efemeride)
+
+    resultado = gerar_resultado_final(calculo, secoes)
+    resultado["efemeride"] = {"modo": modo_efemeride or "auto", "motor": motor}
+    if dados_usuario.fuso_horario:
+        resultado["fuso_horario"] = dados_usuario.fuso_horario
+    return resultado
 
 def processar_mapa_astral(dados_json):
     """Função para processar dados vindos do frontend"""
@@ -394,10 +466,19 @@ def processar_mapa_astral(dados_json):
             
         nome = dados_json.get('nome', '')
         data_str = dados_json.get('data_nascimento', '')
-        hora_str = dados_json.get('hora_nascimento', '12:00')
+        hora_str = dados_json.get('hora_nascimento') or ''
+        # Sem a hora o mapa continua sendo calculado ao meio-dia, mas marcado e com a varredura do dia
+        hora_desconhecida = bool(dados_json.get('hora_desconhecida')) or not hora_str.strip()
+        if hora_desconhecida:
+            hora_str = HORA_PADRAO
         local = dados_json.get('local_nascimento', '')
         lat = dados_json.get('latitude', -23.5505)
         lon = dados_json.get('longitude', -46.6333)
+        locale = dados_json.get('locale')
+        modo_efemeride = dados_json.get('modo_efemeride')
+        secoes = selecionar_secoes(dados_json.get('fields'), SECOES_RESULTADO, SECOES_SOB_DEMANDA)
+        if hora_desconhecida and not dados_json.get('fields'):
+            secoes.add("hora_desconhecida")
         
         # Converter data
         data_nascimento = datetime.strptime(data_str, '%Y-%m-%d')
@@ -408,17 +489,20 @@ def processar_mapa_astral(dados_json):
             hour=int(hora_parts[0]), 
             minute=int(hora_parts[1]) if len(hora_parts) > 1 else 0
         )
+        data_utc, fuso, _ = local_para_utc(data_nascimento, lat, lon)
         
         # Criar objeto de dados do usuário
         dados_usuario = DadosUsuario(
             nome=nome,
             data_nascimento=data_nascimento,
             hora_nascimento=hora_str,
-            local_nascimento=local
+            local_nascimento=local,
+            data_utc=data_utc,
+            fuso_horario=fuso
         )
         
         # Gerar o mapa astral completo
-        resultado = gerar_mapa_astral_completo(dados_usuario, lat, lon)
+        resultado = gerar_mapa_astral_completo(dados_usuario, lat, lon, locale, modo_efemeride, secoes)
         
         return {"success": True, "data": resultado}
         
@@ -0,0 +1,76 @@
+"""Linhas de astrocartografia: onde cada corpo estava angular (ASC, DSC, MC, IC) no instante do nascimento."""
+import numpy as np
+import swisseph as swe
+
+from astral_api_advanced import PLANETAS_SWE
+from efemerides import escolher_motor, calcular_posicao
+
+ANGULOS = ("MC", "IC", "ASC", "DSC")
+RESOLUCAO_MINIMA = 0.1
+LATITUDE_LIMITE = 89.0
+
+def calcular_coordenadas_equatoriais(julian_day, flags, corpos=PLANETAS_SWE):
+    """Ascensão reta e declinação (radianos) de cada corpo, calculadas uma única vez por mapa"""
+    ascensoes, declinacoes = [], []
+    for corpo, _ in corpos:
+        pos, _ = calcular_posicao(julian_day, corpo, flags | swe.FLG_EQUATORIAL)
+        ascensoes.append(pos[0])
+        declinacoes.append(pos[1])
+    return np.radians(ascensoes), np.radians(declinacoes)
+
+def calcular_longitudes_linhas(julian_day, flags, latitudes, corpos=PLANETAS_SWE):
+    """Longitude geográfica (graus, -180..180) das linhas de cada corpo em cada latitude.
+
+    Retorna um array (corpos, 4, latitudes) na ordem de ANGULOS; NaN onde o corpo não cruza o horizonte
+    (circumpolar ou sempre abaixo). Todas as latitudes e corpos são resolvidos de uma vez.
+    """
+    ascensao, declinacao = calcular_coordenadas_equatoriais(julian_day, flags, corpos)
+    # No MC o tempo sidéreo local é a ascensão reta do corpo
+    meio_ceu = ascensao - np.radians(swe.sidtime(julian_day) * 15)
+    # No horizonte: cos H = -tan(latitude) tan(declinação); nascendo em -H, pondo-se em +H
+    cos_horario = -np.tan(np.radians(latitudes))[None, :] * np.tan(declinacao)[:, None]
+    horario = np.where(np.abs(cos_horario) <= 1, np.arccos(np.clip(cos_horario, -1, 1)), np.nan)
+
+    linhas = np.empty((len(corpos), len(ANGULOS), len(latitudes)))
+    linhas[:, 0] = meio_ceu[:, None]
+    linhas[:, 1] = meio_ceu[:, None] + np.pi
+    linhas[:, 2] = meio_ceu[:, None] - horario
+    linhas[:, 3] = meio_ceu[:, None] + horario
+    return (np.degrees(linhas) + 180) % 360 - 180
+
+def segmentar(latitudes, longitudes, lon_min, lon_max):
+    """Quebra uma linha em polilinhas [[lat, lon], ...] dentro da caixa, separando no antimeridiano"""
+    valido = np.isfinite(longitudes) & (longitudes >= lon_min) & (longitudes <= lon_max)
+    salto = np.abs(np.diff(longitudes)) > 180
+    # Um novo trecho começa após um ponto fora da caixa ou quando a linha atravessa o antimeridiano
+    inicio = np.r_[True, ~valido[:-1] | salto]
+    grupo = np.cumsum(inicio)[valido]
+    pontos = np.column_stack([latitudes, longitudes])[valido]
+    cortes = np.flatnonzero(np.diff(grupo)) + 1
+    return [trecho.round(4).tolist() for trecho in np.split(pontos, cortes) if len(trecho) >= 2]
+
+def gerar_astrocartografia(julian_day, resolucao=1.0, lat_min=-80.0, lat_max=80.0, lon_min=-180.0, lon_max=180.0,
+                           modo_efemeride=None, corpos=PLANETAS_SWE):
+    """Polilinhas ASC/DSC/MC/IC de cada corpo na caixa informada, com um ponto a cada `resolucao` graus de latitude"""
+    if resolucao < RESOLUCAO_MINIMA:
+        raise ValueError(f"Resolução mínima: {RESOLUCAO_MINIMA}°")
+    lat_min, lat_max = max(lat_min, -LATITUDE_LIMITE), min(lat_max, LATITUDE_LIMITE)
+    if lat_min >= lat_max or not -180 <= lon_min < lon_max <= 180:
+        raise ValueError("Caixa de coordenadas inválida")
+
+    flags, motor = escolher_motor(julian_day, modo_efemeride)
+    latitudes = np.linspace(lat_min, lat_max, int(round((lat_max - lat_min) / resolucao)) + 1)
+    longitudes = calcular_longitudes_linhas(julian_day, flags, latitudes, corpos)
+
+    linhas = []
+    for i, (_, nome) in enumerate(corpos):
+        for j, angulo in enumerate(ANGULOS):
+            segmentos = segmentar(latitudes, longitudes[i, j], lon_min, lon_max)
+            if segmentos:
+                linhas.append({"planeta": nome, "angulo": angulo, "segmentos": segmentos})
+    return {
+        "resolucao": resolucao,
+        "caixa": {"lat_min": lat_min, "lat_max": lat_max, "lon_min": lon_min, "lon_max": lon_max},
+        "linhas": linhas,
+        "efemeride": {"modo": modo_efemeride or "auto", "motor": motor}
+    }
@@ -0,0 +1,68 @@
+"""ETags determinísticos e Cache-Control para as respostas de cálculo.
+
+O ETag é o hash das entradas normalizadas e da versão do motor (Swiss Ephemeris, arquivos de efeméride,
+tzdata, grade de fusos, catálogo de estrelas e formato da resposta): a mesma entrada com o mesmo motor
+gera sempre o mesmo corpo, então o If-None-Match pode ser respondido com 304 antes de qualquer cálculo.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytz
+import swisseph as swe
+
+from efemerides import estado as estado_efemerides
+from estrelas_fixas import ARQUIVO_ESTRELAS
+from fusos_horarios import ARQUIVO_GRADE
+
+# Incrementar quando o formato ou os cálculos da resposta mudarem
+VERSAO_RESPOSTA = "1"
+
+# O mapa natal não muda: pode ficar em cache por muito tempo (revalidação é barata com o ETag)
+MAX_AGE_MAPA = int(os.environ.get("CACHE_MAPA_SEGUNDOS", 30 * 24 * 3600))
+FUSO_PREVISAO = pytz.timezone("America/Sao_Paulo")
+
+versao_motor = {}
+
+def obter_versao_motor():
+    """Assinatura de tudo que, além das entradas, altera o resultado; calculada uma vez"""
+    if "assinatura" not in versao_motor:
+        with open(ARQUIVO_GRADE, "rb") as arquivo:
+            grade = hashlib.sha256(arquivo.read()).hexdigest()[:16]
+        with open(ARQUIVO_ESTRELAS, "rb") as arquivo:
+            estrelas = hashlib.sha256(arquivo.read()).hexdigest()[:16]
+        partes = [
+            VERSAO_RESPOSTA,
+            swe.version,
+            sorted(os.path.basename(caminho) for caminho in estado_efemerides["arquivos"]),
+            pytz.OLSON_VERSION,
+            grade,
+            estrelas
+        ]
+        versao_motor["assinatura"] = hashlib.sha256(json.dumps(partes).encode()).hexdigest()[:16]
+    return versao_motor["assinatura"]
+
+def gerar_etag(*partes):
+    """ETag forte a partir de partes serializáveis em JSON (a ordem das chaves não importa)"""
+    conteudo = json.dumps([obter_versao_motor(), *partes], sort_keys=True, ensure_ascii=False, default=str)
+    return '"' + hashlib.sha256(conteudo.encode()).hexdigest()[:32] + '"'
+
+def etag_confere(if_none_match, etag):
+    """Comparação fraca do If-None-Match (RFC 9110): aceita lista, "*" e o prefixo W/"""
+    if not if_none_match:
+        return False
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato == "*" or candidato.removeprefix("W/") == etag:
+            return True
+    return False
+
+def cabecalhos_cache(etag, max_age):
+    return {"ETag": etag, "Cache-Control": f"public, max-age={max_age}"}
+
+def segundos_ate_virada_do_dia(agora=None):
+    """Validade da previsão diária: até a meia-noite no horário de Brasília"""
+    agora = agora or datetime.now(FUSO_PREVISAO)
+    amanha = FUSO_PREVISAO.localize(datetime.combine(agora.date() + timedelta(days=1), datetime.min.time()))
+    return max(1, int((amanha - agora).total_seconds()))
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""Calendário de aspectos mundiais: todos os aspectos exatos entre corpos em trânsito, pré-calculados.
+
+A geração (CLI deste módulo) resolve as raízes sobre uma efeméride diária interpolada e grava um arquivo
+ordenado por data; as consultas leem o arquivo mapeado em memória, sem nenhuma chamada à efeméride.
+"""
+import argparse
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+import swisseph as swe
+
+from astral_api_advanced import PLANETAS_SWE, ASPECTOS_GRAUS
+from efemerides import MODO_MOSHIER, escolher_motor, calcular_posicao
+
+ARQUIVO_CALENDARIO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "calendario", "aspectos_mundiais.npy")
+
+# A ordem define os códigos gravados no arquivo: só acrescentar no final
+CORPOS = PLANETAS_SWE + [(swe.MEAN_NODE, "Nodo Norte")]
+NOMES_CORPOS = [nome for _, nome in CORPOS]
+NOMES_ASPECTOS = list(ASPECTOS_GRAUS.keys())
+# Separação (corpo1 - corpo2, 0-360) de cada aspecto exato: os não simétricos ocorrem nas duas fases
+ANGULOS = [(angulo, NOMES_ASPECTOS.index(nome)) for nome, grau in ASPECTOS_GRAUS.items()
+           for angulo in sorted({grau, (360 - grau) % 360})]
+
+# 12 bytes por evento
+TIPO_EVENTO = np.dtype([("jd", "<f8"), ("corpo1", "u1"), ("corpo2", "u1"), ("aspecto", "u1"), ("marcas", "u1")])
+MARCA_MINGUANTE = 1     # separação acima de 180° (ex.: o segundo sextil do ciclo)
+MARCA_RETRO_1 = 2
+MARCA_RETRO_2 = 4
+
+ITERACOES_REFINO = 30
+JD_J2000 = 2451545.0
+DATA_J2000 = datetime(2000, 1, 1, 12)
+
+def amostrar_corpo(argumentos):
+    """Longitude e velocidade diárias de um corpo (executado nos processos trabalhadores)"""
+    corpo, jd_inicio, dias, flags = argumentos
+    posicoes = np.array([calcular_posicao(jd_inicio + d, corpo, flags)[0][:4] for d in range(dias)])
+    return np.unwrap(posicoes[:, 0], period=360), posicoes[:, 3]
+
+def hermite(longitudes, velocidades, jd_inicio, t):
+    x = t - jd_inicio
+    i = np.clip(np.floor(x).astype(np.int64), 0, len(longitudes) - 2)
+    s = x - i
+    s2, s3 = s * s, s * s * s
+    return ((2 * s3 - 3 * s2 + 1) * longitudes[i] + (s3 - 2 * s2 + s) * velocidades[i]
+            + (-2 * s3 + 3 * s2) * longitudes[i + 1] + (s3 - s2) * velocidades[i + 1])
+
+def aspectos_do_par(efemeride, jd_inicio, a, b):
+    """Aspectos exatos entre os corpos a e b: (instantes, códigos de aspecto, marcas de fase)"""
+    (longitudes_a, velocidades_a), (longitudes_b, velocidades_b) = efemeride[a], efemeride[b]
+    separacao = lambda t: hermite(longitudes_a, velocidades_a, jd_inicio, t) - hermite(longitudes_b, velocidades_b, jd_inicio, t)
+    dias = jd_inicio + np.arange(len(longitudes_a), dtype=float)
+
+    # Onde a velocidade relativa troca de sinal (estações) a separação tem um extremo: ele entra
+    # como amostra extra para que cada trecho entre amostras seja monótono
+    relativa = velocidades_a - velocidades_b
+    troca = np.flatnonzero(np.sign(relativa[1:]) != np.sign(relativa[:-1]))
+    extremos = dias[troca] + relativa[troca] / (relativa[troca] - relativa[troca + 1])
+    tempos = np.sort(np.concatenate([dias, extremos]))
+    valores = separacao(tempos)
+
+    instantes, aspectos, marcas = [], [], []
+    for angulo, aspecto in ANGULOS:
+        voltas_antes = np.floor((valores[:-1] - angulo) / 360)
+        voltas_depois = np.floor((valores[1:] - angulo) / 360)
+        indices = np.flatnonzero(voltas_antes != voltas_depois)
+        if not len(indices):
+            continue
+        alvos = angulo + np.maximum(voltas_antes[indices], voltas_depois[indices]) * 360
+        baixo, alto = tempos[indices], tempos[indices + 1]
+        crescente = valores[indices + 1] > valores[indices]
+        for _ in range(ITERACOES_REFINO):
+            meio = (baixo + alto) / 2
+            passou = (separacao(meio) >= alvos) == crescente
+            baixo = np.where(passou, baixo, meio)
+            alto = np.where(passou, meio, alto)
+        instantes.append((baixo + alto) / 2)
+        aspectos.append(np.full(len(indices), aspecto))
+        marcas.append(np.full(len(indices), MARCA_MINGUANTE if angulo > 180 else 0))
+    if not instantes:
+        return np.empty(0), np.empty(0, dtype=int), np.empty(0, dtype=int)
+    return np.concatenate(instantes), np.concatenate(aspectos), np.concatenate(marcas)
+
+def gerar_calendario(ano_inicio=1900, ano_fim=2100, modo_efemeride=None, processos=None):
+    """Todos os aspectos maiores exatos entre os CORPOS de 1º de janeiro de ano_inicio a 31 de dezembro de ano_fim"""
+    jd_inicio = swe.julday(ano_inicio, 1, 1, 0.0)
+    jd_fim = swe.julday(ano_fim + 1, 1, 1, 0.0)
+    flags, motor = escolher_motor(jd_inicio, modo_efemeride)
+    if escolher_motor(jd_fim, modo_efemeride)[1] != motor:
+        # Um único motor no intervalo inteiro, para não haver degraus nas longitudes
+        flags, motor = escolher_motor(jd_inicio, MODO_MOSHIER)
+    dias = int(jd_fim - jd_inicio) + 2
+
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        efemeride = list(executor.map(amostrar_corpo, [(corpo, jd_inicio, dias, flags) for corpo, _ in CORPOS]))
+
+    partes = []
+    for a in range(len(CORPOS)):
+        for b in range(a + 1, len(CORPOS)):
+            instantes, aspectos, marcas = aspectos_do_par(efemeride, jd_inicio, a, b)
+            dentro = (instantes >= jd_inicio) & (instantes < jd_fim)
+            instantes, aspectos, marcas = instantes[dentro], aspectos[dentro], marcas[dentro]
+            # Movimento retrógrado de cada corpo no instante exato (velocidade interpolada entre os dias)
+            dia = np.clip((instantes - jd_inicio).astype(np.int64), 0, dias - 2)
+            fracao = instantes - jd_inicio - dia
+            for corpo, marca in ((a, MARCA_RETRO_1), (b, MARCA_RETRO_2)):
+                velocidades = efemeride[corpo][1]
+                velocidade = velocidades[dia] * (1 - fracao) + velocidades[dia + 1] * fracao
+                marcas = marcas | np.where(velocidade < 0, marca, 0)
+            eventos = np.empty(len(instantes), dtype=TIPO_EVENTO)
+            eventos["jd"], eventos["corpo1"], eventos["corpo2"] = instantes, a, b
+            eventos["aspecto"], eventos["marcas"] = aspectos, marcas
+            partes.append(eventos)
+    eventos = np.concatenate(partes)
+    return eventos[np.argsort(eventos["jd"], kind="stable")], motor
+
+def data_de_jd(julian_day):
+    return DATA_J2000 + timedelta(days=float(julian_day) - JD_J2000)
+
+class CalendarioAspectos:
+    """Consulta ao arquivo de eventos (mapeado em memória, ordenado por data)"""
+
+    def __init__(self, caminho=ARQUIVO_CALENDARIO):
+        self.eventos = np.load(caminho, mmap_mode="r")
+        self.jds = self.eventos["jd"]
+
+    def __len__(self):
+        return len(self.eventos)
+
+    def consultar(self, jd_inicio, jd_fim, corpos=None, aspectos=None, limite=None):
+        """Eventos em [jd_inicio, jd_fim) envolvendo algum dos corpos e de algum dos tipos de aspecto"""
+        inicio, fim = np.searchsorted(self.jds, [jd_inicio, jd_fim])
+        fatia = np.asarray(self.eventos[inicio:fim])
+        mascara = np.ones(len(fatia), dtype=bool)
+        if corpos:
+            codigos = [codigo_de(NOMES_CORPOS, nome, "Corpo") for nome in corpos]
+            mascara &= np.isin(fatia["corpo1"], codigos) | np.isin(fatia["corpo2"], codigos)
+        if aspectos:
+            mascara &= np.isin(fatia["aspecto"], [codigo_de(NOMES_ASPECTOS, nome.lower(), "Aspecto") for nome in aspectos])
+        fatia = fatia[mascara][:limite]
+        return [
+            {
+                "data": data_de_jd(evento["jd"]).isoformat(timespec="seconds") + "Z",
+                "corpo1": NOMES_CORPOS[evento["corpo1"]],
+                "corpo2": NOMES_CORPOS[evento["corpo2"]],
+                "aspecto": NOMES_ASPECTOS[evento["aspecto"]],
+                "fase": "minguante" if evento["marcas"] & MARCA_MINGUANTE else "crescente",
+                "retrogrados": [
+                    NOMES_CORPOS[evento[campo]]
+                    for campo, marca in (("corpo1", MARCA_RETRO_1), ("corpo2", MARCA_RETRO_2))
+                    if evento["marcas"] & marca
+                ]
+            }
+            for evento in fatia
+        ]
+
+def codigo_de(nomes, nome, tipo):
+    if nome not in nomes:
+        raise ValueError(f"{tipo} inválido: {nome}")
+    return nomes.index(nome)
+
+calendario = {}
+trava_calendario = threading.Lock()
+
+def obter_calendario():
+    """Calendário carregado na primeira consulta; None se o arquivo ainda não foi gerado"""
+    if "atual" not in calendario:
+        with trava_calendario:
+            if "atual" not in calendario:
+                calendario["atual"] = CalendarioAspectos() if os.path.exists(ARQUIVO_CALENDARIO) else None
+    return calendario["atual"]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera o calendário de aspectos mundiais exatos")
+    parser.add_argument("--inicio", type=int, default=1900, help="Primeiro ano")
+    parser.add_argument("--fim", type=int, default=2100, help="Último ano")
+    parser.add_argument("--modo-efemeride", default=None, help="swiss, moshier ou auto (padrão)")
+    parser.add_argument("--processos", type=int, default=None, help="Processos trabalhadores (padrão: todos os núcleos)")
+    parser.add_argument("--saida", default=ARQUIVO_CALENDARIO, help="Arquivo .npy gerado")
+    args = parser.parse_args()
+
+    eventos, motor = gerar_calendario(args.inicio, args.fim, args.modo_efemeride, args.processos)
+    os.makedirs(os.path.dirname(os.path.abspath(args.saida)), exist_ok=True)
+    np.save(args.saida, eventos)
+    print(f"✅ {len(eventos)} aspectos exatos ({args.inicio}-{args.fim}, motor {motor}) gravados em {args.saida}")
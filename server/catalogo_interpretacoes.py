@@ -0,0 +1,116 @@
+"""Catálogo de textos de interpretação, carregado uma única vez a partir de interpretacoes/<locale>.json."""
+import hashlib
+import json
+import os
+import re
+import threading
+
+DIRETORIO_CATALOGOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "interpretacoes")
+LOCALE_PADRAO = "pt-BR"
+FORMATO_LOCALE = re.compile(r"^[A-Za-z]{2,3}(-[A-Za-z0-9]{2,8})*$")
+
+def carregar_arquivo(locale):
+    with open(os.path.join(DIRETORIO_CATALOGOS, f"{locale}.json"), encoding="utf-8") as arquivo:
+        return json.load(arquivo)
+
+DADOS_PADRAO = carregar_arquivo(LOCALE_PADRAO)
+
+# Códigos inteiros usados como índices: a ordem é a das listas do catálogo padrão
+# (a mesma de SIGNOS, PLANETAS_SWE e ASPECTOS_GRAUS no motor)
+CODIGO_SIGNO = {nome: i for i, nome in enumerate(DADOS_PADRAO["signos"])}
+CODIGO_CORPO = {nome: i for i, nome in enumerate(DADOS_PADRAO["corpos"])}
+CODIGO_ASPECTO = {nome: i for i, nome in enumerate(DADOS_PADRAO["aspectos"])}
+# astral_api.py usa os nomes dos aspectos com inicial maiúscula ("Trígono")
+CODIGO_ASPECTO.update({nome.capitalize(): i for nome, i in list(CODIGO_ASPECTO.items())})
+
+NUM_SIGNOS = len(CODIGO_SIGNO)
+NUM_CORPOS = len(CODIGO_CORPO)
+NUM_ASPECTOS = len(DADOS_PADRAO["aspectos"])
+
+class CatalogoInterpretacoes:
+    """Textos de um locale em tuplas indexadas pelos códigos inteiros; entradas ausentes herdam do catálogo base"""
+
+    def __init__(self, dados, base=None):
+        self.locale = dados.get("locale", LOCALE_PADRAO)
+        # Muda sempre que algum texto muda (entra nos ETags das respostas)
+        conteudo = json.dumps(dados, sort_keys=True, ensure_ascii=False).encode()
+        self.versao = hashlib.sha256((base.versao.encode() if base else b"") + conteudo).hexdigest()[:16]
+
+        self.por_signo = dict(base.por_signo) if base else {}
+        for secao, conteudo in dados.get("por_signo", {}).items():
+            anterior = self.por_signo.get(secao)
+            textos = [congelar(t) for t in conteudo.get("textos", [])]
+            textos += list(anterior[0][len(textos):]) if anterior else [None] * (NUM_SIGNOS - len(textos))
+            padrao = congelar(conteudo.get("padrao", anterior[1] if anterior else None))
+            self.por_signo[secao] = (tuple(t if t is not None else padrao for t in textos), padrao)
+
+        corpo_signo = dados.get("corpo_signo", {})
+        self.padrao_corpo_signo = corpo_signo.get("padrao", base.padrao_corpo_signo if base else "")
+        tabela = list(base.corpo_signo) if base else [self.padrao_corpo_signo] * (NUM_CORPOS * NUM_SIGNOS)
+        for corpo, textos in corpo_signo.get("textos", {}).items():
+            for signo, texto in enumerate(textos):
+                tabela[CODIGO_CORPO[corpo] * NUM_SIGNOS + signo] = texto
+        self.corpo_signo = tuple(tabela)
+
+        casas = dados.get("casas", {})
+        self.padrao_casa = casas.get("padrao", base.padrao_casa if base else "")
+        textos = casas.get("textos", [])
+        self.casas = tuple(textos) + (base.casas[len(textos):] if base else (self.padrao_casa,) * (12 - len(textos)))
+
+        aspectos = dados.get("aspectos_entre_corpos", {})
+        self.padrao_aspecto = aspectos.get("padrao", base.padrao_aspecto if base else "")
+        tabela = list(base.aspectos) if base else [self.padrao_aspecto] * (NUM_CORPOS * NUM_CORPOS * NUM_ASPECTOS)
+        for entrada in aspectos.get("textos", []):
+            indice = indice_aspecto(CODIGO_CORPO[entrada["corpo1"]], CODIGO_CORPO[entrada["corpo2"]], CODIGO_ASPECTO[entrada["aspecto"]])
+            tabela[indice] = entrada["texto"]
+        self.aspectos = tuple(tabela)
+
+    def texto_signo(self, secao, signo):
+        textos, padrao = self.por_signo[secao]
+        codigo = CODIGO_SIGNO.get(signo, -1) if isinstance(signo, str) else signo
+        return textos[codigo] if 0 <= codigo < NUM_SIGNOS else padrao
+
+    def texto_corpo_signo(self, corpo, signo):
+        corpo = CODIGO_CORPO.get(corpo, -1) if isinstance(corpo, str) else corpo
+        signo = CODIGO_SIGNO.get(signo, -1) if isinstance(signo, str) else signo
+        if corpo < 0 or not 0 <= signo < NUM_SIGNOS:
+            return self.padrao_corpo_signo
+        return self.corpo_signo[corpo * NUM_SIGNOS + signo]
+
+    def texto_casa(self, casa):
+        return self.casas[casa - 1] if 1 <= casa <= 12 else self.padrao_casa
+
+    def texto_aspecto(self, corpo1, corpo2, aspecto):
+        corpo1 = CODIGO_CORPO.get(corpo1, -1) if isinstance(corpo1, str) else corpo1
+        corpo2 = CODIGO_CORPO.get(corpo2, -1) if isinstance(corpo2, str) else corpo2
+        aspecto = CODIGO_ASPECTO.get(aspecto, -1) if isinstance(aspecto, str) else aspecto
+        if corpo1 < 0 or corpo2 < 0 or aspecto < 0:
+            return self.padrao_aspecto
+        return self.aspectos[indice_aspecto(corpo1, corpo2, aspecto)]
+
+def congelar(valor):
+    """Listas do JSON viram tuplas para poderem ser compartilhadas entre requisições"""
+    return tuple(valor) if isinstance(valor, list) else valor
+
+def indice_aspecto(corpo1, corpo2, aspecto):
+    return (corpo1 * NUM_CORPOS + corpo2) * NUM_ASPECTOS + aspecto
+
+CATALOGO_PADRAO = CatalogoInterpretacoes(DADOS_PADRAO)
+catalogos = {LOCALE_PADRAO: CATALOGO_PADRAO}
+trava_catalogos = threading.Lock()
+
+def obter_catalogo(locale=None):
+    """Retorna o catálogo do locale, carregando o arquivo na primeira vez; sem arquivo, usa o padrão"""
+    if not locale or not FORMATO_LOCALE.match(locale):
+        return CATALOGO_PADRAO
+    catalogo = catalogos.get(locale)
+    if catalogo is None:
+        with trava_catalogos:
+            catalogo = catalogos.get(locale)
+            if catalogo is None:
+                try:
+                    catalogo = CatalogoInterpretacoes(carregar_arquivo(locale), base=CATALOGO_PADRAO)
+                except FileNotFoundError:
+                    catalogo = CATALOGO_PADRAO
+                catalogos[locale] = catalogo
+    return catalogo
@@ -0,0 +1,132 @@
+"""Transmissão do "céu agora" (posições, fase da Lua e aspectos ativos) para muitos clientes.
+
+Um único laço calcula o céu uma vez por intervalo e codifica o quadro uma vez (SSE e texto para
+WebSocket); todos os clientes recebem os mesmos bytes. Entre um intervalo e outro vai só o delta: os
+campos que mudaram (pelo caminho "planetas.Lua.grau") e os que deixaram de existir (um aspecto que se
+desfez). Quem se conecta recebe primeiro o quadro completo mais recente; um cliente lento demais para
+acompanhar tem a fila descartada e recebe de novo o quadro completo, sem travar os demais. O laço só
+roda enquanto houver clientes.
+"""
+import asyncio
+import json
+import os
+import time
+
+INTERVALO_CEU = float(os.environ.get("CEU_INTERVALO", 10))
+MAX_FILA_CLIENTE = 8
+BATIMENTO_SSE = b": batimento\n\n"
+
+def achatar(valor, prefixo=""):
+    """{"planetas": {"Sol": {"grau": 1}}} -> {"planetas.Sol.grau": 1}; listas são valores inteiros"""
+    if not isinstance(valor, dict):
+        return {prefixo: valor}
+    campos = {}
+    for chave, filho in valor.items():
+        campos.update(achatar(filho, f"{prefixo}.{chave}" if prefixo else str(chave)))
+    return campos
+
+def calcular_delta(anterior, atual):
+    """Campos alterados ou novos e campos removidos entre dois quadros achatados"""
+    alterados = {caminho: valor for caminho, valor in atual.items() if anterior.get(caminho, ...) != valor}
+    removidos = [caminho for caminho in anterior if caminho not in atual]
+    return alterados, removidos
+
+class Quadro:
+    """Mensagem já codificada uma vez nos dois formatos de saída"""
+
+    def __init__(self, tipo, sequencia, conteudo):
+        self.tipo = tipo
+        self.sequencia = sequencia
+        self.texto = json.dumps({"tipo": tipo, "seq": sequencia, **conteudo}, ensure_ascii=False, separators=(",", ":"))
+        self.sse = f"id: {sequencia}\nevent: {tipo}\ndata: {self.texto}\n\n".encode()
+
+class TransmissorCeu:
+    """Laço de cálculo e lista de clientes (filas asyncio), usados apenas no loop de eventos"""
+
+    def __init__(self, calcular, intervalo=INTERVALO_CEU):
+        self.calcular = calcular
+        self.intervalo = intervalo
+        self.clientes = set()
+        self.tarefa = None
+        # Cálculo em andamento fora do laço; quem chega durante ele espera o mesmo resultado
+        self.atualizacao = None
+        self.sequencia = 0
+        self.ceu = None
+        self.campos = {}
+        self.completo = None
+        self.calculado_em = 0.0
+        self.contadores = {"calculos": 0, "deltas": 0, "descartes": 0}
+
+    async def atualizar(self):
+        """Calcula o céu (numa thread) e devolve o delta codificado, ou None se nada mudou"""
+        ceu = await asyncio.to_thread(self.calcular)
+        campos = achatar(ceu)
+        alterados, removidos = calcular_delta(self.campos, campos)
+        self.contadores["calculos"] += 1
+        self.calculado_em = time.monotonic()
+        if not alterados and not removidos and self.completo is not None:
+            return None
+        self.sequencia += 1
+        self.ceu, self.campos = ceu, campos
+        self.completo = Quadro("completo", self.sequencia, {"ceu": ceu})
+        return Quadro("delta", self.sequencia, {"alterados": alterados, "removidos": removidos})
+
+    async def laco(self):
+        # Começa dormindo: quem iniciou o laço acabou de receber um quadro recém-calculado
+        try:
+            while True:
+                await asyncio.sleep(max(0.0, self.intervalo - (time.monotonic() - self.calculado_em)))
+                if not self.clientes:
+                    break
+                delta = await self.atualizar()
+                for fila in list(self.clientes):
+                    self.entregar(fila, delta)
+                self.contadores["deltas"] += delta is not None
+        finally:
+            self.tarefa = None
+
+    def entregar(self, fila, quadro):
+        """Enfileira o delta (ou o batimento, se None); cliente atrasado recomeça do quadro completo"""
+        if fila.full():
+            self.contadores["descartes"] += 1
+            while not fila.empty():
+                fila.get_nowait()
+            fila.put_nowait(self.completo)
+            return
+        fila.put_nowait(quadro)
+
+    async def inscrever(self):
+        """Fila do novo cliente, já com o quadro completo mais recente"""
+        fila = asyncio.Queue(MAX_FILA_CLIENTE)
+        await self.atualizar_parado()
+        fila.put_nowait(self.completo)
+        self.clientes.add(fila)
+        if self.tarefa is None:
+            self.tarefa = asyncio.create_task(self.laco())
+        return fila
+
+    def cancelar(self, fila):
+        self.clientes.discard(fila)
+
+    async def instantaneo(self):
+        """Céu atual para quem não usa o stream (no máximo um intervalo de atraso)"""
+        await self.atualizar_parado()
+        return self.ceu
+
+    async def atualizar_parado(self):
+        # Com o laço rodando o quadro nunca passa de um intervalo; recalcular aqui geraria um delta que
+        # os clientes conectados não receberiam
+        if self.tarefa is not None or (self.completo is not None and time.monotonic() - self.calculado_em <= self.intervalo):
+            return
+        if self.atualizacao is None:
+            self.atualizacao = asyncio.create_task(self.atualizar())
+            self.atualizacao.add_done_callback(self.encerrar_atualizacao)
+        # shield: um cliente que desiste no meio não cancela o cálculo dos demais
+        await asyncio.shield(self.atualizacao)
+
+    def encerrar_atualizacao(self, tarefa):
+        if self.atualizacao is tarefa:
+            self.atualizacao = None
+
+    def status(self):
+        return {"clientes": len(self.clientes), "intervalo": self.intervalo, "sequencia": self.sequencia, **self.contadores}
@@ -0,0 +1,248 @@
+"""Gerenciador das efemérides: diretório único, verificação de cobertura dos arquivos .se1 e modo por requisição.
+
+A Swiss Ephemeris guarda configuração de estado (diretório, modo sideral, posição topocêntrica) global no
+processo ou, se compilada com TLS, por thread. Todo acesso a ela passa por aqui: o zodíaco e o observador
+de cada requisição vão num ContextoEfemeride, aplicado junto com o cálculo que depende dele.
+"""
+import mmap
+import os
+import re
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Optional, Tuple
+
+import swisseph as swe
+
+MODO_SWISS = "swiss"      # arquivos .se1 (máxima precisão); erro se não houver cobertura
+MODO_MOSHIER = "moshier"  # modelo analítico embutido, não depende de arquivos
+MODO_AUTO = "auto"        # arquivos quando cobrem a data, Moshier caso contrário
+MODOS = (MODO_SWISS, MODO_MOSHIER, MODO_AUTO)
+
+DIRETORIOS_CANDIDATOS = [
+    os.environ.get("SE_EPHE_PATH", ""),
+    "/usr/share/ephe",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "ephe"),
+    "."
+]
+
+# sepl_18.se1 = planetas de 1800 a 2399; semo_ = Lua; o prefixo "m" indica anos antes de Cristo
+ARQUIVO_EFEMERIDE = re.compile(r"^se(pl|mo)_(m?)(\d{2})\.se1$")
+ANOS_POR_ARQUIVO = 600
+
+class EfemerideIndisponivel(ValueError):
+    pass
+
+estado = {
+    "diretorio": None,
+    "cobertura": {"pl": [], "mo": []},
+    "arquivos": [],
+    "mapeamentos": [],
+    "inicializado": False
+}
+metricas = {"swiss": 0, "moshier": 0, "fallback_moshier": 0}
+trava_metricas = threading.Lock()
+
+AYANAMSAS = {
+    "fagan_bradley": swe.SIDM_FAGAN_BRADLEY,
+    "lahiri": swe.SIDM_LAHIRI,
+    "raman": swe.SIDM_RAMAN,
+    "krishnamurti": swe.SIDM_KRISHNAMURTI,
+    "galactico": swe.SIDM_GALCENT_0SAG
+}
+AYANAMSA_PADRAO = "lahiri"
+
+@dataclass(frozen=True)
+class ContextoEfemeride:
+    """Zodíaco e observador de um cálculo; o padrão (tropical, geocêntrico) não depende de estado global"""
+    ayanamsa: Optional[str] = None                                 # None = zodíaco tropical
+    topocentrico: Optional[Tuple[float, float, float]] = None      # (longitude, latitude, altitude em metros)
+
+    @property
+    def flags(self):
+        return (swe.FLG_SIDEREAL if self.ayanamsa else 0) | (swe.FLG_TOPOCTR if self.topocentrico else 0)
+
+CONTEXTO_PADRAO = ContextoEfemeride()
+
+def criar_contexto(zodiaco=None, ayanamsa=None, topocentrico=False, lat=0.0, lon=0.0, altitude=0.0):
+    """Contexto validado a partir dos campos da requisição"""
+    zodiaco = zodiaco or "tropical"
+    if zodiaco not in ("tropical", "sideral"):
+        raise ValueError(f"Zodíaco inválido: {zodiaco}")
+    if zodiaco == "sideral":
+        ayanamsa = ayanamsa or AYANAMSA_PADRAO
+        if ayanamsa not in AYANAMSAS:
+            raise ValueError(f"Ayanamsa inválida: {ayanamsa}")
+    else:
+        ayanamsa = None
+    return ContextoEfemeride(ayanamsa, (lon, lat, altitude) if topocentrico else None)
+
+def detectar_estado_por_thread():
+    """True quando a biblioteca foi compilada com estado por thread (TLS): configurações feitas numa
+    thread não valem nas outras. Sondado com duas threads descartáveis, sem tocar na thread atual."""
+    jd = 2451545.0
+    valores = []
+    def configurar():
+        swe.set_sid_mode(swe.SIDM_RAMAN, 0, 0)
+        valores.append(swe.get_ayanamsa_ut(jd))
+    def ler():
+        valores.append(swe.get_ayanamsa_ut(jd))
+    for alvo in (configurar, ler):
+        sonda = threading.Thread(target=alvo)
+        sonda.start()
+        sonda.join()
+    return valores[0] != valores[1]
+
+# Configuração já aplicada à Swiss Ephemeris (diretório, ayanamsa, observador): por thread quando a
+# biblioteca usa TLS; senão compartilhada, e então só lida/alterada com a trava do motor
+ESTADO_POR_THREAD = detectar_estado_por_thread()
+trava_motor = threading.RLock()
+configuracao_thread = threading.local()
+# Sem TLS, a sonda deixou o modo sideral global em Raman
+configuracao_compartilhada = SimpleNamespace(diretorio=None, ayanamsa="raman", topocentrico=None)
+
+def configuracao_atual():
+    if not ESTADO_POR_THREAD:
+        return configuracao_compartilhada
+    if not hasattr(configuracao_thread, "diretorio"):
+        configuracao_thread.__dict__.update(diretorio=None, ayanamsa=None, topocentrico=None)
+    return configuracao_thread
+
+def aplicar_contexto(contexto):
+    """Leva a Swiss Ephemeris (desta thread, com TLS) ao diretório atual e ao contexto; só reaplica o que mudou"""
+    configuracao = configuracao_atual()
+    if estado["diretorio"] and configuracao.diretorio != estado["diretorio"]:
+        swe.set_ephe_path(estado["diretorio"])
+        configuracao.diretorio = estado["diretorio"]
+    if contexto.ayanamsa and configuracao.ayanamsa != contexto.ayanamsa:
+        swe.set_sid_mode(AYANAMSAS[contexto.ayanamsa], 0, 0)
+        configuracao.ayanamsa = contexto.ayanamsa
+    if contexto.topocentrico and configuracao.topocentrico != contexto.topocentrico:
+        swe.set_topo(*contexto.topocentrico)
+        configuracao.topocentrico = contexto.topocentrico
+
+@contextmanager
+def usar_contexto(contexto):
+    """Aplica o contexto e entrega os flags extras para o cálculo feito dentro do bloco.
+
+    Com estado por thread não há disputa: cada thread do pool configura a sua cópia (inclusive o
+    diretório das efemérides, que o set_ephe_path da importação não leva às outras threads). Com estado
+    compartilhado, configurar e calcular acontecem sob a trava, sem outra thread no meio; o contexto
+    padrão não depende do modo sideral nem do observador e dispensa a trava.
+    """
+    if ESTADO_POR_THREAD:
+        aplicar_contexto(contexto)
+        yield contexto.flags
+    elif not contexto.flags:
+        yield 0
+    else:
+        with trava_motor:
+            aplicar_contexto(contexto)
+            yield contexto.flags
+
+def verificar_cobertura(diretorio):
+    """Lista os arquivos .se1 do diretório e os intervalos de anos cobertos por planetas e Lua"""
+    cobertura = {"pl": [], "mo": []}
+    arquivos = []
+    if not os.path.isdir(diretorio):
+        return cobertura, arquivos
+    for nome in sorted(os.listdir(diretorio)):
+        encontrado = ARQUIVO_EFEMERIDE.match(nome)
+        if not encontrado:
+            continue
+        tipo, antes_de_cristo, seculo = encontrado.groups()
+        inicio = int(seculo) * 100 * (-1 if antes_de_cristo else 1)
+        cobertura[tipo].append((inicio, inicio + ANOS_POR_ARQUIVO))
+        arquivos.append(os.path.join(diretorio, nome))
+    return cobertura, arquivos
+
+def pre_carregar(arquivos):
+    """Mapeia os arquivos em memória para que as leituras da Swiss Ephemeris venham do cache de páginas"""
+    mapeamentos = []
+    for caminho in arquivos:
+        with open(caminho, "rb") as arquivo:
+            mapa = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        if hasattr(mapa, "madvise") and hasattr(mmap, "MADV_WILLNEED"):
+            mapa.madvise(mmap.MADV_WILLNEED)
+        mapeamentos.append(mapa)
+    return mapeamentos
+
+def inicializar_efemerides(diretorio=None, pre_carregar_arquivos=True):
+    """Escolhe o diretório das efemérides (o primeiro com arquivos .se1) e verifica a cobertura; idempotente"""
+    if estado["inicializado"] and diretorio is None:
+        return estado
+    candidatos = [diretorio] if diretorio else [d for d in DIRETORIOS_CANDIDATOS if d]
+    escolhido, cobertura, arquivos = candidatos[0], {"pl": [], "mo": []}, []
+    for candidato in candidatos:
+        cobertura, arquivos = verificar_cobertura(candidato)
+        if arquivos:
+            escolhido = candidato
+            break
+    with trava_motor:
+        swe.set_ephe_path(escolhido)
+        configuracao_atual().diretorio = escolhido
+    estado.update({
+        "diretorio": escolhido,
+        "cobertura": cobertura,
+        "arquivos": arquivos,
+        "mapeamentos": pre_carregar(arquivos) if pre_carregar_arquivos else [],
+        "inicializado": True
+    })
+    return estado
+
+def coberto_por_arquivos(julian_day):
+    ano = swe.revjul(julian_day)[0]
+    return all(
+        any(inicio <= ano < fim for inicio, fim in estado["cobertura"][tipo])
+        for tipo in ("pl", "mo")
+    )
+
+def escolher_motor(julian_day, modo=None):
+    """Retorna (flags, motor) para o modo pedido; no modo "swiss" falha em vez de cair no Moshier em silêncio"""
+    modo = modo or MODO_AUTO
+    if modo not in MODOS:
+        raise EfemerideIndisponivel(f"Modo de efeméride inválido: {modo}")
+    if modo == MODO_MOSHIER:
+        return swe.FLG_MOSEPH | swe.FLG_SPEED, MODO_MOSHIER
+    if coberto_por_arquivos(julian_day):
+        return swe.FLG_SWIEPH | swe.FLG_SPEED, MODO_SWISS
+    if modo == MODO_SWISS:
+        raise EfemerideIndisponivel(f"Arquivos da Swiss Ephemeris não cobrem esta data (diretório: {estado['diretorio']})")
+    return swe.FLG_MOSEPH | swe.FLG_SPEED, MODO_MOSHIER
+
+def calcular_posicao(julian_day, corpo, flags=swe.FLG_SWIEPH | swe.FLG_SPEED, contexto=CONTEXTO_PADRAO):
+    """swe.calc_ut com registro do motor realmente usado (informado pela própria biblioteca em retflags)"""
+    with usar_contexto(contexto) as extras:
+        pos, retflags = swe.calc_ut(julian_day, corpo, flags | extras)
+    motor = MODO_MOSHIER if retflags & swe.FLG_MOSEPH else MODO_SWISS
+    with trava_metricas:
+        metricas[motor] += 1
+        if motor == MODO_MOSHIER and flags & swe.FLG_SWIEPH:
+            metricas["fallback_moshier"] += 1
+    return pos, motor
+
+def calcular_casas(julian_day, lat, lon, sistema=b'P', contexto=CONTEXTO_PADRAO):
+    """swe.houses_ex no zodíaco do contexto: (cúspides, ascmc)"""
+    with usar_contexto(contexto) as extras:
+        return swe.houses_ex(julian_day, lat, lon, sistema, extras & swe.FLG_SIDEREAL)
+
+def calcular_ayanamsa(julian_day, contexto):
+    """Distância (graus) entre o zodíaco tropical e o do contexto; 0 no tropical"""
+    if not contexto.ayanamsa:
+        return 0.0
+    with usar_contexto(contexto):
+        return swe.get_ayanamsa_ut(julian_day)
+
+def status_efemerides():
+    with trava_metricas:
+        contadores = dict(metricas)
+    return {
+        "diretorio": estado["diretorio"],
+        "arquivos": [os.path.basename(caminho) for caminho in estado["arquivos"]],
+        "cobertura": {
+            "planetas": estado["cobertura"]["pl"],
+            "lua": estado["cobertura"]["mo"]
+        },
+        "calculos": contadores
+    }
@@ -0,0 +1,267 @@
+"""Astrologia eletiva: janelas de tempo em que todas as restrições pedidas são satisfeitas.
+
+Cada restrição vira uma lista ordenada de intervalos (fronteiras achadas por raiz sobre uma efeméride
+interpolada) e as janelas são a interseção dessas listas.
+"""
+import math
+from datetime import datetime, timedelta
+
+import numpy as np
+import swisseph as swe
+
+from astral_api_advanced import PLANETAS_SWE, SIGNOS
+from efemerides import escolher_motor, calcular_posicao
+from fusos_horarios import utc_para_local
+from relocacao import calcular_angulos, calcular_cuspides_placidus, posicao_nas_cuspides
+
+PASSO_EFEMERIDE = 0.5       # dias entre as amostras da efeméride (Hermite entre elas)
+MARGEM_EFEMERIDE = 3.0      # dias antes/depois do intervalo (a Lua pode ter entrado no signo antes do início)
+PASSO_BUSCA = 10 / 1440     # grade de avaliação das restrições que dependem do local
+ITERACOES_REFINO = 16       # bisseções por fronteira: 10 min / 2^16 ≈ 0,01 s
+MAX_DIAS = 366
+ASPECTOS_MAIORES = [0, 60, 90, 120, 180, 240, 270, 300]
+ASPECTOS_TENSOS = [90, 180]
+BENEFICOS_PADRAO = ["Vênus", "Júpiter"]
+CASAS_ANGULARES = (1, 4, 7, 10)
+FASES_LUA = {"crescente": (0, 180), "minguante": (180, 360)}
+JD_J2000 = 2451545.0
+DATA_J2000 = datetime(2000, 1, 1, 12)
+
+class EfemerideIntervalo:
+    """Longitudes amostradas uma vez e interpoladas em lote"""
+
+    def __init__(self, jd_inicio, jd_fim, flags, corpos=PLANETAS_SWE):
+        self.inicio = jd_inicio - MARGEM_EFEMERIDE
+        amostras = int(math.ceil((jd_fim - jd_inicio + 2 * MARGEM_EFEMERIDE) / PASSO_EFEMERIDE)) + 1
+        self.tempos = self.inicio + np.arange(amostras) * PASSO_EFEMERIDE
+        self.nomes = [nome for _, nome in corpos]
+        self.indices = {nome: i for i, nome in enumerate(self.nomes)}
+        posicoes = np.array([
+            [calcular_posicao(t, corpo, flags)[0] for t in self.tempos.tolist()] for corpo, _ in corpos
+        ])
+        # Longitudes desenroladas (uma linha por corpo) para a interpolação não saltar em 360°
+        self.longitudes = np.unwrap(posicoes[:, :, 0], period=360, axis=1)
+        self.velocidades = posicoes[:, :, 3]
+        # Tempo sidéreo: linear no intervalo a partir de um valor exato (erro de nutação desprezível)
+        self.tempo_sidereo_inicial = swe.sidtime(jd_inicio) * 15
+        self.jd_referencia = jd_inicio
+        self.obliquidade = calcular_posicao((jd_inicio + jd_fim) / 2, swe.ECL_NUT, flags)[0][0]
+
+    def hermite(self, valores, velocidades, t):
+        """Interpolação de Hermite (posição + velocidade) de uma série amostrada nos instantes t"""
+        x = (np.asarray(t, dtype=float) - self.inicio) / PASSO_EFEMERIDE
+        i = np.clip(np.floor(x).astype(np.int64), 0, valores.shape[-1] - 2)
+        s = x - i
+        s2, s3 = s * s, s * s * s
+        return ((2 * s3 - 3 * s2 + 1) * valores[..., i] + (s3 - 2 * s2 + s) * velocidades[..., i] * PASSO_EFEMERIDE
+                + (-2 * s3 + 3 * s2) * valores[..., i + 1] + (s3 - s2) * velocidades[..., i + 1] * PASSO_EFEMERIDE)
+
+    def longitude(self, nome, t):
+        """Longitude desenrolada (não normalizada) do corpo nos instantes t"""
+        linha = self.indices[nome]
+        return self.hermite(self.longitudes[linha], self.velocidades[linha], t)
+
+    def longitudes_por_linha(self, linhas, t):
+        """Longitude do corpo linhas[k] no instante t[k]"""
+        x = (np.asarray(t, dtype=float) - self.inicio) / PASSO_EFEMERIDE
+        i = np.clip(np.floor(x).astype(np.int64), 0, self.longitudes.shape[1] - 2)
+        s = x - i
+        s2, s3 = s * s, s * s * s
+        p, v = self.longitudes, self.velocidades * PASSO_EFEMERIDE
+        return ((2 * s3 - 3 * s2 + 1) * p[linhas, i] + (s3 - 2 * s2 + s) * v[linhas, i]
+                + (-2 * s3 + 3 * s2) * p[linhas, i + 1] + (s3 - s2) * v[linhas, i + 1])
+
+    def ramc(self, t, lon):
+        return (self.tempo_sidereo_inicial + 360.98564736629 * (np.asarray(t) - self.jd_referencia) + lon) % 360
+
+def refinar_fronteiras(predicado, baixo, alto, estado_baixo):
+    """Bisseção vetorizada: instante em que o predicado deixa de valer `estado_baixo` em cada [baixo, alto]"""
+    for _ in range(ITERACOES_REFINO):
+        meio = (baixo + alto) / 2
+        igual = predicado(meio) == estado_baixo
+        baixo = np.where(igual, meio, baixo)
+        alto = np.where(igual, alto, meio)
+    return (baixo + alto) / 2
+
+def intervalos_onde(predicado, jd_inicio, jd_fim):
+    """Intervalos em que o predicado vetorizado vale, avaliado na grade e refinado nas trocas"""
+    tempos = np.append(np.arange(jd_inicio, jd_fim, PASSO_BUSCA), jd_fim)
+    mascara = predicado(tempos)
+    trocas = np.flatnonzero(mascara[1:] != mascara[:-1])
+    fronteiras = refinar_fronteiras(predicado, tempos[trocas], tempos[trocas + 1], mascara[trocas])
+    inicios = fronteiras[~mascara[trocas]]
+    fins = fronteiras[mascara[trocas]]
+    if mascara[0]:
+        inicios = np.r_[jd_inicio, inicios]
+    if mascara[-1]:
+        fins = np.r_[fins, jd_fim]
+    return list(zip(inicios.tolist(), fins.tolist()))
+
+def cruzamentos_crescentes(funcao, tempos, valores, deslocamentos, periodo=360.0):
+    """Passagens de funções crescentes por deslocamento + k * periodo, todas refinadas num único lote.
+
+    `valores` tem uma linha por função, amostrada em `tempos`; funcao(t, linhas) avalia a função
+    linhas[k] no instante t[k]. Retorna os instantes e a linha de cada passagem.
+    """
+    baixos, altos, linhas, alvos = [], [], [], []
+    for deslocamento in deslocamentos:
+        voltas = np.floor((valores - deslocamento) / periodo)
+        linha, indice = np.nonzero(voltas[:, 1:] > voltas[:, :-1])
+        baixos.append(tempos[indice])
+        altos.append(tempos[indice + 1])
+        linhas.append(linha)
+        alvos.append(deslocamento + voltas[linha, indice + 1] * periodo)
+    baixo, alto = np.concatenate(baixos), np.concatenate(altos)
+    linhas, alvos = np.concatenate(linhas), np.concatenate(alvos)
+    for _ in range(ITERACOES_REFINO + 6):
+        meio = (baixo + alto) / 2
+        acima = funcao(meio, linhas) >= alvos
+        baixo = np.where(acima, baixo, meio)
+        alto = np.where(acima, meio, alto)
+    return (baixo + alto) / 2, linhas
+
+def intersecao(a, b):
+    """Interseção de duas listas ordenadas de intervalos disjuntos"""
+    resultado, i, j = [], 0, 0
+    while i < len(a) and j < len(b):
+        inicio, fim = max(a[i][0], b[j][0]), min(a[i][1], b[j][1])
+        if inicio < fim:
+            resultado.append((inicio, fim))
+        if a[i][1] < b[j][1]:
+            i += 1
+        else:
+            j += 1
+    return resultado
+
+def complemento(intervalos, jd_inicio, jd_fim):
+    resultado, cursor = [], jd_inicio
+    for inicio, fim in intervalos:
+        if inicio > cursor:
+            resultado.append((cursor, min(inicio, jd_fim)))
+        cursor = max(cursor, fim)
+    if cursor < jd_fim:
+        resultado.append((cursor, jd_fim))
+    return [(inicio, fim) for inicio, fim in resultado if inicio < fim]
+
+def intervalos_lua_fora_de_curso(efemeride, jd_inicio, jd_fim):
+    """Lua fora de curso: do último aspecto maior da Lua a um planeta até a entrada no signo seguinte"""
+    lua = efemeride.indices["Lua"]
+    ingressos, _ = cruzamentos_crescentes(
+        lambda t, linhas: efemeride.longitudes_por_linha(np.full(len(t), lua), t),
+        efemeride.tempos, efemeride.longitudes[[lua]], [0.0], periodo=30.0
+    )
+    ingressos = np.sort(ingressos)
+    # A Lua é sempre mais rápida que os planetas: cada distância Lua - planeta é crescente
+    planetas = np.array([i for i in range(len(efemeride.nomes)) if i != lua])
+    aspectos, _ = cruzamentos_crescentes(
+        lambda t, linhas: efemeride.longitudes_por_linha(np.full(len(t), lua), t) - efemeride.longitudes_por_linha(planetas[linhas], t),
+        efemeride.tempos, efemeride.longitudes[lua] - efemeride.longitudes[planetas], ASPECTOS_MAIORES
+    )
+    aspectos = np.sort(aspectos)
+
+    # Último aspecto antes de cada ingresso (se houver aspecto desde o ingresso anterior)
+    ultimo = np.searchsorted(aspectos, ingressos[1:]) - 1
+    intervalos = []
+    for anterior, ingresso, k in zip(ingressos[:-1].tolist(), ingressos[1:].tolist(), ultimo.tolist()):
+        if ingresso <= jd_inicio or anterior >= jd_fim:
+            continue
+        inicio = aspectos[k] if k >= 0 and aspectos[k] > anterior else anterior
+        intervalos.append((max(float(inicio), jd_inicio), min(ingresso, jd_fim)))
+    return intervalos
+
+def predicado_restricao(restricao, efemeride, lat, lon):
+    """Predicado vetorizado t -> bool de uma restrição pontual"""
+    tipo = restricao.get("tipo")
+    if tipo == "fase_lua":
+        minimo, maximo = FASES_LUA.get(restricao.get("fase"), (restricao.get("elongacao_min"), restricao.get("elongacao_max")))
+        if minimo is None or maximo is None:
+            raise ValueError("fase_lua: informe 'fase' (crescente/minguante) ou elongacao_min/elongacao_max")
+        def predicado(t):
+            elongacao = (efemeride.longitude("Lua", t) - efemeride.longitude("Sol", t)) % 360
+            return (elongacao >= minimo) & (elongacao < maximo)
+        return predicado
+
+    if tipo == "sem_aspectos_tensos":
+        graus = restricao.get("graus") or []
+        orbe = float(restricao.get("orbe", 2.0))
+        angulos = ASPECTOS_TENSOS + ([0] if restricao.get("incluir_conjuncao") else [])
+        corpos = restricao.get("planetas") or efemeride.nomes
+        if not graus:
+            raise ValueError("sem_aspectos_tensos: informe os graus natais em 'graus'")
+        invalidos = set(corpos) - set(efemeride.nomes)
+        if invalidos:
+            raise ValueError(f"sem_aspectos_tensos: planetas inválidos: {', '.join(sorted(invalidos))}")
+        def predicado(t):
+            tenso = np.zeros(np.shape(t), dtype=bool)
+            for nome in corpos:
+                longitude = efemeride.longitude(nome, t)
+                for grau in graus:
+                    distancia = np.abs((longitude - grau + 180) % 360 - 180)
+                    for angulo in angulos:
+                        tenso |= np.abs(distancia - angulo) <= orbe
+            return ~tenso
+        return predicado
+
+    if tipo == "signo_ascendente":
+        if restricao.get("signo") not in SIGNOS:
+            raise ValueError(f"signo_ascendente: signo inválido: {restricao.get('signo')}")
+        signo = SIGNOS.index(restricao["signo"])
+        def predicado(t):
+            ascendente, _ = calcular_angulos(efemeride.ramc(t, lon), lat, efemeride.obliquidade)
+            return (ascendente // 30).astype(int) == signo
+        return predicado
+
+    if tipo == "benefico_angular":
+        beneficos = restricao.get("planetas") or BENEFICOS_PADRAO
+        invalidos = set(beneficos) - set(efemeride.nomes)
+        if invalidos:
+            raise ValueError(f"benefico_angular: planetas inválidos: {', '.join(sorted(invalidos))}")
+        if abs(lat) >= 90 - efemeride.obliquidade:
+            raise ValueError("benefico_angular: casas de Placidus não definidas acima do círculo polar")
+        def predicado(t):
+            # Casa pela longitude eclíptica contra as cúspides do instante, como identificar_casa nos mapas
+            cuspides = calcular_cuspides_placidus(efemeride.ramc(t, lon), lat, efemeride.obliquidade)
+            longitudes = np.stack([efemeride.longitude(nome, t) % 360 for nome in beneficos], axis=-1)
+            return np.isin(np.floor(posicao_nas_cuspides(longitudes, cuspides)), CASAS_ANGULARES).any(axis=-1)
+        return predicado
+
+    raise ValueError(f"Restrição desconhecida: {tipo}")
+
+def data_de_jd(julian_day):
+    return DATA_J2000 + timedelta(days=julian_day - JD_J2000)
+
+def buscar_janelas(jd_inicio, jd_fim, restricoes, lat, lon, limite=10, duracao_minima=15, modo_efemeride=None):
+    """Janelas em que todas as restrições valem, das mais longas para as mais curtas"""
+    if not 0 < jd_fim - jd_inicio <= MAX_DIAS:
+        raise ValueError(f"Intervalo de busca inválido (máximo de {MAX_DIAS} dias)")
+    if not restricoes:
+        raise ValueError("Informe ao menos uma restrição")
+    flags, motor = escolher_motor(jd_inicio, modo_efemeride)
+    efemeride = EfemerideIntervalo(jd_inicio, jd_fim, flags)
+
+    janelas = [(jd_inicio, jd_fim)]
+    for restricao in restricoes:
+        if restricao.get("tipo") == "lua_fora_de_curso":
+            intervalos = complemento(intervalos_lua_fora_de_curso(efemeride, jd_inicio, jd_fim), jd_inicio, jd_fim)
+        else:
+            intervalos = intervalos_onde(predicado_restricao(restricao, efemeride, lat, lon), jd_inicio, jd_fim)
+        janelas = intersecao(janelas, intervalos)
+        if not janelas:
+            break
+
+    minimo = duracao_minima / 1440
+    janelas = sorted((j for j in janelas if j[1] - j[0] >= minimo), key=lambda j: (-(j[1] - j[0]), j[0]))[:limite]
+    resultado = []
+    for inicio, fim in janelas:
+        inicio_utc, fim_utc = data_de_jd(inicio), data_de_jd(fim)
+        inicio_local, zona = utc_para_local(inicio_utc, lat, lon)
+        fim_local, _ = utc_para_local(fim_utc, lat, lon)
+        resultado.append({
+            "inicio": inicio_utc.isoformat(timespec="minutes") + "Z",
+            "fim": fim_utc.isoformat(timespec="minutes") + "Z",
+            "inicio_local": inicio_local.isoformat(timespec="minutes"),
+            "fim_local": fim_local.isoformat(timespec="minutes"),
+            "fuso_horario": zona,
+            "duracao_minutos": round((fim - inicio) * 1440)
+        })
+    return {"janelas": resultado, "efemeride": {"modo": modo_efemeride or "auto", "motor": motor}}
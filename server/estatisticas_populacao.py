@@ -0,0 +1,151 @@
+"""Estatísticas da população de mapas (distribuição de signos, equilíbrio de elementos e qualidades,
+aspectos mais comuns), no total e por comunidade, mantidas por contadores incrementais.
+
+Cada mapa contribui com um conjunto de chaves (dimensão, valor); criar, recalcular ou excluir um perfil
+soma ou subtrai a contribuição dele nos contadores de "todos" e das suas comunidades. Consultar uma
+distribuição é ler os contadores da dimensão, sem percorrer os perfis. A contribuição de cada usuário
+fica guardada (índices uint16 em bytes) para poder ser subtraída quando o mapa muda.
+"""
+import json
+from collections import Counter
+
+import numpy as np
+
+DIMENSOES = [
+    "signo_solar", "signo_lunar", "ascendente", "signos",
+    "elemento_dominante", "qualidade_dominante", "elementos", "qualidades", "aspectos"
+]
+TODOS = ""
+
+def contribuicao_mapa(planetas_dict, ascendente, aspectos, elemento_dominante, qualidade_dominante,
+                      elementos, qualidades):
+    """Chaves (dimensão, valor) de um mapa; "elementos" e "qualidades" contam cada planeta (equilíbrio),
+    as demais dimensões contam uma vez por usuário"""
+    chaves = []
+    if "Sol" in planetas_dict:
+        chaves.append(("signo_solar", planetas_dict["Sol"]["signo"]))
+    if "Lua" in planetas_dict:
+        chaves.append(("signo_lunar", planetas_dict["Lua"]["signo"]))
+    if ascendente:
+        chaves.append(("ascendente", ascendente))
+    for nome, planeta in planetas_dict.items():
+        chaves.append(("signos", f"{nome}:{planeta['signo']}"))
+        chaves.append(("elementos", elementos[planeta["signo"]]))
+        chaves.append(("qualidades", qualidades[planeta["signo"]]))
+    for corpo1, corpo2, aspecto, *_ in aspectos:
+        primeiro, segundo = sorted((corpo1, corpo2))
+        chaves.append(("aspectos", f"{primeiro}:{segundo}:{aspecto}"))
+    chaves.append(("elemento_dominante", elemento_dominante))
+    chaves.append(("qualidade_dominante", qualidade_dominante))
+    return chaves
+
+class EstatisticasPopulacao:
+    """Contadores por chave (dimensão, valor), um vetor por comunidade ("" = todos os usuários)"""
+
+    def __init__(self, capacidade=512):
+        self.indices = {}
+        self.chaves = []
+        self.por_dimensao = {dimensao: [] for dimensao in DIMENSOES}
+        self.contadores = {TODOS: np.zeros(capacidade, dtype=np.int64)}
+        self.usuarios = Counter()
+        self.perfis = {}
+
+    def __len__(self):
+        return len(self.perfis)
+
+    def indice(self, chave):
+        if chave not in self.indices:
+            dimensao, _ = chave
+            if dimensao not in self.por_dimensao:
+                raise ValueError(f"Dimensão inválida: {dimensao}")
+            self.indices[chave] = len(self.chaves)
+            self.chaves.append(chave)
+            self.por_dimensao[dimensao].append(self.indices[chave])
+            capacidade = len(self.contadores[TODOS])
+            if len(self.chaves) > capacidade:
+                for comunidade, contador in self.contadores.items():
+                    self.contadores[comunidade] = np.concatenate([contador, np.zeros(capacidade, dtype=np.int64)])
+        return self.indices[chave]
+
+    def contador(self, comunidade):
+        if comunidade not in self.contadores:
+            self.contadores[comunidade] = np.zeros(len(self.contadores[TODOS]), dtype=np.int64)
+        return self.contadores[comunidade]
+
+    def aplicar(self, indices, comunidades, sinal):
+        for comunidade in (TODOS, *comunidades):
+            np.add.at(self.contador(comunidade), indices, sinal)
+            self.usuarios[comunidade] += sinal
+
+    def atualizar(self, user_id, chaves=None, comunidades=None):
+        """Cria ou recalcula o perfil: troca a contribuição anterior pela nova. Sem `chaves`, mantém o mapa
+        e só muda as comunidades; sem `comunidades`, mantém as atuais."""
+        anterior = self.perfis.get(user_id)
+        if chaves is None and anterior is None:
+            raise KeyError(user_id)
+        if chaves is None:
+            indices = np.frombuffer(anterior[0], dtype=np.uint16)
+        else:
+            indices = np.array([self.indice(chave) for chave in chaves], dtype=np.uint16)
+        comunidades = tuple(sorted(set(comunidades))) if comunidades is not None else (anterior[1] if anterior else ())
+        if anterior is not None:
+            self.aplicar(np.frombuffer(anterior[0], dtype=np.uint16), anterior[1], -1)
+        self.aplicar(indices, comunidades, 1)
+        self.perfis[user_id] = (indices.tobytes(), comunidades)
+
+    def remover(self, user_id):
+        anterior = self.perfis.pop(user_id, None)
+        if anterior is None:
+            return False
+        self.aplicar(np.frombuffer(anterior[0], dtype=np.uint16), anterior[1], -1)
+        return True
+
+    def distribuicao(self, dimensao, comunidade=None, limite=None):
+        """Contagens de uma dimensão, da mais frequente para a menos frequente"""
+        if dimensao not in self.por_dimensao:
+            raise ValueError(f"Dimensão inválida: {dimensao}")
+        contador = self.contadores.get(comunidade or TODOS)
+        indices = self.por_dimensao[dimensao]
+        if contador is None or not indices:
+            return []
+        contagens = contador[indices]
+        ordem = np.argsort(-contagens, kind="stable")[:limite]
+        return [
+            {"valor": self.chaves[indices[i]][1], "quantidade": int(contagens[i])}
+            for i in ordem.tolist() if contagens[i] > 0
+        ]
+
+    def resumo(self, comunidade=None, dimensoes=None, limite=None):
+        return {
+            "comunidade": comunidade or None,
+            "usuarios": self.usuarios[comunidade or TODOS],
+            "dimensoes": {dimensao: self.distribuicao(dimensao, comunidade, limite) for dimensao in dimensoes or DIMENSOES}
+        }
+
+    def comunidades(self):
+        return {comunidade: total for comunidade, total in self.usuarios.items() if comunidade != TODOS and total > 0}
+
+def reconstruir_do_banco(conn, extrair, tamanho_lote=10000):
+    """Reconstrução completa a partir de astrological_profiles; `extrair` converte o mapa salvo em chaves.
+    As comunidades de um usuário são aquelas em que ele publicou (posts.community)."""
+    estatisticas = EstatisticasPopulacao()
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT user_id, array_agg(DISTINCT community)
+            FROM posts
+            WHERE community IS NOT NULL
+            GROUP BY user_id
+        """)
+        comunidades = dict(cur.fetchall())
+    with conn.cursor(name="estatisticas_populacao") as cur:
+        cur.itersize = tamanho_lote
+        cur.execute("""
+            SELECT user_id, json_build_object('planetas', astral_map_data->'planetas', 'casas', astral_map_data->'casas')::text
+            FROM astrological_profiles
+            WHERE astral_map_data IS NOT NULL
+        """)
+        for user_id, mapa in cur:
+            chaves = extrair(json.loads(mapa))
+            if chaves:
+                estatisticas.atualizar(user_id, chaves, comunidades.get(user_id, ()))
+    return estatisticas
@@ -0,0 +1,150 @@
+"""Catálogo de estrelas fixas carregado e indexado uma única vez, com precessão vetorizada.
+
+O swe.fixstar lê e interpreta o arquivo de estrelas a cada chamada; aqui o catálogo vira arrays na
+primeira consulta e a posição de todas as estrelas numa data é uma única operação matricial:
+movimento próprio, precessão (IAU 1976) do equador J2000 para o da data e rotação para a eclíptica
+da data, com a nutação em longitude. A aberração anual (~20"/cos(latitude) em longitude) é desprezada:
+as conjunções usam orbes de grau.
+"""
+import os
+import threading
+
+import numpy as np
+import swisseph as swe
+
+from efemerides import calcular_posicao
+
+ARQUIVO_ESTRELAS = os.environ.get(
+    "ESTRELAS_ARQUIVO",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "estrelas", "estrelas.txt")
+)
+EQUINOCIOS_J2000 = ("ICRS", "2000")
+ORBE_ESTRELAS = 1.0
+JD_J2000 = 2451545.0
+SEGUNDOS_POR_RADIANO = 180 * 3600 / np.pi
+
+def sexagesimal(graus, minutos, segundos):
+    valor = abs(float(graus)) + float(minutos) / 60 + float(segundos) / 3600
+    return -valor if graus.strip().startswith("-") else valor
+
+class CatalogoEstrelas:
+    """Estrelas do arquivo (formato sefstars.txt) em arrays, com índice por nome e nomenclatura"""
+
+    def __init__(self, caminho=ARQUIVO_ESTRELAS):
+        nomes, nomenclaturas, colunas = [], [], []
+        with open(caminho, encoding="utf-8") as arquivo:
+            for linha in arquivo:
+                linha = linha.strip()
+                if not linha or linha.startswith("#"):
+                    continue
+                campos = [campo.strip() for campo in linha.split(",")]
+                # Entradas em B1950 (raras no sefstars.txt) ficam de fora
+                if len(campos) < 14 or campos[2] not in EQUINOCIOS_J2000:
+                    continue
+                nomes.append(campos[0])
+                nomenclaturas.append(campos[1])
+                colunas.append([
+                    sexagesimal(*campos[3:6]) * 15,
+                    sexagesimal(*campos[6:9]),
+                    float(campos[9]), float(campos[10]), float(campos[13])
+                ])
+        colunas = np.array(colunas, dtype=float).reshape(-1, 5)
+        self.nomes = nomes
+        self.nomenclaturas = nomenclaturas
+        self.ascensao = np.radians(colunas[:, 0])
+        self.declinacao = np.radians(colunas[:, 1])
+        # mas/ano -> rad/ano; o movimento em AR vem multiplicado por cos(Dec), como no Hipparcos
+        self.movimento_ascensao = colunas[:, 2] / 1000 / SEGUNDOS_POR_RADIANO / np.cos(self.declinacao)
+        self.movimento_declinacao = colunas[:, 3] / 1000 / SEGUNDOS_POR_RADIANO
+        self.magnitudes = colunas[:, 4]
+        self.indice = {}
+        for i, (nome, nomenclatura) in enumerate(zip(nomes, nomenclaturas)):
+            self.indice.setdefault(nome.lower(), i)
+            self.indice.setdefault(nomenclatura.lower(), i)
+
+    def __len__(self):
+        return len(self.nomes)
+
+    def selecionar(self, estrelas=None, magnitude_maxima=None):
+        """Índices das estrelas pedidas (nome ou nomenclatura) e/ou mais brilhantes que a magnitude"""
+        if estrelas:
+            desconhecidas = [estrela for estrela in estrelas if estrela.lower() not in self.indice]
+            if desconhecidas:
+                raise ValueError(f"Estrelas inválidas: {', '.join(desconhecidas)}")
+            indices = np.array(sorted({self.indice[estrela.lower()] for estrela in estrelas}), dtype=int)
+        else:
+            indices = np.arange(len(self))
+        if magnitude_maxima is not None:
+            indices = indices[self.magnitudes[indices] <= magnitude_maxima]
+        return indices
+
+    def posicoes(self, julian_day, flags, indices=None):
+        """Longitude e latitude eclípticas de data (graus) das estrelas no instante: arrays (estrelas,)"""
+        indices = np.arange(len(self)) if indices is None else indices
+        anos = (julian_day - JD_J2000) / 365.25
+        ascensao = self.ascensao[indices] + self.movimento_ascensao[indices] * anos
+        declinacao = self.declinacao[indices] + self.movimento_declinacao[indices] * anos
+        vetores = np.stack([
+            np.cos(declinacao) * np.cos(ascensao),
+            np.cos(declinacao) * np.sin(ascensao),
+            np.sin(declinacao)
+        ])
+        x, y, z = matriz_precessao(julian_day) @ vetores
+        # Obliquidade média e nutação em longitude da data (ECL_NUT: verdadeira, média, nutação lon., nutação obl.)
+        nutacao, _ = calcular_posicao(julian_day, swe.ECL_NUT, flags)
+        eps = np.radians(nutacao[1])
+        longitudes = np.degrees(np.arctan2(y * np.cos(eps) + z * np.sin(eps), x)) + nutacao[2]
+        latitudes = np.degrees(np.arcsin(np.clip(z * np.cos(eps) - y * np.sin(eps), -1, 1)))
+        return longitudes % 360, latitudes
+
+def matriz_precessao(julian_day):
+    """Precessão IAU 1976 (Lieske) do equador médio J2000 para o da data: R3(-z) R2(θ) R3(-ζ)"""
+    t = (julian_day - JD_J2000) / 36525
+    zeta = (2306.2181 * t + 0.30188 * t ** 2 + 0.017998 * t ** 3) / SEGUNDOS_POR_RADIANO
+    z = (2306.2181 * t + 1.09468 * t ** 2 + 0.018203 * t ** 3) / SEGUNDOS_POR_RADIANO
+    theta = (2004.3109 * t - 0.42665 * t ** 2 - 0.041833 * t ** 3) / SEGUNDOS_POR_RADIANO
+    cz, sz = np.cos(zeta), np.sin(zeta)
+    cZ, sZ = np.cos(z), np.sin(z)
+    ct, st = np.cos(theta), np.sin(theta)
+    return np.array([
+        [cZ * ct * cz - sZ * sz, -cZ * ct * sz - sZ * cz, -cZ * st],
+        [sZ * ct * cz + cZ * sz, -sZ * ct * sz + cZ * cz, -sZ * st],
+        [st * cz, -st * sz, ct]
+    ])
+
+def calcular_conjuncoes_estrelas(julian_day, flags, pontos, orbe=ORBE_ESTRELAS, estrelas=None, magnitude_maxima=None,
+                                 ayanamsa=0.0):
+    """Conjunções (em longitude) entre as estrelas e os pontos do mapa {nome: longitude}, da mais exata à mais larga.
+
+    Com pontos no zodíaco sideral, `ayanamsa` leva as estrelas (tropicais) para o mesmo referencial.
+    """
+    catalogo = obter_catalogo_estrelas()
+    indices = catalogo.selecionar(estrelas, magnitude_maxima)
+    longitudes, latitudes = catalogo.posicoes(julian_day, flags, indices)
+    longitudes = (longitudes - ayanamsa) % 360
+    nomes_pontos = list(pontos)
+    diferencas = np.abs((longitudes[:, None] - np.array([pontos[p] for p in nomes_pontos])[None, :] + 180) % 360 - 180)
+    estrela, ponto = np.nonzero(diferencas <= orbe)
+
+    conjuncoes = [
+        {
+            "estrela": catalogo.nomes[indices[i]],
+            "ponto": nomes_pontos[j],
+            "orbe": round(float(diferencas[i, j]), 2),
+            "longitude": round(float(longitudes[i]), 2),
+            "latitude": round(float(latitudes[i]), 2),
+            "magnitude": float(catalogo.magnitudes[indices[i]])
+        }
+        for i, j in zip(estrela.tolist(), ponto.tolist())
+    ]
+    return sorted(conjuncoes, key=lambda c: c["orbe"])
+
+catalogo_estrelas = {}
+trava_catalogo = threading.Lock()
+
+def obter_catalogo_estrelas():
+    if "atual" not in catalogo_estrelas:
+        with trava_catalogo:
+            if "atual" not in catalogo_estrelas:
+                catalogo_estrelas["atual"] = CatalogoEstrelas()
+    return catalogo_estrelas["atual"]
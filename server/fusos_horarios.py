@@ -0,0 +1,142 @@
+"""Resolução offline de coordenadas para fuso horário e conversão hora local → UTC.
+
+A zona vem de uma grade pré-calculada (fusos/grade_fusos.jsonl, gerada por scripts/gerar_grade_fusos.py)
+e o deslocamento de tabelas de transições (tzdata via pytz) pré-calculadas por zona: cada conversão custa
+uma consulta à grade e uma busca binária. O arquivo tem um cabeçalho (zonas e limites das grades) e uma
+linha JSON por linha de cada grade: é lido na primeira consulta e só as linhas consultadas são
+decodificadas, para que um processo que converte uma única data (a CLI do mapa) não pague a grade
+inteira; as conversões em massa com numpy ficam em fusos_horarios_lote.py.
+"""
+import bisect
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+import pytz
+from pytz.tzfile import build_tzinfo
+
+ARQUIVO_GRADE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fusos", "grade_fusos.jsonl")
+EPOCA = datetime(1970, 1, 1)
+
+class GradeFusos:
+    """Grade regular lat/lon com o código da zona de cada célula"""
+
+    def __init__(self, dados, linhas):
+        self.lat_min, self.lat_max = dados["lat_min"], dados["lat_max"]
+        self.lon_min, self.lon_max = dados["lon_min"], dados["lon_max"]
+        self.passo = dados["passo"]
+        # Texto JSON de cada linha, ainda não decodificado
+        self.linhas = linhas
+        self.colunas = int(round((self.lon_max - self.lon_min) / self.passo))
+        self.decodificadas = {}
+
+    def contem(self, lat, lon):
+        return self.lat_min <= lat <= self.lat_max and self.lon_min <= lon <= self.lon_max
+
+    def corridas(self, i):
+        """Linha i gravada por corridas: [zona, quantidade, zona, quantidade, ...]"""
+        return json.loads(self.linhas[i])
+
+    def linha(self, i):
+        """(coluna final exclusiva de cada corrida, zona de cada corrida) da linha i"""
+        decodificada = self.decodificadas.get(i)
+        if decodificada is None:
+            corridas = self.corridas(i)
+            decodificada = self.decodificadas[i] = (list(accumulate(corridas[1::2])), corridas[0::2])
+        return decodificada
+
+    def zona(self, lat, lon):
+        i = min(int((lat - self.lat_min) / self.passo), len(self.linhas) - 1)
+        j = min(int((lon - self.lon_min) / self.passo), self.colunas - 1)
+        fins, zonas = self.linha(i)
+        return zonas[bisect.bisect_right(fins, j)]
+
+class TabelaTransicoes:
+    """Deslocamentos UTC de uma zona em vetores ordenados pelo instante da transição"""
+
+    def __init__(self, zona):
+        # Direto do arquivo da zona: pytz.timezone valida o nome contra a lista de todas as zonas, o que
+        # custa uma verificação de arquivo por zona na primeira chamada do processo
+        with pytz.open_resource(zona) as arquivo:
+            tz = build_tzinfo(zona, arquivo)
+        if getattr(tz, "_utc_transition_times", None):
+            instantes = [int((t - EPOCA).total_seconds()) for t in tz._utc_transition_times]
+            deslocamentos = [int(info[0].total_seconds()) for info in tz._transition_info]
+        else:
+            instantes = [int((datetime.min - EPOCA).total_seconds())]
+            deslocamentos = [int(tz.utcoffset(datetime(2000, 1, 1)).total_seconds())]
+        self.zona = zona
+        self.utc = instantes
+        # Instante local em que cada transição passa a valer (no novo deslocamento)
+        self.local = [instante + deslocamento for instante, deslocamento in zip(instantes, deslocamentos)]
+        self.deslocamentos = deslocamentos
+
+    def deslocamento_local(self, segundos_locais):
+        """Deslocamento (s) vigente numa hora local. Horas ambíguas (repetidas no fim do horário de verão)
+        usam a regra posterior à mudança, como o is_dst=False do pytz; horas inexistentes (puladas no
+        início) usam a regra anterior"""
+        return self.deslocamentos[max(bisect.bisect_right(self.local, segundos_locais) - 1, 0)]
+
+    def deslocamento_utc(self, segundos_utc):
+        """Deslocamento (s) vigente num instante UTC"""
+        return self.deslocamentos[max(bisect.bisect_right(self.utc, segundos_utc) - 1, 0)]
+
+def carregar_grades():
+    with open(ARQUIVO_GRADE, "rb") as arquivo:
+        linhas = arquivo.read().splitlines()
+    cabecalho = json.loads(linhas[0])
+    grades, inicio = [], 1
+    for dados in cabecalho["grades"]:
+        quantidade = int(round((dados["lat_max"] - dados["lat_min"]) / dados["passo"]))
+        grades.append(GradeFusos(dados, linhas[inicio:inicio + quantidade]))
+        inicio += quantidade
+    # Grades mais finas têm prioridade sobre a grade mundial
+    grades.sort(key=lambda grade: grade.passo)
+    return cabecalho["zonas"], grades
+
+grades_carregadas = {}
+trava_grades = threading.Lock()
+tabelas = {}
+trava_tabelas = threading.Lock()
+
+def obter_grades():
+    """(nomes das zonas, grades), lidos do arquivo na primeira consulta"""
+    if "grades" not in grades_carregadas:
+        with trava_grades:
+            if "grades" not in grades_carregadas:
+                grades_carregadas["grades"] = carregar_grades()
+    return grades_carregadas["grades"]
+
+def codigo_zona(lat, lon):
+    for grade in obter_grades()[1]:
+        if grade.contem(lat, lon):
+            return grade.zona(lat, lon)
+    raise ValueError(f"Coordenadas inválidas: {lat}, {lon}")
+
+def resolver_fuso(lat, lon):
+    """Nome IANA da zona horária das coordenadas"""
+    return obter_grades()[0][codigo_zona(lat, lon)]
+
+def tabela_transicoes(zona):
+    tabela = tabelas.get(zona)
+    if tabela is None:
+        with trava_tabelas:
+            tabela = tabelas.get(zona)
+            if tabela is None:
+                tabela = tabelas[zona] = TabelaTransicoes(zona)
+    return tabela
+
+def local_para_utc(data_local, lat, lon):
+    """Converte a data/hora local (naive) do local informado para UTC; retorna (data_utc, zona, deslocamento)"""
+    zona = resolver_fuso(lat, lon)
+    segundos_locais = int((data_local - EPOCA).total_seconds())
+    deslocamento = tabela_transicoes(zona).deslocamento_local(segundos_locais)
+    return data_local - timedelta(seconds=deslocamento), zona, deslocamento
+
+def utc_para_local(data_utc, lat, lon):
+    """Converte uma data/hora UTC (naive) para a hora local do local informado; retorna (data_local, zona)"""
+    zona = resolver_fuso(lat, lon)
+    deslocamento = tabela_transicoes(zona).deslocamento_utc(int((data_utc - EPOCA).total_seconds()))
+    return data_utc + timedelta(seconds=deslocamento), zona
@@ -0,0 +1,62 @@
+"""Conversão hora local → UTC em massa (colunas inteiras), com as grades e tabelas de fusos_horarios.
+
+Separado de fusos_horarios para que quem converte uma data por vez não importe o numpy. As grades são
+decodificadas em matrizes e as tabelas de transições em vetores uma vez, na primeira conversão.
+"""
+import threading
+
+import numpy as np
+
+from fusos_horarios import obter_grades, tabela_transicoes
+
+celulas = {}
+vetores = {}
+trava_lote = threading.Lock()
+
+def celulas_grade(grade):
+    """Matriz (linhas, colunas) com o código da zona de cada célula da grade"""
+    matriz = celulas.get(id(grade))
+    if matriz is None:
+        with trava_lote:
+            matriz = celulas.get(id(grade))
+            if matriz is None:
+                matriz = celulas[id(grade)] = np.array([
+                    np.repeat(np.array(corridas[0::2], dtype=np.uint16), corridas[1::2])
+                    for corridas in map(grade.corridas, range(len(grade.linhas)))
+                ])
+    return matriz
+
+def zonas_grade(grade, lats, lons):
+    matriz = celulas_grade(grade)
+    i = np.clip(((lats - grade.lat_min) / grade.passo).astype(np.int64), 0, matriz.shape[0] - 1)
+    j = np.clip(((lons - grade.lon_min) / grade.passo).astype(np.int64), 0, matriz.shape[1] - 1)
+    return matriz[i, j]
+
+def deslocamentos_locais(zona, segundos_locais):
+    """Deslocamentos (s) vigentes em cada hora local da zona (mesma regra de deslocamento_local)"""
+    tabela = vetores.get(zona)
+    if tabela is None:
+        transicoes = tabela_transicoes(zona)
+        tabela = vetores[zona] = (
+            np.array(transicoes.local, dtype=np.int64), np.array(transicoes.deslocamentos, dtype=np.int64)
+        )
+    local, deslocamentos = tabela
+    return deslocamentos[np.maximum(np.searchsorted(local, segundos_locais, side="right") - 1, 0)]
+
+def locais_para_utc(segundos_locais, lats, lons):
+    """Vetores de segundos locais (desde 1970) e coordenadas → segundos UTC e deslocamentos"""
+    segundos_locais = np.asarray(segundos_locais, dtype=np.int64)
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    zonas, grades = obter_grades()
+    codigos = np.full(len(segundos_locais), -1, dtype=np.int64)
+    for grade in reversed(grades):
+        dentro = (lats >= grade.lat_min) & (lats <= grade.lat_max) & (lons >= grade.lon_min) & (lons <= grade.lon_max)
+        codigos[dentro] = zonas_grade(grade, lats[dentro], lons[dentro])
+    if (codigos < 0).any():
+        raise ValueError("Coordenadas inválidas na coluna")
+    deslocamentos = np.zeros(len(segundos_locais), dtype=np.int64)
+    for codigo in np.unique(codigos):
+        selecao = codigos == codigo
+        deslocamentos[selecao] = deslocamentos_locais(zonas[codigo], segundos_locais[selecao])
+    return segundos_locais - deslocamentos, deslocamentos
@@ -0,0 +1,258 @@
+"""Varredura do dia inteiro para quem não sabe a hora de nascimento.
+
+Em vez de calcular um mapa por minuto, o dia (00:00 a 24:00 no fuso do local) é descrito por intervalos
+com as fronteiras obtidas por busca de raízes:
+
+- mudanças de signo dos corpos (em geral só a Lua): amostras a cada 2 h e bissecção com a efeméride;
+- janelas do ascendente: para cada grau 0 de signo, o RAMC em que esse ponto da eclíptica nasce tem
+  forma fechada (ascensão reta menos o semiarco diurno), e a hora sai do tempo sideral por Newton;
+- trocas de casa (Placidus) de cada corpo: como nos mapas, a longitude eclíptica contra as cúspides
+  (calculadas para o RAMC de cada instante, com o tempo sideral linear no dia), com a longitude
+  interpolada das amostras de 2 h; posição contínua nas casas numa grade de 10 min e bissecção
+  vetorizada de todas as trocas ao mesmo tempo.
+
+Acima dos círculos polares parte dos signos não nasce e as casas de Placidus não são definidas (a
+varredura traz só os signos e o ascendente).
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import swisseph as swe
+
+from astral_api_advanced import PLANETAS_SWE, SIGNOS
+from efemerides import escolher_motor, calcular_casas, calcular_posicao
+from fusos_horarios import local_para_utc, utc_para_local
+from relocacao import calcular_cuspides_placidus, posicao_nas_cuspides
+
+PASSO_AMOSTRAS = 2 / 24
+PASSO_GRADE_CASAS = 10 / 1440
+PASSO_ASCENDENTE_POLAR = 2 / 1440
+ITERACOES_BISSECAO = 24
+PRECISAO_BISSECAO = 0.5 / 86400
+# Fração de casa (~0,01 s ao ritmo do movimento diurno) em que a troca de casa é dada por achada
+PRECISAO_POSICAO = 1e-6
+# Graus de tempo sideral por dia solar médio
+VELOCIDADE_SIDERAL = 360.98564736629
+
+def jd_de(data_utc):
+    return swe.julday(data_utc.year, data_utc.month, data_utc.day,
+                      data_utc.hour + data_utc.minute / 60 + data_utc.second / 3600 + data_utc.microsecond / 3.6e9)
+
+def utc_de(julian_day):
+    ano, mes, dia, horas = swe.revjul(julian_day)
+    return datetime(ano, mes, dia) + timedelta(seconds=round(horas * 3600))
+
+def tempo_sideral(julian_day, lon):
+    """Tempo sideral local (graus): o RAMC no instante"""
+    return (swe.sidtime(julian_day) * 15 + lon) % 360
+
+def diferenca_angular(a, b):
+    return (a - b + 180) % 360 - 180
+
+def amostrar_corpos(jd_inicio, jd_fim, flags, corpos):
+    """Longitude eclíptica (graus) de cada corpo a cada PASSO_AMOSTRAS: (corpos, amostras)"""
+    quantidade = int(np.ceil((jd_fim - jd_inicio) / PASSO_AMOSTRAS)) + 1
+    tempos = jd_inicio + np.arange(quantidade) * PASSO_AMOSTRAS
+    longitudes = np.empty((len(corpos), quantidade))
+    for k, jd in enumerate(tempos.tolist()):
+        for c, (corpo, _) in enumerate(corpos):
+            longitudes[c, k] = calcular_posicao(jd, corpo, flags)[0][0]
+    return tempos, longitudes
+
+def mudancas_de_signo(tempos, longitudes, flags, corpos):
+    """Instantes em que cada corpo cruza um grau 0 de signo: [(jd, corpo, signo anterior, signo novo)]"""
+    mudancas = []
+    desenroladas = np.unwrap(longitudes, period=360, axis=1)
+    for c, (corpo, nome) in enumerate(corpos):
+        for k in range(len(tempos) - 1):
+            antes, depois = desenroladas[c, k], desenroladas[c, k + 1]
+            if np.floor(antes / 30) == np.floor(depois / 30):
+                continue
+            fronteira = max(np.floor(antes / 30), np.floor(depois / 30)) * 30
+            a, b = tempos[k], tempos[k + 1]
+            sinal_a = diferenca_angular(antes, fronteira) > 0
+            for _ in range(ITERACOES_BISSECAO):
+                meio = (a + b) / 2
+                if (diferenca_angular(calcular_posicao(meio, corpo, flags)[0][0], fronteira) > 0) == sinal_a:
+                    a = meio
+                else:
+                    b = meio
+            mudancas.append((
+                (a + b) / 2, nome,
+                SIGNOS[int(np.floor(antes / 30)) % 12], SIGNOS[int(np.floor(depois / 30)) % 12]
+            ))
+    return sorted(mudancas)
+
+def signo_ascendente(julian_day, lat, lon):
+    # Casas iguais: o ascendente é o mesmo e o sistema funciona em qualquer latitude
+    return int(calcular_casas(julian_day, lat, lon, b'E')[1][0] // 30) % 12
+
+def cruzamentos_ascendente(jd_inicio, jd_fim, lat, lon, obliquidade):
+    """Instantes [(jd, signo que entra)] em que um grau 0 de signo nasce (ascendente sempre avançando)"""
+    eps, latitude = np.radians(obliquidade), np.radians(lat)
+    fronteiras = np.radians(np.arange(12) * 30.0)
+    ascensao = np.degrees(np.arctan2(np.sin(fronteiras) * np.cos(eps), np.cos(fronteiras)))
+    declinacao = np.arcsin(np.sin(eps) * np.sin(fronteiras))
+    cos_semiarco = -np.tan(latitude) * np.tan(declinacao)
+    semiarco = np.degrees(np.arccos(np.clip(cos_semiarco, -1, 1)))
+    # O grau 0 do signo está no horizonte leste quando o RAMC é a ascensão reta menos o semiarco diurno
+    ramc_fronteiras = (ascensao - semiarco) % 360
+
+    sideral_inicio = tempo_sideral(jd_inicio, lon)
+    cruzamentos = []
+    for signo, ramc in enumerate(ramc_fronteiras.tolist()):
+        jd = jd_inicio + ((ramc - sideral_inicio) % 360) / VELOCIDADE_SIDERAL
+        while jd < jd_fim:
+            for _ in range(3):
+                jd -= diferenca_angular(tempo_sideral(jd, lon), ramc) / VELOCIDADE_SIDERAL
+            if jd_inicio <= jd < jd_fim:
+                cruzamentos.append((jd, signo))
+            jd += 360 / VELOCIDADE_SIDERAL
+    return sorted(cruzamentos)
+
+def cruzamentos_ascendente_amostrados(jd_inicio, jd_fim, lat, lon):
+    """Mesmo resultado acima dos círculos polares, onde o ascendente recua e salta 180°: amostras a cada
+    PASSO_ASCENDENTE_POLAR e bissecção de cada intervalo em que o signo muda"""
+    def refinar(a, signo_a, b, signo_b):
+        if signo_a == signo_b:
+            return []
+        if b - a < PRECISAO_BISSECAO:
+            return [(b, signo_b)]
+        meio = (a + b) / 2
+        signo_meio = signo_ascendente(meio, lat, lon)
+        return refinar(a, signo_a, meio, signo_meio) + refinar(meio, signo_meio, b, signo_b)
+
+    tempos = np.append(np.arange(jd_inicio, jd_fim, PASSO_ASCENDENTE_POLAR), jd_fim).tolist()
+    signos = [signo_ascendente(jd, lat, lon) for jd in tempos]
+    cruzamentos = []
+    for k in range(len(tempos) - 1):
+        cruzamentos += refinar(tempos[k], signos[k], tempos[k + 1], signos[k + 1])
+    return cruzamentos
+
+def janelas_ascendente(jd_inicio, jd_fim, lat, lon, obliquidade):
+    """Intervalos [(jd_inicio, jd_fim, signo)] do ascendente ao longo do dia"""
+    if abs(lat) >= 90 - obliquidade:
+        cruzamentos = cruzamentos_ascendente_amostrados(jd_inicio, jd_fim, lat, lon)
+    else:
+        cruzamentos = cruzamentos_ascendente(jd_inicio, jd_fim, lat, lon, obliquidade)
+    signo_atual = signo_ascendente(jd_inicio, lat, lon)
+    janelas, inicio = [], jd_inicio
+    for jd, signo in cruzamentos:
+        janelas.append((inicio, jd, SIGNOS[signo_atual]))
+        inicio, signo_atual = jd, signo
+    janelas.append((inicio, jd_fim, SIGNOS[signo_atual]))
+    return janelas
+
+def janelas_casas(jd_inicio, jd_fim, lat, lon, obliquidade, tempos, longitudes, corpos):
+    """Intervalos {corpo: [(jd_inicio, jd_fim, casa)]} de Placidus ao longo do dia (casa de identificar_casa)"""
+    # Tempo sideral linear no dia (a variação da nutação em 24 h é desprezível)
+    sideral_inicio = tempo_sideral(jd_inicio, lon)
+    desenroladas = np.unwrap(longitudes, period=360, axis=1)
+
+    def longitude(jd, indices):
+        """Longitude interpolada dos corpos `indices` nos instantes `jd` (com broadcasting)"""
+        fracao = np.clip((jd - tempos[0]) / PASSO_AMOSTRAS, 0, len(tempos) - 1 - 1e-9)
+        k = np.floor(fracao).astype(int)
+        peso = fracao - k
+        return (desenroladas[indices, k] * (1 - peso) + desenroladas[indices, k + 1] * peso) % 360
+
+    def cuspides(jd):
+        return calcular_cuspides_placidus((sideral_inicio + VELOCIDADE_SIDERAL * (jd - jd_inicio)) % 360, lat, obliquidade)
+
+    def posicoes(jd, indices):
+        """Posição contínua nas casas dos corpos `indices` nos instantes `jd` (arrays do mesmo tamanho)"""
+        return posicao_nas_cuspides(longitude(jd, indices)[:, None], cuspides(jd))[:, 0]
+
+    grade = np.append(np.arange(jd_inicio, jd_fim, PASSO_GRADE_CASAS), jd_fim)
+    # Na grade as cúspides de cada instante servem a todos os corpos: (instantes, corpos) -> (corpos, instantes)
+    valores = posicao_nas_cuspides(longitude(grade, np.arange(len(corpos))[:, None]).T, cuspides(grade)).T
+    # A posição diminui com o tempo (12 -> 11 -> 10 ao culminar...); desenrolada, cada inteiro cruzado é uma troca
+    desenrolados = np.unwrap(valores, period=12, axis=1)
+    corpo_troca, intervalo_troca, fronteira_troca = [], [], []
+    for c in range(len(corpos)):
+        for k in range(len(grade) - 1):
+            antes, depois = desenrolados[c, k], desenrolados[c, k + 1]
+            for fronteira in range(int(np.floor(antes)), int(np.floor(depois)), -1):
+                if depois < fronteira <= antes:
+                    corpo_troca.append(c)
+                    intervalo_troca.append(k)
+                    fronteira_troca.append(fronteira)
+    corpo_troca = np.array(corpo_troca, dtype=int)
+    fronteira_troca = np.array(fronteira_troca, dtype=float)
+    intervalo_troca = np.array(intervalo_troca, dtype=int)
+    # Regula falsi (variante Illinois), vetorizada: a posição é quase linear no passo da grade e cada
+    # rodada custa um cálculo de cúspides, então poucas rodadas em vez das bissecções
+    a, b = grade[intervalo_troca], grade[intervalo_troca + 1]
+    fa = desenrolados[corpo_troca, intervalo_troca] - fronteira_troca
+    fb = desenrolados[corpo_troca, intervalo_troca + 1] - fronteira_troca
+    lado = np.zeros(len(a), dtype=int)
+    instantes = a
+    for _ in range(ITERACOES_BISSECAO):
+        if not len(a):
+            break
+        instantes = b - fb * (b - a) / (fb - fa)
+        # Ainda antes da fronteira enquanto a posição (módulo 12) estiver acima dela
+        fm = (posicoes(instantes, corpo_troca) - fronteira_troca + 6) % 12 - 6
+        if np.abs(fm).max() < PRECISAO_POSICAO:
+            break
+        antes = fm > 0
+        fb = np.where(antes & (lado == 1), fb / 2, fb)
+        fa = np.where(~antes & (lado == -1), fa / 2, fa)
+        a, fa = np.where(antes, instantes, a), np.where(antes, fm, fa)
+        b, fb = np.where(antes, b, instantes), np.where(antes, fb, fm)
+        lado = np.where(antes, 1, -1)
+
+    janelas = {}
+    for c, (_, nome) in enumerate(corpos):
+        selecao = np.flatnonzero(corpo_troca == c)
+        ordem = selecao[np.argsort(instantes[selecao])]
+        casa = int(np.floor(valores[c, 0]))
+        inicio, lista = jd_inicio, []
+        for i in ordem.tolist():
+            lista.append((inicio, float(instantes[i]), casa))
+            inicio, casa = float(instantes[i]), (int(fronteira_troca[i]) - 2) % 12 + 1
+        lista.append((inicio, jd_fim, casa))
+        janelas[nome] = lista
+    return janelas
+
+def varrer_dia(data, lat, lon, modo_efemeride=None, corpos=PLANETAS_SWE):
+    """Intervalos do dia local `data` (date ou datetime) no local: signos dos corpos, ascendente e casas"""
+    inicio_local = datetime(data.year, data.month, data.day)
+    inicio_utc, zona, _ = local_para_utc(inicio_local, lat, lon)
+    fim_utc, _, _ = local_para_utc(inicio_local + timedelta(days=1), lat, lon)
+    jd_inicio, jd_fim = jd_de(inicio_utc), jd_de(fim_utc)
+    flags, motor = escolher_motor(jd_inicio, modo_efemeride)
+
+    def hora_local(julian_day):
+        return utc_para_local(utc_de(julian_day), lat, lon)[0].isoformat(timespec="seconds")
+
+    tempos, longitudes = amostrar_corpos(jd_inicio, jd_fim, flags, corpos)
+    mudancas = mudancas_de_signo(tempos, longitudes, flags, corpos)
+    obliquidade = calcular_posicao((jd_inicio + jd_fim) / 2, swe.ECL_NUT, flags)[0][0]
+    ascendente = janelas_ascendente(jd_inicio, jd_fim, lat, lon, obliquidade)
+    polar = abs(lat) >= 90 - obliquidade
+    casas = {} if polar else janelas_casas(jd_inicio, jd_fim, lat, lon, obliquidade, tempos, longitudes, corpos)
+
+    variaveis = {nome for _, nome, _, _ in mudancas}
+    return {
+        "data": inicio_local.date().isoformat(),
+        "fuso_horario": zona,
+        "inicio": hora_local(jd_inicio),
+        "fim": hora_local(jd_fim),
+        "motor": motor,
+        "casas_definidas": not polar,
+        "signos_certos": {
+            nome: SIGNOS[int(longitudes[c, 0] // 30) % 12]
+            for c, (_, nome) in enumerate(corpos) if nome not in variaveis
+        },
+        "mudancas_signo": [
+            {"corpo": nome, "de": de, "para": para, "hora": hora_local(jd)} for jd, nome, de, para in mudancas
+        ],
+        "ascendente": [
+            {"signo": signo, "inicio": hora_local(inicio), "fim": hora_local(fim)} for inicio, fim, signo in ascendente
+        ],
+        "casas": {
+            nome: [{"casa": casa, "inicio": hora_local(inicio), "fim": hora_local(fim)} for inicio, fim, casa in janelas]
+            for nome, janelas in casas.items()
+        }
+    }
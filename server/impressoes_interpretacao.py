@@ -0,0 +1,80 @@
+"""Impressões digitais (fingerprints) das seções de interpretação, para reaproveitar textos gerados.
+
+Cada seção de texto depende só de algumas características discretas do mapa (signos do Sol, da Lua e
+do ascendente, planeta dominante, aspectos principais...). A impressão de uma seção é o hash da forma
+canônica dessas características, com a versão: mapas diferentes com as mesmas características têm a
+mesma impressão e podem usar o mesmo texto em cache. O nome da pessoa não entra: textos guardados por
+impressão não devem citá-lo.
+
+Ao mudar o que uma seção usa (ou o texto que se espera dela), aumente a versão da seção; ao mudar a
+extração das características, aumente VERSAO_CARACTERISTICAS, o que invalida todas as impressões.
+"""
+import hashlib
+import json
+
+from catalogo_interpretacoes import LOCALE_PADRAO
+
+VERSAO_CARACTERISTICAS = 1
+
+# Seção: (versão, características de que o texto depende); as seções são as geradas em astralService.ts
+SECOES_IMPRESSAO = {
+    "perfil_resumido": (1, ("signo_solar", "signo_lunar", "ascendente", "planeta_dominante", "aspectos_chave")),
+    "interpretacao_completa": (1, (
+        "signo_solar", "signo_lunar", "ascendente", "meio_do_ceu", "planeta_dominante", "aspectos_chave", "fase_lua"
+    )),
+    "sugestoes": (1, ("signo_solar", "ascendente", "planeta_dominante")),
+    "nomes_sugeridos": (1, ("signo_solar", "ascendente", "meio_do_ceu")),
+    "alertas": (1, ("signo_solar", "ascendente", "aspectos_tensos")),
+    "planetas": (1, ("signos_planetas",)),
+    "aspectos": (1, ("aspectos_chave",)),
+    # As cúspides intermediárias variam com a latitude; o texto das casas fica no nível de ASC e MC
+    "casas": (1, ("signo_solar", "ascendente", "meio_do_ceu"))
+}
+
+# Aspectos principais: os que envolvem os luminares, dentro de uma orbe justa, os mais exatos primeiro
+LUMINARES = ("Sol", "Lua")
+ORBE_CHAVE = 3.0
+MAX_ASPECTOS_CHAVE = 3
+ASPECTOS_TENSOS = ("quadratura", "oposição")
+
+def aspectos_principais(aspectos):
+    """Aspectos com o Sol ou a Lua (formato de calcular_aspectos: planeta1, planeta2, aspecto, orbe)
+    como "Lua:Sol:trígono", pares em ordem alfabética, ordenados pela orbe"""
+    candidatos = sorted(
+        (a for a in aspectos if (a["planeta1"] in LUMINARES or a["planeta2"] in LUMINARES) and a["orbe"] <= ORBE_CHAVE),
+        key=lambda a: a["orbe"]
+    )[:MAX_ASPECTOS_CHAVE]
+    return sorted(":".join(sorted((a["planeta1"], a["planeta2"])) + [a["aspecto"].lower()]) for a in candidatos)
+
+def caracteristicas_interpretacao(signo_solar, ascendente, meio_do_ceu, planetas, aspectos, planeta_dominante,
+                                  fase_lua=None, locale=None):
+    """Todas as características que alguma seção usa; listas já em ordem canônica"""
+    principais = aspectos_principais(aspectos)
+    return {
+        "locale": locale or LOCALE_PADRAO,
+        "signo_solar": signo_solar,
+        "signo_lunar": next((p["signo"] for p in planetas if p["planeta"] == "Lua"), None),
+        "ascendente": ascendente,
+        "meio_do_ceu": meio_do_ceu,
+        "planeta_dominante": planeta_dominante,
+        "aspectos_chave": principais,
+        "aspectos_tensos": [a for a in principais if a.rsplit(":", 1)[1] in ASPECTOS_TENSOS],
+        "signos_planetas": {p["planeta"]: p["signo"] for p in planetas},
+        "fase_lua": fase_lua
+    }
+
+def impressao(secao, caracteristicas):
+    """Impressão "secao:vX.Y:hash" das características da seção (e do idioma), em JSON canônico"""
+    versao, usadas = SECOES_IMPRESSAO[secao]
+    subconjunto = {nome: caracteristicas[nome] for nome in ("locale",) + usadas}
+    canonico = json.dumps(subconjunto, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    resumo = hashlib.sha256(canonico.encode()).hexdigest()[:20]
+    return f"{secao}:v{VERSAO_CARACTERISTICAS}.{versao}:{resumo}", subconjunto
+
+def gerar_impressoes(caracteristicas, secoes=None):
+    """{seção: {"impressao", "caracteristicas"}}; as características servem para montar o texto sem o mapa"""
+    resultado = {}
+    for secao in secoes or SECOES_IMPRESSAO:
+        chave, subconjunto = impressao(secao, caracteristicas)
+        resultado[secao] = {"impressao": chave, "caracteristicas": subconjunto}
+    return resultado
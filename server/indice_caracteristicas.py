@@ -0,0 +1,315 @@
+"""Índice invertido de características do mapa para buscas entre usuários.
+
+Cada característica (signo e casa de cada corpo, pares em aspecto, elemento e qualidade dominantes) tem
+uma lista de postagens com as linhas dos usuários que a possuem, no formato dos bitmaps Roaring: as
+linhas são divididas em blocos de 65536; um bloco com poucas linhas guarda os 16 bits baixos num array
+ordenado (uint16) e um bloco denso vira um bitmap de 8 KB. As consultas E/OU combinam bloco a bloco
+com operações vetorizadas do numpy, sem ler o astral_map_data dos perfis.
+"""
+import json
+
+import numpy as np
+
+BITS_BLOCO = 16
+TAMANHO_BLOCO = 1 << BITS_BLOCO
+BYTES_BITMAP = TAMANHO_BLOCO // 8
+# Acima disso o bitmap (8 KB) ocupa menos que o array (2 bytes por linha); na remoção, o bitmap só volta
+# a ser array abaixo da metade, para não alternar a cada atualização
+LIMITE_ARRAY = 4096
+MAX_TERMOS_CONSULTA = 64
+
+CONTAGEM_BITS = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint16)
+
+def para_bitmap(conteiner):
+    if conteiner.dtype == np.uint8:
+        return conteiner
+    bits = np.zeros(TAMANHO_BLOCO, dtype=bool)
+    bits[conteiner] = True
+    return np.packbits(bits, bitorder="little")
+
+def para_array(bitmap):
+    return np.flatnonzero(np.unpackbits(bitmap, bitorder="little")).astype(np.uint16)
+
+def cardinalidade(conteiner):
+    return int(CONTAGEM_BITS[conteiner].sum()) if conteiner.dtype == np.uint8 else len(conteiner)
+
+def interseccao(a, b):
+    """E de dois blocos (array e/ou bitmap); devolve um novo bloco, sem alterar os operandos"""
+    if a.dtype == np.uint16 and b.dtype == np.uint16:
+        return np.intersect1d(a, b, assume_unique=True)
+    if b.dtype == np.uint16:
+        a, b = b, a
+    if a.dtype == np.uint16:
+        return a[(b[a >> 3] >> (a & 7).astype(np.uint8)) & 1 == 1]
+    return a & b
+
+def uniao(a, b):
+    """OU de dois blocos; o resultado vira bitmap quando passa do limite do array"""
+    if a.dtype == np.uint16 and b.dtype == np.uint16:
+        resultado = np.union1d(a, b).astype(np.uint16)
+        return para_bitmap(resultado) if len(resultado) > LIMITE_ARRAY else resultado
+    return para_bitmap(a) | para_bitmap(b)
+
+class ListaPostagens:
+    """Linhas dos usuários com uma característica, em blocos de array ordenado ou bitmap"""
+
+    def __init__(self):
+        self.blocos = {}
+        self.contagens = {}
+
+    def __len__(self):
+        return sum(self.contagens.values())
+
+    def adicionar(self, linha):
+        bloco, baixo = linha >> BITS_BLOCO, linha & (TAMANHO_BLOCO - 1)
+        conteiner = self.blocos.get(bloco)
+        if conteiner is None:
+            self.blocos[bloco] = np.array([baixo], dtype=np.uint16)
+            self.contagens[bloco] = 1
+            return True
+        if conteiner.dtype == np.uint8:
+            bit = np.uint8(1 << (baixo & 7))
+            if conteiner[baixo >> 3] & bit:
+                return False
+            conteiner[baixo >> 3] |= bit
+        else:
+            posicao = int(np.searchsorted(conteiner, baixo))
+            if posicao < len(conteiner) and conteiner[posicao] == baixo:
+                return False
+            conteiner = np.insert(conteiner, posicao, np.uint16(baixo))
+            self.blocos[bloco] = para_bitmap(conteiner) if len(conteiner) > LIMITE_ARRAY else conteiner
+        self.contagens[bloco] += 1
+        return True
+
+    def adicionar_varias(self, linhas):
+        """Carga em lote: une as linhas (array de inteiros) aos blocos existentes"""
+        linhas = np.unique(np.asarray(linhas, dtype=np.int64))
+        blocos = linhas >> BITS_BLOCO
+        limites = np.flatnonzero(np.diff(blocos)) + 1
+        for trecho in np.split(linhas, limites):
+            if not len(trecho):
+                continue
+            bloco = int(trecho[0] >> BITS_BLOCO)
+            novo = (trecho & (TAMANHO_BLOCO - 1)).astype(np.uint16)
+            if len(novo) > LIMITE_ARRAY:
+                novo = para_bitmap(novo)
+            existente = self.blocos.get(bloco)
+            self.blocos[bloco] = novo if existente is None else uniao(existente, novo)
+            self.contagens[bloco] = cardinalidade(self.blocos[bloco])
+
+    def remover(self, linha):
+        bloco, baixo = linha >> BITS_BLOCO, linha & (TAMANHO_BLOCO - 1)
+        conteiner = self.blocos.get(bloco)
+        if conteiner is None:
+            return False
+        if conteiner.dtype == np.uint8:
+            bit = np.uint8(1 << (baixo & 7))
+            if not conteiner[baixo >> 3] & bit:
+                return False
+            conteiner[baixo >> 3] &= ~bit
+            if self.contagens[bloco] - 1 <= LIMITE_ARRAY // 2:
+                self.blocos[bloco] = para_array(conteiner)
+        else:
+            posicao = int(np.searchsorted(conteiner, baixo))
+            if posicao == len(conteiner) or conteiner[posicao] != baixo:
+                return False
+            self.blocos[bloco] = np.delete(conteiner, posicao)
+        self.contagens[bloco] -= 1
+        if not self.contagens[bloco]:
+            del self.blocos[bloco], self.contagens[bloco]
+        return True
+
+    def bytes(self):
+        return sum(conteiner.nbytes for conteiner in self.blocos.values())
+
+def caracteristica_signo(corpo, signo):
+    return f"{corpo}:signo:{signo}"
+
+def caracteristica_casa(corpo, casa):
+    return f"{corpo}:casa:{int(casa)}"
+
+def caracteristica_aspecto(corpo1, corpo2, aspecto):
+    # Par em ordem alfabética: "Vênus trígono Júpiter" e "Júpiter trígono Vênus" são a mesma característica;
+    # nome do aspecto em minúsculas, como nos mapas salvos ("Trígono" na consulta também encontra)
+    primeiro, segundo = sorted((corpo1, corpo2))
+    return f"aspecto:{primeiro}:{segundo}:{aspecto.lower()}"
+
+def caracteristicas_mapa(planetas_dict, aspectos, elemento_dominante, qualidade_dominante):
+    """Características de um mapa. planetas_dict: {nome: {"signo", "casa"}} (casa opcional);
+    aspectos: (corpo1, corpo2, nome do aspecto, ...) como em aspectos_do_mapa_salvo."""
+    caracteristicas = set()
+    for nome, planeta in planetas_dict.items():
+        if planeta.get("signo"):
+            caracteristicas.add(caracteristica_signo(nome, planeta["signo"]))
+        if planeta.get("casa"):
+            caracteristicas.add(caracteristica_casa(nome, planeta["casa"]))
+    for corpo1, corpo2, aspecto, *_ in aspectos:
+        caracteristicas.add(caracteristica_aspecto(corpo1, corpo2, aspecto))
+    if elemento_dominante:
+        caracteristicas.add(f"elemento:{elemento_dominante}")
+    if qualidade_dominante:
+        caracteristicas.add(f"qualidade:{qualidade_dominante}")
+    return caracteristicas
+
+def normalizar_caracteristica(texto):
+    """Valida o formato de um termo de consulta e põe o par dos aspectos na ordem do índice"""
+    partes = [parte.strip() for parte in str(texto).split(":")]
+    if len(partes) == 2 and partes[0] in ("elemento", "qualidade") and partes[1]:
+        return f"{partes[0]}:{partes[1]}"
+    if len(partes) == 3 and partes[1] == "signo" and partes[0] and partes[2]:
+        return caracteristica_signo(partes[0], partes[2])
+    if len(partes) == 3 and partes[1] == "casa" and partes[2].isdigit() and 1 <= int(partes[2]) <= 12:
+        return caracteristica_casa(partes[0], partes[2])
+    if len(partes) == 4 and partes[0] == "aspecto" and all(partes[1:]):
+        return caracteristica_aspecto(*partes[1:])
+    raise ValueError(
+        f"Característica inválida: {texto} (use 'Corpo:signo:Signo', 'Corpo:casa:N', "
+        "'aspecto:Corpo1:Corpo2:Aspecto', 'elemento:X' ou 'qualidade:X')"
+    )
+
+def normalizar_consulta(consulta, termos=None):
+    """Árvore da consulta: um termo (texto) ou {"e": [...]} / {"ou": [...]} com subconsultas"""
+    termos = [0] if termos is None else termos
+    if isinstance(consulta, str):
+        termos[0] += 1
+        if termos[0] > MAX_TERMOS_CONSULTA:
+            raise ValueError(f"Consulta com mais de {MAX_TERMOS_CONSULTA} termos")
+        return normalizar_caracteristica(consulta)
+    if isinstance(consulta, dict) and len(consulta) == 1:
+        operador, operandos = next(iter(consulta.items()))
+        if operador in ("e", "ou") and isinstance(operandos, list) and operandos:
+            return {operador: [normalizar_consulta(operando, termos) for operando in operandos]}
+    raise ValueError('Consulta inválida: use um termo ou {"e": [...]} / {"ou": [...]}')
+
+class IndiceCaracteristicas:
+    """Listas de postagens por característica, com linhas reaproveitadas como no índice de compatibilidade"""
+
+    def __init__(self):
+        self.listas = {}
+        self.linhas = {}
+        self.usuarios = []
+        self.livres = []
+
+    def __len__(self):
+        return len(self.linhas)
+
+    def nova_linha(self):
+        if self.livres:
+            return self.livres.pop()
+        self.usuarios.append(None)
+        return len(self.usuarios) - 1
+
+    def lista(self, caracteristica):
+        if caracteristica not in self.listas:
+            self.listas[caracteristica] = ListaPostagens()
+        return self.listas[caracteristica]
+
+    def atualizar(self, user_id, caracteristicas):
+        """Insere ou substitui as características de um usuário (ao criar ou editar o perfil)"""
+        if user_id in self.linhas:
+            self.remover(user_id)
+        linha = self.nova_linha()
+        self.linhas[user_id] = linha
+        self.usuarios[linha] = user_id
+        for caracteristica in caracteristicas:
+            self.lista(caracteristica).adicionar(linha)
+
+    def atualizar_lote(self, itens):
+        """Carga em lote de (user_id, características): agrupa as linhas por característica antes de inserir"""
+        novas = {}
+        for user_id, caracteristicas in itens:
+            if user_id in self.linhas:
+                self.atualizar(user_id, caracteristicas)
+                continue
+            linha = self.nova_linha()
+            self.linhas[user_id] = linha
+            self.usuarios[linha] = user_id
+            for caracteristica in caracteristicas:
+                novas.setdefault(caracteristica, []).append(linha)
+        for caracteristica, linhas in novas.items():
+            self.lista(caracteristica).adicionar_varias(linhas)
+
+    def remover(self, user_id):
+        # As características de cada linha não são guardadas: a remoção percorre o vocabulário
+        # (algumas centenas de listas), o que custa menos memória que uma cópia por usuário
+        linha = self.linhas.pop(user_id, None)
+        if linha is None:
+            return False
+        for caracteristica, lista in list(self.listas.items()):
+            if lista.remover(linha) and not lista.blocos:
+                del self.listas[caracteristica]
+        self.usuarios[linha] = None
+        self.livres.append(linha)
+        return True
+
+    def avaliar(self, consulta):
+        """Blocos {bloco: array ou bitmap} das linhas que satisfazem a consulta normalizada"""
+        if isinstance(consulta, str):
+            lista = self.listas.get(consulta)
+            return dict(lista.blocos) if lista else {}
+        (operador, operandos), = consulta.items()
+        if operador == "e":
+            # Menor operando primeiro: os blocos ausentes nele descartam os demais sem calcular
+            resultados = sorted((self.avaliar(operando) for operando in operandos), key=len)
+            resultado = resultados[0]
+            for outro in resultados[1:]:
+                resultado = {
+                    bloco: interseccao(conteiner, outro[bloco])
+                    for bloco, conteiner in resultado.items() if bloco in outro
+                }
+                resultado = {bloco: conteiner for bloco, conteiner in resultado.items() if cardinalidade(conteiner)}
+                if not resultado:
+                    break
+            return resultado
+        resultado = {}
+        for operando in operandos:
+            for bloco, conteiner in self.avaliar(operando).items():
+                resultado[bloco] = uniao(resultado[bloco], conteiner) if bloco in resultado else conteiner
+        return resultado
+
+    def buscar(self, consulta, limite=100, deslocamento=0):
+        """Total de usuários que satisfazem a consulta e uma página deles (na ordem das linhas)"""
+        blocos = self.avaliar(normalizar_consulta(consulta))
+        total = sum(cardinalidade(conteiner) for conteiner in blocos.values())
+        user_ids = []
+        pular = deslocamento
+        for bloco in sorted(blocos):
+            if len(user_ids) >= limite:
+                break
+            conteiner = blocos[bloco]
+            tamanho = cardinalidade(conteiner)
+            if pular >= tamanho:
+                pular -= tamanho
+                continue
+            baixos = para_array(conteiner) if conteiner.dtype == np.uint8 else conteiner
+            linhas = (bloco << BITS_BLOCO) + baixos[pular:pular + limite - len(user_ids)].astype(np.int64)
+            pular = 0
+            user_ids.extend(self.usuarios[linha] for linha in linhas.tolist())
+        return {"total": total, "user_ids": user_ids}
+
+    def status(self):
+        return {
+            "usuarios": len(self),
+            "caracteristicas": len(self.listas),
+            "bytes_postagens": sum(lista.bytes() for lista in self.listas.values())
+        }
+
+def construir_do_banco(indice, conn, extrair, tamanho_lote=10000):
+    """Carga inicial a partir da tabela astrological_profiles; `extrair` converte o mapa salvo em características"""
+    with conn.cursor(name="indice_caracteristicas") as cur:
+        cur.itersize = tamanho_lote
+        cur.execute("""
+            SELECT user_id, json_build_object('planetas', astral_map_data->'planetas', 'casas', astral_map_data->'casas')::text
+            FROM astrological_profiles
+            WHERE astral_map_data IS NOT NULL
+        """)
+        lote = []
+        for user_id, mapa in cur:
+            caracteristicas = extrair(json.loads(mapa))
+            if caracteristicas:
+                lote.append((user_id, caracteristicas))
+            if len(lote) >= tamanho_lote:
+                indice.atualizar_lote(lote)
+                lote = []
+        indice.atualizar_lote(lote)
+    return indice
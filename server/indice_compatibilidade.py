@@ -0,0 +1,184 @@
+"""Índice de candidatos para compatibilidade (sinastria) em larga escala."""
+import json
+import math
+
+import numpy as np
+
+PONTOS_CHAVE = ["Sol", "Lua", "Ascendente", "Vênus", "Marte"]
+
+# Pares (ponto de quem busca, ponto do candidato, peso) considerados na pré-seleção
+PARES_SINASTRIA = [
+    ("Sol", "Lua", 3), ("Lua", "Sol", 3),
+    ("Vênus", "Marte", 3), ("Marte", "Vênus", 3),
+    ("Lua", "Lua", 2), ("Sol", "Sol", 1), ("Vênus", "Vênus", 1),
+    ("Sol", "Ascendente", 1), ("Ascendente", "Sol", 1),
+    ("Lua", "Ascendente", 1), ("Ascendente", "Lua", 1),
+    ("Vênus", "Ascendente", 1), ("Ascendente", "Vênus", 1)
+]
+
+# Conjunção, sextil e trígono (nos dois sentidos do zodíaco)
+ANGULOS_HARMONICOS = [0, 60, 120, 240, 300]
+ORBE_SINASTRIA = 6.0
+
+# Quantos candidatos da pré-seleção por faixas são reavaliados com as longitudes exatas
+FATOR_REAVALIACAO = 10
+
+class Faixa:
+    """Faixa de longitude de um ponto: lista de linhas com inserção e remoção O(1)"""
+
+    def __init__(self):
+        self.linhas = np.empty(16, dtype=np.int32)
+        self.tamanho = 0
+
+    def adicionar(self, linha):
+        if self.tamanho == len(self.linhas):
+            self.linhas = np.concatenate([self.linhas, np.empty(len(self.linhas), dtype=np.int32)])
+        self.linhas[self.tamanho] = linha
+        self.tamanho += 1
+        return self.tamanho - 1
+
+    def remover(self, posicao):
+        """Remove trocando com o último elemento; retorna a linha que mudou de posição (ou None)"""
+        self.tamanho -= 1
+        ultima = int(self.linhas[self.tamanho])
+        if posicao == self.tamanho:
+            return None
+        self.linhas[posicao] = ultima
+        return ultima
+
+    def ativas(self):
+        return self.linhas[:self.tamanho]
+
+class IndiceCompatibilidade:
+    """Agrupa os usuários por faixas de longitude dos pontos-chave e devolve candidatos a aspectos harmônicos"""
+
+    def __init__(self, tamanho_faixa=5.0, capacidade=1024):
+        self.tamanho_faixa = tamanho_faixa
+        self.num_faixas = int(math.ceil(360 / tamanho_faixa))
+        self.linhas = {}
+        self.usuarios = []
+        self.livres = []
+        self.longitudes = np.full((capacidade, len(PONTOS_CHAVE)), np.nan, dtype=np.float32)
+        self.posicoes = np.full((capacidade, len(PONTOS_CHAVE)), -1, dtype=np.int32)
+        self.faixas = [[Faixa() for _ in range(self.num_faixas)] for _ in PONTOS_CHAVE]
+
+    def __len__(self):
+        return len(self.linhas)
+
+    def faixa_de(self, grau):
+        return int(grau // self.tamanho_faixa) % self.num_faixas
+
+    def nova_linha(self):
+        if self.livres:
+            return self.livres.pop()
+        linha = len(self.usuarios)
+        if linha == len(self.longitudes):
+            self.longitudes = np.concatenate([self.longitudes, np.full_like(self.longitudes, np.nan)])
+            self.posicoes = np.concatenate([self.posicoes, np.full_like(self.posicoes, -1)])
+        self.usuarios.append(None)
+        return linha
+
+    def atualizar(self, user_id, pontos):
+        """Insere ou atualiza um usuário (chamado ao criar ou editar o perfil)"""
+        if user_id in self.linhas:
+            self.remover(user_id)
+        linha = self.nova_linha()
+        self.linhas[user_id] = linha
+        self.usuarios[linha] = user_id
+        for p, nome in enumerate(PONTOS_CHAVE):
+            grau = pontos.get(nome)
+            if grau is None:
+                continue
+            # A faixa é calculada sobre o valor armazenado (float32) para coincidir na remoção
+            self.longitudes[linha, p] = float(grau) % 360
+            self.posicoes[linha, p] = self.faixas[p][self.faixa_de(self.longitudes[linha, p])].adicionar(linha)
+
+    def remover(self, user_id):
+        linha = self.linhas.pop(user_id, None)
+        if linha is None:
+            return False
+        for p in range(len(PONTOS_CHAVE)):
+            posicao = int(self.posicoes[linha, p])
+            if posicao < 0:
+                continue
+            movida = self.faixas[p][self.faixa_de(self.longitudes[linha, p])].remover(posicao)
+            if movida is not None:
+                self.posicoes[movida, p] = posicao
+        self.longitudes[linha] = np.nan
+        self.posicoes[linha] = -1
+        self.usuarios[linha] = None
+        self.livres.append(linha)
+        return True
+
+    def faixas_alvo(self, grau):
+        """Faixas que podem conter um aspecto harmônico (dentro da orbe) com o grau informado"""
+        faixas = set()
+        for angulo in ANGULOS_HARMONICOS:
+            alvo = grau + angulo
+            primeira = int(math.floor((alvo - ORBE_SINASTRIA) / self.tamanho_faixa))
+            ultima = int(math.floor((alvo + ORBE_SINASTRIA) / self.tamanho_faixa))
+            faixas.update(f % self.num_faixas for f in range(primeira, ultima + 1))
+        return faixas
+
+    def pontuacao_exata(self, pontos, linhas):
+        """Pontuação pelas orbes reais dos aspectos harmônicos entre os pares de sinastria"""
+        pontuacao = np.zeros(len(linhas))
+        for ponto_busca, ponto_candidato, peso in PARES_SINASTRIA:
+            if pontos.get(ponto_busca) is None:
+                continue
+            graus = self.longitudes[linhas, PONTOS_CHAVE.index(ponto_candidato)].astype(float)
+            distancia = np.abs((graus - float(pontos[ponto_busca]) + 180) % 360 - 180)
+            orbe = np.min(np.abs(distancia[:, None] - np.array([0, 60, 120])), axis=1)
+            pontuacao += np.where(orbe <= ORBE_SINASTRIA, peso * (1 - orbe / ORBE_SINASTRIA), 0)
+        return pontuacao
+
+    def buscar(self, pontos, limite=20, excluir=None):
+        """Retorna os candidatos com maior chance de aspectos harmônicos com o mapa consultado"""
+        total_linhas = len(self.usuarios)
+        if not total_linhas:
+            return []
+        pontuacao = np.zeros(total_linhas)
+        for ponto_busca, ponto_candidato, peso in PARES_SINASTRIA:
+            if pontos.get(ponto_busca) is None:
+                continue
+            faixas = self.faixas[PONTOS_CHAVE.index(ponto_candidato)]
+            membros = [faixas[f].ativas() for f in self.faixas_alvo(float(pontos[ponto_busca]) % 360)]
+            if membros:
+                pontuacao += peso * np.bincount(np.concatenate(membros), minlength=total_linhas)
+        if excluir in self.linhas:
+            pontuacao[self.linhas[excluir]] = 0
+
+        preselecao = min(limite * FATOR_REAVALIACAO, int(np.count_nonzero(pontuacao)))
+        if preselecao == 0:
+            return []
+        linhas = np.argpartition(-pontuacao, preselecao - 1)[:preselecao]
+        exata = self.pontuacao_exata(pontos, linhas)
+        ordem = np.argsort(-exata, kind="stable")[:limite]
+        return [
+            {"user_id": self.usuarios[linhas[i]], "pontuacao": round(float(exata[i]), 3)}
+            for i in ordem if exata[i] > 0
+        ]
+
+def extrair_pontos_chave(planetas, casas=None):
+    """Sol, Lua, Vênus e Marte de {nome: {"graus", ...}} (planetas_do_mapa) e o Ascendente pela cúspide da
+    casa 1, quando o mapa traz as casas"""
+    pontos = {nome: planeta["graus"] for nome, planeta in planetas.items() if nome in PONTOS_CHAVE}
+    ascendente = next((c.get("grau") for c in casas or [] if c.get("numero") == 1), None)
+    if ascendente is not None:
+        pontos["Ascendente"] = ascendente
+    return pontos
+
+def construir_do_banco(indice, conn, extrair, tamanho_lote=10000):
+    """Carga inicial do índice a partir da tabela astrological_profiles; `extrair` converte o mapa salvo em pontos"""
+    with conn.cursor(name="indice_compatibilidade") as cur:
+        cur.itersize = tamanho_lote
+        cur.execute("""
+            SELECT user_id, json_build_object('planetas', astral_map_data->'planetas', 'casas', astral_map_data->'casas')::text
+            FROM astrological_profiles
+            WHERE astral_map_data IS NOT NULL
+        """)
+        for user_id, mapa in cur:
+            pontos = extrair(json.loads(mapa))
+            if pontos:
+                indice.atualizar(user_id, pontos)
+    return indice
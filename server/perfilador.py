@@ -0,0 +1,178 @@
+"""Perfilador por amostragem para o tráfego real, ligado sob demanda por alguns segundos.
+
+Uma thread lê periodicamente a pilha de todas as threads (sys._current_frames) e atribui cada amostra
+à rota que a thread está atendendo: nas threads do threadpool, pelo frame da função do endpoint; no loop
+de eventos (serialização e middlewares), pelo `scope["route"]` que o Starlette deixa no escopo da
+requisição. Threads sem requisição (ociosas) não entram. O resultado sai em pilhas colapsadas
+("rota;frame;frame contagem"), o formato de entrada do flamegraph.pl e do speedscope.
+
+Com alocações, o tracemalloc fica ligado durante a janela e o resultado traz as linhas que mais
+cresceram em memória entre o início e o fim (para todo o processo: o tracemalloc não separa por rota).
+O tracemalloc deixa todas as alocações mais lentas enquanto está ligado.
+"""
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+INTERVALO_PADRAO = 0.005
+PROFUNDIDADE_ALOCACOES = 25
+MAX_LINHAS_ALOCACOES = 30
+MAX_FUNCOES_ROTA = 15
+
+class PerfiladorOcupado(Exception):
+    pass
+
+def rotulo(codigo):
+    return f"{os.path.basename(codigo.co_filename)}:{codigo.co_name}"
+
+class Perfilador:
+    """Uma sessão de amostragem; `rotas` mapeia o código de cada endpoint ao caminho da rota e as rotas
+    em `ignorar` (o próprio endpoint do perfilador) não entram nas amostras"""
+
+    def __init__(self, rotas, intervalo=INTERVALO_PADRAO, alocacoes=False, ignorar=()):
+        self.rotas = rotas
+        self.ignorar = set(ignorar)
+        self.intervalo = intervalo
+        self.alocacoes = alocacoes
+        self.pilhas = Counter()
+        self.amostras = 0
+        self.ociosas = 0
+        self.rodadas = 0
+        self.rotulos = {}
+        self.parar_evento = threading.Event()
+        self.thread = threading.Thread(target=self.amostrar, name="perfilador", daemon=True)
+        self.snapshot_inicial = None
+        self.iniciou_tracemalloc = False
+        self.inicio = None
+
+    def rotulo(self, codigo):
+        if codigo not in self.rotulos:
+            self.rotulos[codigo] = rotulo(codigo)
+        return self.rotulos[codigo]
+
+    def rota_da_pilha(self, frame):
+        """(rota, pilha colapsada da raiz para a folha) ou (None, None) se a thread não atende requisição"""
+        frames = []
+        rota = None
+        while frame is not None:
+            frames.append(frame)
+            codigo = frame.f_code
+            if codigo in self.rotas:
+                rota = self.rotas[codigo]
+                break
+            if "scope" in codigo.co_varnames:
+                escopo = frame.f_locals.get("scope")
+                if isinstance(escopo, dict) and "route" in escopo:
+                    rota = getattr(escopo["route"], "path", None) or str(escopo["route"])
+                    break
+            frame = frame.f_back
+        if rota is None:
+            return None, None
+        return rota, ";".join(self.rotulo(f.f_code) for f in reversed(frames))
+
+    def amostrar(self):
+        proprio = threading.get_ident()
+        while not self.parar_evento.wait(self.intervalo):
+            self.rodadas += 1
+            for ident, frame in sys._current_frames().items():
+                if ident == proprio:
+                    continue
+                rota, pilha = self.rota_da_pilha(frame)
+                if rota in self.ignorar:
+                    continue
+                if rota is None:
+                    self.ociosas += 1
+                    continue
+                self.amostras += 1
+                self.pilhas[(rota, pilha)] += 1
+
+    def iniciar(self):
+        if self.alocacoes:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(PROFUNDIDADE_ALOCACOES)
+                self.iniciou_tracemalloc = True
+            self.snapshot_inicial = tracemalloc.take_snapshot()
+        self.inicio = time.monotonic()
+        self.thread.start()
+
+    def parar(self):
+        self.parar_evento.set()
+        self.thread.join()
+        resultado = {
+            "duracao": round(time.monotonic() - self.inicio, 3),
+            "intervalo_ms": self.intervalo * 1000,
+            "rodadas": self.rodadas,
+            "amostras": self.amostras,
+            "ociosas": self.ociosas,
+            "rotas": self.resumo_rotas()
+        }
+        if self.alocacoes:
+            resultado["alocacoes"] = self.diferenca_alocacoes()
+        return resultado
+
+    def resumo_rotas(self):
+        """Amostras por rota e as funções em que elas mais estavam (tempo próprio, na folha da pilha)"""
+        rotas = {}
+        for (rota, pilha), quantidade in self.pilhas.items():
+            resumo = rotas.setdefault(rota, {"amostras": 0, "folhas": Counter()})
+            resumo["amostras"] += quantidade
+            resumo["folhas"][pilha.rsplit(";", 1)[-1]] += quantidade
+        return {
+            rota: {
+                "amostras": resumo["amostras"],
+                "fracao": round(resumo["amostras"] / self.amostras, 4) if self.amostras else 0.0,
+                "funcoes": [
+                    {"funcao": funcao, "amostras": quantidade}
+                    for funcao, quantidade in resumo["folhas"].most_common(MAX_FUNCOES_ROTA)
+                ]
+            }
+            for rota, resumo in sorted(rotas.items(), key=lambda item: -item[1]["amostras"])
+        }
+
+    def colapsado(self, rota=None):
+        """Linhas "rota;frame;...;frame contagem" (a rota é a raiz, separando o flamegraph por rota)"""
+        return "\n".join(
+            f"{rota_pilha};{pilha} {quantidade}"
+            for (rota_pilha, pilha), quantidade in sorted(self.pilhas.items())
+            if rota is None or rota_pilha == rota
+        )
+
+    def diferenca_alocacoes(self):
+        final = tracemalloc.take_snapshot()
+        if self.iniciou_tracemalloc:
+            tracemalloc.stop()
+        filtros = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        diferencas = final.filter_traces(filtros).compare_to(self.snapshot_inicial.filter_traces(filtros), "lineno")
+        return [
+            {
+                "local": f"{os.path.basename(d.traceback[0].filename)}:{d.traceback[0].lineno}",
+                "bytes": d.size,
+                "diferenca_bytes": d.size_diff,
+                "blocos": d.count,
+                "diferenca_blocos": d.count_diff
+            }
+            for d in diferencas[:MAX_LINHAS_ALOCACOES]
+        ]
+
+trava_perfilador = threading.Lock()
+
+def iniciar_sessao(rotas, intervalo=INTERVALO_PADRAO, alocacoes=False, ignorar=()):
+    """Inicia uma sessão; só uma por vez no processo (PerfiladorOcupado se já houver outra)"""
+    if not trava_perfilador.acquire(blocking=False):
+        raise PerfiladorOcupado("Já existe uma sessão do perfilador em andamento")
+    try:
+        perfilador = Perfilador(rotas, intervalo, alocacoes, ignorar)
+        perfilador.iniciar()
+    except Exception:
+        trava_perfilador.release()
+        raise
+    return perfilador
+
+def encerrar_sessao(perfilador):
+    try:
+        return perfilador.parar()
+    finally:
+        trava_perfilador.release()
@@ -0,0 +1,115 @@
+"""Pontos médios (midpoints), diais de 360°/90°/45° e cartas harmônicas, vetorizados sobre lotes de mapas.
+
+As funções recebem longitudes em arrays (mapas, pontos), com os pontos na mesma ordem em todos os mapas,
+e calculam todos os pares (O(n²)) e todas as ativações ponto × par (O(n³)) de uma vez com o numpy; um
+único mapa é um lote de tamanho 1.
+
+No dial de 90° (e no de 45°) o ponto médio próximo e o distante (a 180°) caem no mesmo lugar; no dial
+de 360° os dois contam para as ativações. O Nodo Sul é sempre oposto ao Nodo Norte e por isso fica de
+fora: nos diais de 90° e 45° os dois são o mesmo ponto.
+"""
+import numpy as np
+
+DIAIS = (360, 90, 45)
+DIAL_ATIVACOES = 90
+ORBE_PONTO_MEDIO = 1.5
+HARMONICOS_PADRAO = (5, 7, 9)
+ORBE_HARMONICO = 6.0
+
+def pares(quantidade):
+    """Índices (i, j), i < j, de todos os pares de pontos"""
+    return np.triu_indices(quantidade, 1)
+
+def calcular_pontos_medios(longitudes):
+    """Ponto médio do arco menor de cada par: (mapas, pares)"""
+    longitudes = np.atleast_2d(np.asarray(longitudes, dtype=float))
+    i, j = pares(longitudes.shape[1])
+    diferenca = (longitudes[:, j] - longitudes[:, i]) % 360
+    medio = (longitudes[:, i] + diferenca / 2) % 360
+    return np.where(diferenca > 180, (medio + 180) % 360, medio)
+
+def ordenar_no_dial(pontos_medios, dial):
+    """Posição no dial (graus módulo `dial`) e a ordem dos pares ao longo dele: arrays (mapas, pares)"""
+    no_dial = pontos_medios % dial
+    return no_dial, np.argsort(no_dial, axis=1, kind="stable")
+
+def distancia_no_dial(a, b, modulo):
+    return np.abs((a - b + modulo / 2) % modulo - modulo / 2)
+
+def calcular_ativacoes(longitudes, pontos_medios=None, dial=DIAL_ATIVACOES, orbe=ORBE_PONTO_MEDIO):
+    """Pontos que ativam pontos médios dentro da orbe no dial: arrays (mapa, ponto, par, distância).
+
+    Um ponto não ativa os pares de que faz parte. No dial de 360° conta a conjunção com qualquer dos dois
+    pontos médios do par (módulo 180°).
+    """
+    longitudes = np.atleast_2d(np.asarray(longitudes, dtype=float))
+    if pontos_medios is None:
+        pontos_medios = calcular_pontos_medios(longitudes)
+    modulo = 180 if dial == 360 else dial
+    distancias = distancia_no_dial(longitudes[:, :, None], pontos_medios[:, None, :], modulo)
+    i, j = pares(longitudes.shape[1])
+    pontos = np.arange(longitudes.shape[1])[:, None]
+    proprio = (pontos == i[None, :]) | (pontos == j[None, :])
+    mapa, ponto, par = np.nonzero((distancias <= orbe) & ~proprio[None, :, :])
+    return mapa, ponto, par, distancias[mapa, ponto, par]
+
+def cartas_harmonicas(longitudes, harmonicos=HARMONICOS_PADRAO):
+    """Longitudes das cartas harmônicas (longitude × harmônico, módulo 360): (harmônicos, mapas, pontos)"""
+    longitudes = np.atleast_2d(np.asarray(longitudes, dtype=float))
+    return (np.asarray(harmonicos, dtype=float)[:, None, None] * longitudes[None, :, :]) % 360
+
+def conjuncoes_harmonicas(harmonicas, orbe=ORBE_HARMONICO):
+    """Conjunções na carta harmônica (aspectos da série do harmônico no mapa natal): (harmônico, mapa, par, distância)"""
+    i, j = pares(harmonicas.shape[-1])
+    distancias = distancia_no_dial(harmonicas[..., i], harmonicas[..., j], 360)
+    harmonico, mapa, par = np.nonzero(distancias <= orbe)
+    return harmonico, mapa, par, distancias[harmonico, mapa, par]
+
+def descrever_pontos_medios(pontos, dial_ativacoes=DIAL_ATIVACOES, orbe=ORBE_PONTO_MEDIO):
+    """Seção de um mapa: pontos médios ordenados em cada dial e ativações. pontos: {nome: longitude}"""
+    nomes = list(pontos)
+    longitudes = np.array([[pontos[nome] for nome in nomes]], dtype=float)
+    i, j = pares(len(nomes))
+    nomes_pares = [f"{nomes[a]}/{nomes[b]}" for a, b in zip(i.tolist(), j.tolist())]
+    medios = calcular_pontos_medios(longitudes)
+
+    diais = {}
+    for dial in DIAIS:
+        no_dial, ordem = ordenar_no_dial(medios, dial)
+        diais[str(dial)] = [
+            {"par": nomes_pares[p], "grau": round(float(no_dial[0, p]), 2)} for p in ordem[0].tolist()
+        ]
+    _, ponto, par, distancia = calcular_ativacoes(longitudes, medios, dial_ativacoes, orbe)
+    ativacoes = sorted(
+        (
+            {"ponto": nomes[k], "par": nomes_pares[p], "orbe": round(float(d), 2)}
+            for k, p, d in zip(ponto.tolist(), par.tolist(), distancia.tolist())
+        ),
+        key=lambda a: a["orbe"]
+    )
+    return {"dial_ativacoes": dial_ativacoes, "orbe": orbe, "diais": diais, "ativacoes": ativacoes}
+
+def descrever_harmonicos(pontos, signos, harmonicos=HARMONICOS_PADRAO, orbe=ORBE_HARMONICO):
+    """Seção de um mapa: posições de cada carta harmônica (com os nomes dos 12 signos de `signos`)
+    e as conjunções nela"""
+    nomes = list(pontos)
+    longitudes = np.array([[pontos[nome] for nome in nomes]], dtype=float)
+    harmonicas = cartas_harmonicas(longitudes, harmonicos)
+    i, j = pares(len(nomes))
+    harmonico, _, par, distancia = conjuncoes_harmonicas(harmonicas, orbe)
+    resultado = {}
+    for h, numero in enumerate(harmonicos):
+        resultado[f"H{numero}"] = {
+            "posicoes": [
+                {"ponto": nome, "signo": signos[int(grau // 30) % 12], "grau": round(grau, 2)}
+                for nome, grau in zip(nomes, harmonicas[h, 0].tolist())
+            ],
+            "conjuncoes": sorted(
+                (
+                    {"entre": f"{nomes[i[p]]} e {nomes[j[p]]}", "orbe": round(float(d), 2)}
+                    for hh, p, d in zip(harmonico.tolist(), par.tolist(), distancia.tolist()) if hh == h
+                ),
+                key=lambda c: c["orbe"]
+            )
+        }
+    return resultado
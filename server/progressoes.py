@@ -0,0 +1,157 @@
+import bisect
+import math
+import swisseph as swe
+
+from efemerides import escolher_motor, calcular_posicao
+from astral_api_advanced import PLANETAS_SWE, ASPECTOS_GRAUS, calcular_signo, identificar_casa
+
+# Progressões secundárias: cada dia de efeméride após o nascimento equivale a um ano de vida.
+DIAS_POR_ANO = 365.2422
+
+# Subdivisões de cada dia progredido usadas na busca de cruzamentos (cobre estações retrógradas)
+SUBPASSOS = 4
+
+LUNACOES = [
+    (0, "Lua Nova"),
+    (90, "Quarto Crescente"),
+    (180, "Lua Cheia"),
+    (270, "Quarto Minguante")
+]
+
+def calcular_efemeride_progressao(jd_natal, ano_inicio, ano_fim, flags=swe.FLG_SWIEPH | swe.FLG_SPEED):
+    """Calcula posição e velocidade diárias de cada planeta uma única vez para todo o intervalo"""
+    primeiro_dia = int(math.floor(ano_inicio))
+    ultimo_dia = max(int(math.ceil(ano_fim)), primeiro_dia + 1)
+    efemeride = {}
+    for planeta_id, nome in PLANETAS_SWE:
+        posicoes, velocidades = [], []
+        for dia in range(primeiro_dia, ultimo_dia + 1):
+            pos, _ = calcular_posicao(jd_natal + dia, planeta_id, flags)
+            if posicoes:
+                # Longitudes "desenroladas" para que a interpolação não salte em 360°
+                anterior = posicoes[-1]
+                posicoes.append(anterior + (pos[0] - anterior + 180) % 360 - 180)
+            else:
+                posicoes.append(pos[0])
+            velocidades.append(pos[3])
+        efemeride[nome] = (posicoes, velocidades)
+    return {"primeiro_dia": primeiro_dia, "ultimo_dia": ultimo_dia, "planetas": efemeride}
+
+def interpolar_longitude(efemeride, nome, ano):
+    """Interpolação de Hermite (posição + velocidade) da longitude progredida, sem normalizar"""
+    posicoes, velocidades = efemeride["planetas"][nome]
+    i = min(int(math.floor(ano)) - efemeride["primeiro_dia"], len(posicoes) - 2)
+    t = ano - (efemeride["primeiro_dia"] + i)
+    t2, t3 = t * t, t * t * t
+    return ((2 * t3 - 3 * t2 + 1) * posicoes[i] + (t3 - 2 * t2 + t) * velocidades[i]
+            + (-2 * t3 + 3 * t2) * posicoes[i + 1] + (t3 - t2) * velocidades[i + 1])
+
+def data_do_ano_progredido(jd_natal, ano):
+    """Data civil correspondente a uma idade (em anos) após o nascimento"""
+    ano_civil, mes, dia, _ = swe.revjul(jd_natal + ano * DIAS_POR_ANO)
+    return f"{ano_civil:04d}-{mes:02d}-{dia:02d}"
+
+def montar_alvos(natal, cuspides):
+    """Monta a lista ordenada de longitudes cujo cruzamento gera um evento"""
+    alvos = []
+    for i in range(12):
+        alvos.append((i * 30.0, ("mudanca_signo", i)))
+        alvos.append((cuspides[i] % 360, ("mudanca_casa", i)))
+    for ponto, grau in natal.items():
+        for aspecto, angulo in ASPECTOS_GRAUS.items():
+            for valor in {(grau + angulo) % 360, (grau - angulo) % 360}:
+                alvos.append((valor, ("aspecto", ponto, aspecto)))
+    alvos.sort(key=lambda alvo: alvo[0])
+    return [alvo[0] for alvo in alvos], [alvo[1] for alvo in alvos]
+
+def encontrar_cruzamentos(funcao, inicio, fim, valores):
+    """Encontra os instantes em que a função monotônica cruza cada valor (mod 360)"""
+    a, b = funcao(inicio), funcao(fim)
+    baixo, alto = min(a, b), max(a, b)
+    cruzamentos = []
+    for volta in range(int(math.floor(baixo / 360)), int(math.floor(alto / 360)) + 1):
+        base = volta * 360
+        esquerda = bisect.bisect_right(valores, baixo - base)
+        direita = bisect.bisect_right(valores, alto - base)
+        for indice in range(esquerda, direita):
+            alvo = valores[indice] + base
+            # Regula falsi (variante Illinois): a função é quase linear dentro do subpasso
+            x0, f0, x1, f1 = inicio, a - alvo, fim, b - alvo
+            x = x1
+            for _ in range(12):
+                if f1 == f0:
+                    break
+                x = x1 - f1 * (x1 - x0) / (f1 - f0)
+                fx = funcao(x) - alvo
+                if abs(fx) < 1e-9:
+                    break
+                if fx * f1 < 0:
+                    x0, f0 = x1, f1
+                else:
+                    f0 /= 2
+                x1, f1 = x, fx
+            cruzamentos.append((x, indice, b > a))
+    return cruzamentos
+
+def gerar_linha_do_tempo_progressoes(jd_natal, cuspides, ascmc, ano_inicio=0, ano_fim=90, passo=1, modo_efemeride=None):
+    """Escolhe o motor e calcula efeméride e posições natais já na chamada (EfemerideIndisponivel sai daqui,
+    antes da resposta começar); retorna (motor, gerador das linhas da linha do tempo ano a ano)"""
+    flags, motor = escolher_motor(jd_natal, modo_efemeride)
+    efemeride = calcular_efemeride_progressao(jd_natal, ano_inicio, ano_fim, flags)
+    natal = {nome: calcular_posicao(jd_natal, planeta_id, flags)[0][0] for planeta_id, nome in PLANETAS_SWE}
+    natal["Ascendente"] = ascmc[0]
+    natal["Meio do Céu"] = ascmc[1]
+    valores, eventos_alvo = montar_alvos(natal, cuspides)
+    return motor, percorrer_linha_do_tempo(jd_natal, cuspides, efemeride, valores, eventos_alvo, ano_inicio, ano_fim, passo)
+
+def percorrer_linha_do_tempo(jd_natal, cuspides, efemeride, valores, eventos_alvo, ano_inicio, ano_fim, passo):
+    """Gera (em streaming) posições e eventos de cada passo; só interpola, não chama o motor"""
+    valores_lunacao = [angulo for angulo, _ in LUNACOES]
+
+    def longitude(nome):
+        return lambda ano: interpolar_longitude(efemeride, nome, ano)
+
+    def elongacao(ano):
+        return interpolar_longitude(efemeride, "Lua", ano) - interpolar_longitude(efemeride, "Sol", ano)
+
+    ano = ano_inicio
+    while ano < ano_fim:
+        proximo = min(ano + passo, ano_fim)
+        planetas = {}
+        for _, nome in PLANETAS_SWE:
+            grau = interpolar_longitude(efemeride, nome, ano) % 360
+            planetas[nome] = {"grau": round(grau, 2), "signo": calcular_signo(grau), "casa": identificar_casa(grau, cuspides)}
+        yield {"tipo": "posicoes", "idade": round(ano, 3), "data": data_do_ano_progredido(jd_natal, ano), "planetas": planetas}
+
+        eventos = []
+        largura = (proximo - ano) / SUBPASSOS
+        for k in range(SUBPASSOS):
+            inicio = ano + k * largura
+            fim = proximo if k == SUBPASSOS - 1 else inicio + largura
+            for _, nome in PLANETAS_SWE:
+                for instante, indice, direto in encontrar_cruzamentos(longitude(nome), inicio, fim, valores):
+                    if instante <= 1e-6:
+                        continue
+                    alvo = eventos_alvo[indice]
+                    if alvo[0] == "mudanca_signo":
+                        signo_index = alvo[1] if direto else (alvo[1] - 1) % 12
+                        evento = {"tipo": "mudanca_signo", "planeta": nome, "signo": calcular_signo(signo_index * 30)}
+                    elif alvo[0] == "mudanca_casa":
+                        casa = alvo[1] + 1 if direto else (alvo[1] - 1) % 12 + 1
+                        evento = {"tipo": "mudanca_casa", "planeta": nome, "casa": casa}
+                    else:
+                        evento = {"tipo": "aspecto", "planeta": nome, "ponto_natal": alvo[1], "aspecto": alvo[2]}
+                    evento["retrogrado"] = not direto
+                    eventos.append((instante, evento))
+            for instante, indice, _ in encontrar_cruzamentos(elongacao, inicio, fim, valores_lunacao):
+                if instante <= 1e-6:
+                    continue
+                grau_lua = interpolar_longitude(efemeride, "Lua", instante) % 360
+                eventos.append((instante, {"tipo": "lunacao", "fase": LUNACOES[indice][1], "signo": calcular_signo(grau_lua)}))
+
+        eventos.sort(key=lambda evento: evento[0])
+        for instante, evento in eventos:
+            evento["idade"] = round(instante, 3)
+            evento["data"] = data_do_ano_progredido(jd_natal, instante)
+            yield evento
+        ano = proximo
@@ -0,0 +1,152 @@
+"""Ranking de relocação: para um instante de nascimento, pontua todos os municípios pelos objetivos do usuário.
+
+As posições dos corpos não mudam com o local; só o RAMC, a latitude e, com eles, os ângulos e as casas.
+As cúspides de Placidus são calculadas de uma vez para todos os municípios, e cada corpo cai na casa pela
+sua longitude eclíptica, como no mapa relocado.
+"""
+import numpy as np
+import swisseph as swe
+
+from astral_api_advanced import PLANETAS_SWE, SIGNOS
+from efemerides import escolher_motor, calcular_posicao
+
+POSICOES = {
+    "angular": (1, 4, 7, 10),
+    "sucedente": (2, 5, 8, 11),
+    "cadente": (3, 6, 9, 12)
+}
+CUSPIDE_ANGULO = {"ASC": 1, "IC": 4, "DSC": 7, "MC": 10}
+ITERACOES_CUSPIDES = 30
+
+class Municipios:
+    """Colunas dos municípios com coordenadas, em arrays para o cálculo vetorizado"""
+
+    def __init__(self, ids, nomes, estados, latitudes, longitudes):
+        self.ids = ids
+        self.nomes = nomes
+        self.estados = estados
+        self.latitudes = np.asarray(latitudes, dtype=float)
+        self.longitudes = np.asarray(longitudes, dtype=float)
+
+    def __len__(self):
+        return len(self.ids)
+
+def carregar_municipios(conn):
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT id, name, state_code, latitude, longitude
+            FROM brazilian_municipalities
+            WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+            ORDER BY id
+        """)
+        linhas = cur.fetchall()
+    colunas = list(zip(*linhas)) if linhas else [[], [], [], [], []]
+    return Municipios(*(list(coluna) for coluna in colunas))
+
+def calcular_angulos(ramc, latitudes, obliquidade):
+    """Longitude eclíptica do ASC e do MC (graus) para cada RAMC/latitude"""
+    ramc, latitudes, eps = np.radians(ramc), np.radians(latitudes), np.radians(obliquidade)
+    meio_ceu = np.arctan2(np.sin(ramc), np.cos(ramc) * np.cos(eps))
+    ascendente = np.arctan2(np.cos(ramc), -(np.sin(ramc) * np.cos(eps) + np.tan(latitudes) * np.sin(eps)))
+    return np.degrees(ascendente) % 360, np.degrees(meio_ceu) % 360
+
+def calcular_cuspides_placidus(ramc, latitudes, obliquidade, iteracoes=ITERACOES_CUSPIDES):
+    """Cúspides de Placidus (graus, arrays (n, 12)) para cada RAMC/latitude, por iteração de ponto fixo.
+
+    A cúspide 11 (12) é o ponto da eclíptica que já percorreu 1/3 (2/3) do seu semiarco diurno desde o
+    MC; a 2 (3) está a 2/3 (1/3) do semiarco noturno antes do IC. A declinação depende da ascensão reta
+    procurada, daí a iteração. Acima do círculo polar o sistema não é definido (NaN).
+    """
+    ramc = np.asarray(ramc, dtype=float)
+    eps = np.radians(np.asarray(obliquidade, dtype=float))[..., None]
+    tan_latitude = np.tan(np.radians(np.asarray(latitudes, dtype=float)))[..., None]
+    ascendente, meio_ceu = calcular_angulos(ramc, latitudes, obliquidade)
+    cuspides = np.empty(ramc.shape + (12,))
+    cuspides[..., 0], cuspides[..., 9] = ascendente, meio_ceu
+    # As quatro cúspides intermediárias iteram juntas (última dimensão): AR = base + fração * semiarco diurno,
+    # com base no RAMC (11, 12) ou no IC menos o semiarco noturno inteiro (2, 3)
+    fracoes = np.array([1 / 3, 2 / 3, 2 / 3, 1 / 3])
+    base = np.radians(ramc)[..., None] + np.array([0, 0, np.pi / 3, 2 * np.pi / 3])
+    ascensao = base + fracoes * np.pi / 2
+    with np.errstate(invalid="ignore"):
+        for _ in range(iteracoes):
+            longitude = np.arctan2(np.sin(ascensao), np.cos(ascensao) * np.cos(eps))
+            cos_semiarco = -tan_latitude * np.tan(np.arcsin(np.sin(eps) * np.sin(longitude)))
+            ascensao = base + fracoes * np.arccos(np.where(np.abs(cos_semiarco) <= 1, cos_semiarco, np.nan))
+    longitude = np.degrees(np.arctan2(np.sin(ascensao), np.cos(ascensao) * np.cos(eps)))
+    cuspides[..., [10, 11, 1, 2]] = longitude % 360
+    # Casas opostas
+    for casa in (11, 12, 1, 2, 3, 10):
+        cuspides[..., (casa + 5) % 12] = (cuspides[..., casa - 1] + 180) % 360
+    return cuspides
+
+def posicao_nas_cuspides(longitudes, cuspides):
+    """Posição contínua nas casas (1.0 a 12.99...) pela longitude eclíptica, com broadcasting.
+
+    A parte inteira é a casa de identificar_casa (a cúspide com o menor avanço até a longitude) e a
+    fração, quanto da casa já foi percorrido. `longitudes` (..., corpos) e `cuspides` (..., 12), em graus.
+    """
+    cuspides = np.asarray(cuspides)[..., None, :]
+    avanco = (np.asarray(longitudes)[..., None] - cuspides) % 360
+    largura = np.broadcast_to((np.roll(cuspides, -1, axis=-1) - cuspides) % 360, avanco.shape)
+    casa = np.argmin(avanco, axis=-1)[..., None]
+    fracao = np.take_along_axis(avanco, casa, axis=-1) / np.take_along_axis(largura, casa, axis=-1)
+    return (casa + 1 + fracao)[..., 0]
+
+def distancia_cuspide(posicoes, cuspide):
+    """Distância (em casas) até a cúspide, nos dois sentidos"""
+    return np.abs((posicoes - cuspide + 6) % 12 - 6)
+
+def pontuar(posicoes, objetivos, nomes_corpos):
+    """Soma dos objetivos; "angular" e ângulos específicos pontuam mais quanto mais perto da cúspide"""
+    pontuacao = np.zeros(posicoes.shape[0])
+    for objetivo in objetivos:
+        planeta, posicao, peso = objetivo["planeta"], objetivo["posicao"], objetivo.get("peso", 1.0)
+        if planeta not in nomes_corpos:
+            raise ValueError(f"Planeta inválido: {planeta}")
+        casas = posicoes[:, nomes_corpos.index(planeta)]
+        if posicao == "angular":
+            proximidade = np.max([1 - distancia_cuspide(casas, c) for c in POSICOES["angular"]], axis=0)
+            pontuacao += peso * np.clip(proximidade, 0, 1)
+        elif posicao in POSICOES:
+            pontuacao += peso * np.isin(np.floor(casas), POSICOES[posicao])
+        elif posicao in CUSPIDE_ANGULO:
+            pontuacao += peso * np.clip(1 - distancia_cuspide(casas, CUSPIDE_ANGULO[posicao]), 0, 1)
+        elif str(posicao).isdigit() and 1 <= int(posicao) <= 12:
+            pontuacao += peso * (np.floor(casas) == int(posicao))
+        else:
+            raise ValueError(f"Posição inválida: {posicao}")
+    return pontuacao
+
+def ranquear_municipios(julian_day, municipios, objetivos, limite=20, modo_efemeride=None, corpos=PLANETAS_SWE):
+    """Top-N municípios pelos objetivos, com ASC, MC e a casa de cada corpo no local"""
+    if not len(municipios):
+        return []
+    flags, _ = escolher_motor(julian_day, modo_efemeride)
+    nomes_corpos = [nome for _, nome in corpos]
+    longitudes = np.array([calcular_posicao(julian_day, corpo, flags)[0][0] for corpo, _ in corpos])
+    obliquidade = calcular_posicao(julian_day, swe.ECL_NUT, flags)[0][0]
+
+    ramc = (swe.sidtime(julian_day) * 15 + municipios.longitudes) % 360
+    cuspides = calcular_cuspides_placidus(ramc, municipios.latitudes, obliquidade)
+    posicoes = posicao_nas_cuspides(longitudes, cuspides)
+    pontuacao = pontuar(posicoes, objetivos, nomes_corpos)
+
+    limite = min(limite, len(municipios))
+    melhores = np.argpartition(-pontuacao, limite - 1)[:limite]
+    melhores = melhores[np.argsort(-pontuacao[melhores], kind="stable")]
+    ascendentes, meios_ceu = cuspides[melhores, 0], cuspides[melhores, 9]
+
+    resultado = []
+    for k, i in enumerate(melhores.tolist()):
+        resultado.append({
+            "municipio_id": municipios.ids[i],
+            "nome": municipios.nomes[i],
+            "estado": municipios.estados[i],
+            "coordenadas": {"latitude": float(municipios.latitudes[i]), "longitude": float(municipios.longitudes[i])},
+            "pontuacao": round(float(pontuacao[i]), 3),
+            "ascendente": {"signo": SIGNOS[int(ascendentes[k] // 30)], "grau": round(float(ascendentes[k]), 2)},
+            "meio_do_ceu": {"signo": SIGNOS[int(meios_ceu[k] // 30)], "grau": round(float(meios_ceu[k]), 2)},
+            "casas": dict(zip(nomes_corpos, np.floor(posicoes[i]).astype(int).tolist()))
+        })
+    return resultado
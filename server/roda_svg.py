@@ -0,0 +1,205 @@
+"""Roda do mapa natal em SVG, a partir dos mesmos dados do POST /mapa-astral.
+
+As partes que não dependem do mapa (estilos, glifos em <defs>, setores e marcações do anel do zodíaco)
+são montadas uma vez na importação; cada roda só gira o anel pelo ascendente e acrescenta cúspides,
+corpos e linhas de aspecto. As rodas prontas ficam num cache LRU indexado pelo hash do mapa.
+"""
+import math
+import os
+import threading
+from collections import OrderedDict
+
+TAMANHO = 600
+CENTRO = TAMANHO / 2
+R_EXTERNO = 290
+R_SIGNOS = 250
+R_CASAS = 215
+R_CORPOS = 190
+R_MARCA_CORPO = 205
+R_ASPECTOS = 140
+SEPARACAO_MINIMA = 7.0   # graus entre glifos de corpos na roda
+
+CACHE_MAX = int(os.environ.get("RODA_CACHE_MAX", 2048))
+
+# Variação de texto (U+FE0E): sem ela alguns renderizadores trocam os glifos por emoji
+GLIFOS_SIGNOS = ["♈", "♉", "♊", "♋", "♌", "♍", "♎", "♏", "♐", "♑", "♒", "♓"]
+ELEMENTOS_SIGNOS = ["fogo", "terra", "ar", "agua"] * 3
+GLIFOS_CORPOS = {
+    "Sol": "☉", "Lua": "☽", "Mercúrio": "☿", "Vênus": "♀", "Marte": "♂", "Júpiter": "♃",
+    "Saturno": "♄", "Urano": "♅", "Netuno": "♆", "Plutão": "♇", "Nodo Norte": "☊"
+}
+CLASSES_ASPECTOS = {
+    "Conjunção": "conjuncao", "Sextil": "harmonico", "Trígono": "harmonico",
+    "Quadratura": "tenso", "Oposição": "tenso"
+}
+
+ESTILO = """
+.anel{fill:none;stroke:#2d2a4a;stroke-width:1.2}
+.fogo{fill:#fde2d4}.terra{fill:#e3efd9}.ar{fill:#fff5cc}.agua{fill:#d9e8f7}
+.marca{stroke:#2d2a4a;stroke-width:.6}
+.glifo{font-family:'DejaVu Sans','Segoe UI Symbol',sans-serif;text-anchor:middle;dominant-baseline:central;fill:#2d2a4a}
+.glifo-signo{font-size:20px}.glifo-corpo{font-size:18px}
+.cuspide{stroke:#6b6890;stroke-width:.8}.angulo{stroke:#2d2a4a;stroke-width:2}
+.numero-casa{font:11px sans-serif;fill:#6b6890;text-anchor:middle;dominant-baseline:central}
+.ligacao{stroke:#9c99b8;stroke-width:.6}
+.aspecto{stroke-width:1;opacity:.8}.conjuncao{stroke:#8a6d00}.harmonico{stroke:#2f6fd6}.tenso{stroke:#d63a2f}
+"""
+
+def polar(raio, angulo):
+    """Ponto da roda no ângulo (graus, anti-horário a partir das 9 h)"""
+    radianos = math.radians(180 - angulo)
+    return CENTRO + raio * math.cos(radianos), CENTRO - raio * math.sin(radianos)
+
+def f(valor):
+    return f"{valor:.2f}".rstrip("0").rstrip(".")
+
+def linha(angulo, raio_interno, raio_externo, classe):
+    x1, y1 = polar(raio_interno, angulo)
+    x2, y2 = polar(raio_externo, angulo)
+    return f'<line class="{classe}" x1="{f(x1)}" y1="{f(y1)}" x2="{f(x2)}" y2="{f(y2)}"/>'
+
+def montar_definicoes():
+    """<style> e glifos (signos e corpos) como <g id> em <defs>, reusados com <use>"""
+    glifos = [
+        f'<g id="signo-{i}"><text class="glifo glifo-signo">{glifo}︎</text></g>'
+        for i, glifo in enumerate(GLIFOS_SIGNOS)
+    ] + [
+        f'<g id="corpo-{i}"><text class="glifo glifo-corpo">{glifo}︎</text></g>'
+        for i, glifo in enumerate(GLIFOS_CORPOS.values())
+    ]
+    return f"<defs><style>{ESTILO}</style>{''.join(glifos)}</defs>"
+
+def montar_anel_zodiaco():
+    """Setores dos signos e marcações de grau com 0° de Áries às 9 h; a roda gira o grupo pelo ascendente"""
+    partes = []
+    for i in range(12):
+        inicio, fim = i * 30, (i + 1) * 30
+        pontos = [polar(R_EXTERNO, inicio), polar(R_EXTERNO, fim), polar(R_SIGNOS, fim), polar(R_SIGNOS, inicio)]
+        (x1, y1), (x2, y2), (x3, y3), (x4, y4) = pontos
+        partes.append(
+            f'<path class="{ELEMENTOS_SIGNOS[i]}" d="M{f(x1)} {f(y1)}A{R_EXTERNO} {R_EXTERNO} 0 0 0 {f(x2)} {f(y2)}'
+            f'L{f(x3)} {f(y3)}A{R_SIGNOS} {R_SIGNOS} 0 0 1 {f(x4)} {f(y4)}Z"/>'
+        )
+    for grau in range(360):
+        comprimento = 10 if grau % 30 == 0 else 6 if grau % 10 == 0 else 3
+        partes.append(linha(grau, R_SIGNOS, R_SIGNOS + comprimento, "marca"))
+    partes.append(f'<circle class="anel" cx="{f(CENTRO)}" cy="{f(CENTRO)}" r="{R_EXTERNO}"/>')
+    partes.append(f'<circle class="anel" cx="{f(CENTRO)}" cy="{f(CENTRO)}" r="{R_SIGNOS}"/>')
+    return "".join(partes)
+
+DEFINICOES = montar_definicoes()
+ANEL_ZODIACO = montar_anel_zodiaco()
+CIRCULOS_INTERNOS = "".join(
+    f'<circle class="anel" cx="{f(CENTRO)}" cy="{f(CENTRO)}" r="{raio}"/>' for raio in (R_CASAS, R_ASPECTOS)
+)
+INDICE_CORPOS = {nome: i for i, nome in enumerate(GLIFOS_CORPOS)}
+
+def afastar_glifos(angulos, separacao=SEPARACAO_MINIMA):
+    """Ângulos de exibição sem sobreposição: corpos mais próximos que a separação formam um grupo,
+    espalhado em torno da média do grupo; grupos que passam a se tocar se fundem, até estabilizar.
+    O círculo é aberto no maior vão entre corpos vizinhos."""
+    quantidade = len(angulos)
+    if quantidade < 2:
+        return [float(angulo) % 360 for angulo in angulos]
+    separacao = min(separacao, 360 / quantidade)
+    ordem = sorted(range(quantidade), key=lambda i: angulos[i] % 360)
+    valores = [angulos[i] % 360 for i in ordem]
+    vaos = [(valores[(k + 1) % quantidade] - valores[k]) % 360 for k in range(quantidade)]
+    inicio = (vaos.index(max(vaos)) + 1) % quantidade
+    ordem = ordem[inicio:] + ordem[:inicio]
+    lineares = valores[inicio:] + [valor + 360 for valor in valores[:inicio]]
+
+    grupos = [[valor] for valor in lineares]
+    espalhar = lambda grupo: [sum(grupo) / len(grupo) + (j - (len(grupo) - 1) / 2) * separacao for j in range(len(grupo))]
+    fundiu = True
+    while fundiu:
+        fundiu = False
+        for k in range(len(grupos) - 1):
+            if espalhar(grupos[k + 1])[0] - espalhar(grupos[k])[-1] < separacao - 1e-9:
+                grupos[k:k + 2] = [grupos[k] + grupos[k + 1]]
+                fundiu = True
+                break
+
+    resultado = [0.0] * quantidade
+    exibidos = [angulo for grupo in grupos for angulo in espalhar(grupo)]
+    for i, exibido in zip(ordem, exibidos):
+        resultado[i] = exibido % 360
+    return resultado
+
+def renderizar_roda(corpos, cuspides, aspectos=()):
+    """SVG da roda. corpos: {nome: longitude}; cuspides: 12 longitudes (casa 1 = ASC, casa 10 = MC);
+    aspectos: (corpo1, corpo2, nome do aspecto) como em calcular_aspectos."""
+    ascendente = cuspides[0]
+    # Ângulo na roda: ascendente às 9 h, longitudes crescendo no sentido anti-horário
+    na_roda = lambda longitude: (longitude - ascendente) % 360
+    partes = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" '
+        f'viewBox="0 0 {TAMANHO} {TAMANHO}" width="{TAMANHO}" height="{TAMANHO}">',
+        DEFINICOES,
+        f'<g transform="rotate({f(ascendente)} {f(CENTRO)} {f(CENTRO)})">{ANEL_ZODIACO}</g>',
+        CIRCULOS_INTERNOS
+    ]
+    # Glifos dos signos fora do grupo girado, para ficarem na vertical
+    for i in range(12):
+        x, y = polar((R_EXTERNO + R_SIGNOS) / 2, na_roda(i * 30 + 15))
+        partes.append(f'<use href="#signo-{i}" xlink:href="#signo-{i}" x="{f(x)}" y="{f(y)}"/>')
+
+    for i, cuspide in enumerate(cuspides):
+        partes.append(linha(na_roda(cuspide), R_ASPECTOS, R_SIGNOS, "angulo" if i in (0, 3, 6, 9) else "cuspide"))
+        meio = na_roda(cuspide) + ((cuspides[(i + 1) % 12] - cuspide) % 360) / 2
+        x, y = polar(R_ASPECTOS + 12, meio)
+        partes.append(f'<text class="numero-casa" x="{f(x)}" y="{f(y)}">{i + 1}</text>')
+
+    nomes = [nome for nome in corpos if nome in INDICE_CORPOS]
+    reais = [na_roda(corpos[nome]) for nome in nomes]
+    for nome, real, exibido in zip(nomes, reais, afastar_glifos(reais)):
+        partes.append(linha(real, R_MARCA_CORPO, R_CASAS, "marca"))
+        xm, ym = polar(R_MARCA_CORPO, real)
+        x, y = polar(R_CORPOS, exibido)
+        if abs((exibido - real + 180) % 360 - 180) > 0.5:
+            partes.append(f'<line class="ligacao" x1="{f(xm)}" y1="{f(ym)}" x2="{f(x)}" y2="{f(y)}"/>')
+        indice = INDICE_CORPOS[nome]
+        partes.append(f'<use href="#corpo-{indice}" xlink:href="#corpo-{indice}" x="{f(x)}" y="{f(y)}"><title>{nome}</title></use>')
+
+    for corpo1, corpo2, aspecto in aspectos:
+        if corpo1 not in corpos or corpo2 not in corpos:
+            continue
+        x1, y1 = polar(R_ASPECTOS, na_roda(corpos[corpo1]))
+        x2, y2 = polar(R_ASPECTOS, na_roda(corpos[corpo2]))
+        classe = CLASSES_ASPECTOS.get(aspecto, "harmonico")
+        partes.append(f'<line class="aspecto {classe}" x1="{f(x1)}" y1="{f(y1)}" x2="{f(x2)}" y2="{f(y2)}"/>')
+    partes.append("</svg>")
+    return "".join(partes)
+
+class CacheRodas:
+    """LRU de SVGs prontos por hash do mapa"""
+
+    def __init__(self, maximo=CACHE_MAX):
+        self.maximo = maximo
+        self.itens = OrderedDict()
+        self.trava = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+
+    def obter(self, chave):
+        with self.trava:
+            svg = self.itens.get(chave)
+            if svg is None:
+                self.faltas += 1
+                return None
+            self.itens.move_to_end(chave)
+            self.acertos += 1
+            return svg
+
+    def guardar(self, chave, svg):
+        with self.trava:
+            self.itens[chave] = svg
+            self.itens.move_to_end(chave)
+            while len(self.itens) > self.maximo:
+                self.itens.popitem(last=False)
+
+    def status(self):
+        with self.trava:
+            return {"itens": len(self.itens), "maximo": self.maximo, "acertos": self.acertos, "faltas": self.faltas}
+
+cache_rodas = CacheRodas()
@@ -1,6 +1,7 @@
 import type { Express } from "express";
 import { createServer, type Server } from "http";
 import { storage } from "./storage";
+import { updateAstralMapIndexes } from "./astralIndexes";
 import { setupSimpleAuth, isAuthenticated } from "./simpleAuth";
 import { insertAstrologicalProfileSchema, insertPostSchema } from "@shared/schema";
 import { z } from "zod";
@@ -101,6 +102,9 @@ export async function registerRoutes(app: Express): Promise<Server> {
       });
       
       const profile = await storage.createAstrologicalProfile(profileData);
+      if (profile.astralMapData) {
+        await updateAstralMapIndexes(userId, profile.astralMapData);
+      }
       res.json(profile);
     } catch (error) {
       console.error("Error creating astrological profile:", error);
@@ -178,6 +182,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
         nome,
         data_nascimento: formattedDate,
         hora_nascimento: hora_nascimento || '12:00',
+        hora_desconhecida: !hora_nascimento,
         local_nascimento,
         latitude: coordinates.latitude,
         longitude: coordinates.longitude
@@ -197,6 +202,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
         // Save astral map data to user profile
         const userId = req.user.claims.sub;
         await storage.updateAstralMapData(userId, result.data);
+        await updateAstralMapIndexes(userId, result.data);
         
         console.log('Sending astral map data to frontend:', {
           hasData: !!result.data,
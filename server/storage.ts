@@ -12,6 +12,7 @@ import {
   commentLikes,
   conversations,
   messages,
+  dailyTransitDigests,
   type User,
   type UpsertUser,
   type AstrologicalProfile,
@@ -33,6 +34,7 @@ import {
   type InsertConversation,
   type Message,
   type InsertMessage,
+  type DailyTransitDigest,
 } from "@shared/schema";
 import { db } from "./db";
 import { eq, desc, asc, sql, and, count, isNull } from "drizzle-orm";
@@ -49,6 +51,7 @@ export interface IStorage {
   createAstrologicalProfile(profile: InsertAstrologicalProfile): Promise<AstrologicalProfile>;
   updateAstrologicalProfile(userId: string, profile: Partial<InsertAstrologicalProfile>): Promise<AstrologicalProfile>;
   updateAstralMapData(userId: string, astralMapData: any): Promise<AstrologicalProfile>;
+  getDailyTransitDigest(userId: string, date: string): Promise<DailyTransitDigest | undefined>;
   
   // Brazilian locations
   getBrazilianStates(): Promise<BrazilianState[]>;
@@ -186,6 +189,14 @@ export class DatabaseStorage implements IStorage {
     return updatedProfile;
   }
 
+  async getDailyTransitDigest(userId: string, date: string): Promise<DailyTransitDigest | undefined> {
+    const [digest] = await db
+      .select()
+      .from(dailyTransitDigests)
+      .where(and(eq(dailyTransitDigests.userId, userId), eq(dailyTransitDigests.date, date)));
+    return digest;
+  }
+
   async getBrazilianStates(): Promise<BrazilianState[]> {
     return await db.select().from(brazilianStates).orderBy(brazilianStates.name);
   }
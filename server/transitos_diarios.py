@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""Job noturno: calcula os trânsitos do dia uma única vez e cruza com todos os mapas natais."""
+import argparse
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+
+import numpy as np
+import psycopg2
+import swisseph as swe
+from psycopg2.extras import execute_values
+
+from astral_api_advanced import PLANETAS_SWE, ASPECTOS_GRAUS
+from efemerides import escolher_motor, calcular_posicao
+
+NOMES_TRANSITO = [nome for _, nome in PLANETAS_SWE]
+PONTOS_NATAIS = NOMES_TRANSITO + ["Ascendente", "Meio do Céu"]
+NOMES_ASPECTOS = list(ASPECTOS_GRAUS.keys())
+ANGULOS_ASPECTOS = np.array(list(ASPECTOS_GRAUS.values()), dtype=float)
+
+# Orbes usadas no resumo diário (trânsitos usam orbes bem mais apertadas que o mapa natal)
+ORBE_TRANSITO = 2.0
+ORBE_ATIVACAO = 1.0
+
+def calcular_posicoes_transito(data_transito):
+    """Longitudes dos planetas em trânsito ao meio-dia UT do dia (calculadas uma vez por execução)"""
+    jd = swe.julday(data_transito.year, data_transito.month, data_transito.day, 12.0)
+    flags, _ = escolher_motor(jd)
+    return np.array([calcular_posicao(jd, planeta_id, flags)[0][0] for planeta_id, _ in PLANETAS_SWE])
+
+def extrair_pontos_natais(planetas, casas):
+    """Extrai as longitudes natais (planetas, ASC e MC) e as cúspides do JSON salvo no perfil"""
+    graus = {p.get("planeta"): p.get("grau") for p in json.loads(planetas or "[]")}
+    casas = sorted(json.loads(casas or "[]"), key=lambda c: c.get("numero", 0))
+    if len(casas) != 12 or any(graus.get(nome) is None for nome in NOMES_TRANSITO):
+        return None
+    cuspides = [float(c["grau"]) for c in casas]
+    pontos = [float(graus[nome]) for nome in NOMES_TRANSITO] + [cuspides[0], cuspides[9]]
+    return pontos, cuspides
+
+def calcular_aspectos_transito(transito, natais):
+    """Aspectos trânsito→natal para todos os usuários do lote de uma vez.
+
+    Retorna índices (usuário, trânsito, ponto natal, aspecto) e a orbe de cada aspecto encontrado.
+    """
+    distancia = np.abs((transito[None, :, None] - natais[:, None, :] + 180) % 360 - 180)
+    orbes = np.abs(distancia[..., None] - ANGULOS_ASPECTOS)
+    usuario, planeta, ponto, aspecto = np.nonzero(orbes <= ORBE_TRANSITO)
+    return usuario, planeta, ponto, aspecto, orbes[usuario, planeta, ponto, aspecto]
+
+def calcular_casas_transito(transito, cuspides):
+    """Casa natal (1-12) ocupada por cada planeta em trânsito, para todos os usuários do lote"""
+    # A casa é a da cúspide com o menor deslocamento anti-horário até o planeta
+    deslocamento = (transito[None, :, None] - cuspides[:, None, :]) % 360
+    return np.argmin(deslocamento, axis=2) + 1
+
+def montar_resumos(data_transito, transito, usuarios, natais, cuspides):
+    """Monta o resumo compacto de cada usuário do lote"""
+    usuario, planeta, ponto, aspecto, orbe = calcular_aspectos_transito(transito, natais)
+    casas = calcular_casas_transito(transito, cuspides)
+    # np.nonzero devolve os índices ordenados por usuário: cada usuário é uma fatia contígua
+    limites = np.searchsorted(usuario, np.arange(len(usuarios) + 1))
+    planeta, ponto, aspecto, orbe_lista = planeta.tolist(), ponto.tolist(), aspecto.tolist(), np.round(orbe, 2).tolist()
+
+    resumos = []
+    for i, user_id in enumerate(usuarios):
+        inicio, fim = limites[i], limites[i + 1]
+        ordem = (inicio + np.argsort(orbe[inicio:fim], kind="stable")).tolist()
+        aspectos = [
+            [NOMES_TRANSITO[planeta[k]], PONTOS_NATAIS[ponto[k]], NOMES_ASPECTOS[aspecto[k]], orbe_lista[k]]
+            for k in ordem
+        ]
+        ativados = []
+        for k in ordem:
+            if orbe[k] <= ORBE_ATIVACAO and PONTOS_NATAIS[ponto[k]] not in ativados:
+                ativados.append(PONTOS_NATAIS[ponto[k]])
+        resumos.append((user_id, {
+            "data": data_transito.isoformat(),
+            "aspectos": aspectos,
+            "casas": dict(zip(NOMES_TRANSITO, casas[i].tolist())),
+            "pontos_ativados": ativados
+        }))
+    return resumos
+
+def processar_lote(argumentos):
+    """Executa o cruzamento de um lote (usado pelos processos trabalhadores)"""
+    data_transito, transito, linhas = argumentos
+    usuarios, natais, cuspides = [], [], []
+    for user_id, planetas, casas in linhas:
+        extraido = extrair_pontos_natais(planetas, casas)
+        if extraido is None:
+            continue
+        usuarios.append(user_id)
+        natais.append(extraido[0])
+        cuspides.append(extraido[1])
+    if not usuarios:
+        return []
+    return montar_resumos(data_transito, transito, usuarios, np.array(natais), np.array(cuspides))
+
+def gravar_resumos(cur, data_transito, resumos):
+    """Grava os resumos em massa (upsert) na tabela lida pelo serviço de horóscopo"""
+    execute_values(
+        cur,
+        """
+        INSERT INTO daily_transit_digests (user_id, date, digest) VALUES %s
+        ON CONFLICT (user_id, date) DO UPDATE SET digest = EXCLUDED.digest
+        """,
+        [(user_id, data_transito, json.dumps(resumo, ensure_ascii=False)) for user_id, resumo in resumos],
+        template="(%s, %s, %s::jsonb)",
+        page_size=1000
+    )
+
+def ler_lotes(conn, tamanho_lote):
+    """Lê os mapas natais em lotes com cursor no servidor (sem carregar a tabela inteira)"""
+    with conn.cursor(name="mapas_natais") as cur:
+        cur.itersize = tamanho_lote
+        # Só as chaves usadas, como texto: o parse do JSON fica com os processos trabalhadores
+        cur.execute("""
+            SELECT user_id, (astral_map_data->'planetas')::text, (astral_map_data->'casas')::text
+            FROM astrological_profiles
+            WHERE astral_map_data IS NOT NULL
+        """)
+        while True:
+            linhas = cur.fetchmany(tamanho_lote)
+            if not linhas:
+                break
+            yield linhas
+
+def executar_job(data_transito, tamanho_lote=5000, processos=None):
+    """Calcula o trânsito do dia, cruza com todos os mapas e grava os resumos"""
+    transito = calcular_posicoes_transito(data_transito)
+    processos = processos or os.cpu_count() or 1
+    leitura = psycopg2.connect(os.environ['DATABASE_URL'])
+    escrita = psycopg2.connect(os.environ['DATABASE_URL'])
+    total = 0
+    try:
+        with ProcessPoolExecutor(max_workers=processos) as executor, escrita.cursor() as cur:
+            # Mantém no máximo dois lotes por processo em voo para limitar o uso de memória
+            pendentes = deque()
+            for linhas in ler_lotes(leitura, tamanho_lote):
+                pendentes.append(executor.submit(processar_lote, (data_transito, transito, linhas)))
+                if len(pendentes) >= 2 * processos:
+                    total += gravar_lote_pronto(cur, data_transito, pendentes.popleft())
+            while pendentes:
+                total += gravar_lote_pronto(cur, data_transito, pendentes.popleft())
+        escrita.commit()
+    except Exception:
+        escrita.rollback()
+        raise
+    finally:
+        leitura.close()
+        escrita.close()
+    return total
+
+def gravar_lote_pronto(cur, data_transito, futuro):
+    resumos = futuro.result()
+    if resumos:
+        gravar_resumos(cur, data_transito, resumos)
+        print(f"Resumos gravados: +{len(resumos)}")
+    return len(resumos)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera os resumos diários de trânsitos para todos os usuários")
+    parser.add_argument("--data", help="Data dos trânsitos (AAAA-MM-DD); padrão: hoje")
+    parser.add_argument("--lote", type=int, default=5000, help="Mapas por lote")
+    parser.add_argument("--processos", type=int, default=None, help="Processos trabalhadores (padrão: todos os núcleos)")
+    args = parser.parse_args()
+
+    data_transito = datetime.strptime(args.data, "%Y-%m-%d").date() if args.data else date.today()
+    total = executar_job(data_transito, args.lote, args.processos)
+    print(f"✅ {total} resumos de trânsito gravados para {data_transito.isoformat()}")
@@ -10,6 +10,8 @@ import {
   time,
   boolean,
   integer,
+  primaryKey,
+  doublePrecision,
 } from "drizzle-orm/pg-core";
 import { createInsertSchema } from "drizzle-zod";
 import { z } from "zod";
@@ -70,6 +72,9 @@ export const brazilianMunicipalities = pgTable("brazilian_municipalities", {
   name: varchar("name").notNull(),
   stateCode: varchar("state_code", { length: 2 }).references(() => brazilianStates.code).notNull(),
   ibgeCode: varchar("ibge_code").unique(),
+  // Coordenadas da sede municipal (IBGE), usadas no ranking de relocação
+  latitude: doublePrecision("latitude"),
+  longitude: doublePrecision("longitude"),
 });
 
 // Posts
@@ -163,6 +168,18 @@ export const messages = pgTable("messages", {
   createdAt: timestamp("created_at").defaultNow(),
 });
 
+// Daily transit digests (written in bulk by the nightly job in server/transitos_diarios.py)
+export const dailyTransitDigests = pgTable(
+  "daily_transit_digests",
+  {
+    userId: varchar("user_id").references(() => users.id, { onDelete: "cascade" }).notNull(),
+    date: date("date").notNull(),
+    digest: jsonb("digest").notNull(),
+    createdAt: timestamp("created_at").defaultNow(),
+  },
+  (table) => [primaryKey({ columns: [table.userId, table.date] })],
+);
+
 // Relations
 export const usersRelations = relations(users, ({ one, many }) => ({
   astrologicalProfile: one(astrologicalProfiles),
@@ -336,6 +353,8 @@ export type InsertConversation = typeof conversations.$inferInsert;
 export type Message = typeof messages.$inferSelect;
 export type InsertMessage = typeof messages.$inferInsert;
 
+export type DailyTransitDigest = typeof dailyTransitDigests.$inferSelect;
+
 // Schemas
 export const insertAstrologicalProfileSchema = createInsertSchema(astrologicalProfiles).omit({
   id: true,